@@ -0,0 +1,227 @@
+# CPU inference benchmark: checkpoint x backend x imgsz x batch size
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Allow `python benchmarks/bench_inference.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.data_loader import load_images_from_folder
+
+DEFAULT_OUTPUT = "runs/benchmarks/latest.json"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def backend_artifact(weights, backend):
+    """
+    Model path for a backend, exporting the checkpoint once when needed.
+
+    Exports are dynamic so one file serves every imgsz and batch size.
+    """
+    stem = os.path.splitext(weights)[0]
+    if backend == "pytorch":
+        return weights
+    if backend == "onnxruntime":
+        path = stem + ".onnx"
+        if not os.path.exists(path):
+            from src.models.export import export_onnx
+            path = export_onnx(weights, dynamic=True)
+        return path
+    if backend == "openvino":
+        path = stem + "_openvino_model"
+        if not os.path.isdir(path):
+            from src.models.export import export_openvino
+            path = export_openvino(weights, dynamic=True)
+        return path
+    raise ValueError(f"Unknown backend {backend!r}")
+
+
+def run_case(case):
+    """
+    Benchmark one configuration in the current (fresh) process.
+
+    Args:
+        case (dict): model, backend, imgsz, batch, images, warmup (batches)
+            and repeats (timed passes over all images).
+
+    Returns:
+        dict: Cold-load time, warm latency percentiles per batch, images/s
+        and peak RSS.
+    """
+    import cv2
+
+    from src.models.backends import load_model
+
+    images = [cv2.imread(p) for p in case["images"]]
+    images = [im for im in images if im is not None]
+
+    t0 = time.perf_counter()
+    model = load_model(case["path"])
+    model.predict(images[:case["batch"]], imgsz=case["imgsz"], batch=case["batch"], verbose=False)
+    cold_load_s = time.perf_counter() - t0
+
+    batches = [images[i:i + case["batch"]] for i in range(0, len(images), case["batch"])]
+    for i in range(case["warmup"]):
+        model.predict(batches[i % len(batches)], imgsz=case["imgsz"], batch=case["batch"], verbose=False)
+
+    # Whole passes, so every batch size sees the same images
+    latencies, n_images = [], 0
+    start = time.perf_counter()
+    for _ in range(case["repeats"]):
+        for chunk in batches:
+            t = time.perf_counter()
+            model.predict(chunk, imgsz=case["imgsz"], batch=case["batch"], verbose=False)
+            latencies.append((time.perf_counter() - t) * 1000)
+            n_images += len(chunk)
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "cold_load_s": round(cold_load_s, 3),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "images_per_s": round(n_images / elapsed, 2),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def case_key(result):
+    """Identity of a configuration across runs."""
+    return f"{result['model']}|{result['backend']}|{result['imgsz']}|{result['batch']}"
+
+
+def compare(results, baseline, tolerance=0.15):
+    """
+    Compare results with a baseline.
+
+    A case regresses when its p95 latency grows, or its throughput drops,
+    by more than ``tolerance`` (relative).
+
+    Args:
+        results (list): Current results.
+        baseline (list): Baseline results.
+        tolerance (float): Allowed relative change.
+
+    Returns:
+        list: One dict per case present in both, with ``regressed`` set.
+    """
+    previous = {case_key(r): r for r in baseline}
+    rows = []
+    for result in results:
+        base = previous.get(case_key(result))
+        if base is None:
+            continue
+        p95_change = result["p95_ms"] / base["p95_ms"] - 1
+        ips_change = result["images_per_s"] / base["images_per_s"] - 1
+        rows.append({
+            "case": case_key(result),
+            "p95_change": round(p95_change, 4),
+            "ips_change": round(ips_change, 4),
+            "regressed": p95_change > tolerance or ips_change < -tolerance,
+        })
+    return rows
+
+
+def environment():
+    import torch
+    import ultralytics
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "torch": torch.__version__,
+        "ultralytics": ultralytics.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CPU inference on the val images")
+    parser.add_argument("--models", type=str, nargs="+", default=sorted(glob.glob("runs/yolo11*/best.pt")))
+    parser.add_argument("--backends", type=str, nargs="+", default=["pytorch", "onnxruntime"],
+                        choices=["pytorch", "onnxruntime", "openvino"])
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640, 960])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--images", type=str, default="data_ecg/val/images")
+    parser.add_argument("--max-images", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes over the images")
+    parser.add_argument("--threads", type=int, help="Torch / OpenMP threads of each run")
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--case", type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        # Child process: one configuration, result as JSON on stdout
+        print(json.dumps(run_case(json.loads(args.case))))
+        sys.exit(0)
+
+    if not args.models:
+        parser.error("no checkpoints found, pass --models")
+    images = sorted(load_images_from_folder(args.images, ("*.jpg", "*.jpeg", "*.png")))[:args.max_images]
+    env = dict(os.environ)
+    if args.threads:
+        env["OMP_NUM_THREADS"] = str(args.threads)
+
+    results = []
+    for weights in args.models:
+        for backend in args.backends:
+            path = backend_artifact(weights, backend)
+            for imgsz in args.imgsz:
+                for batch in args.batch:
+                    case = {
+                        "model": weights, "backend": backend, "path": path, "imgsz": imgsz, "batch": batch,
+                        "images": images, "warmup": args.warmup, "repeats": args.repeats,
+                    }
+                    # Fresh interpreter per case: honest cold-load time and peak RSS
+                    out = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--case", json.dumps(case)],
+                        capture_output=True, text=True, env=env,
+                    )
+                    if out.returncode != 0:
+                        print(f"GAGAL {weights} {backend} {imgsz} b{batch}:\n{out.stderr[-2000:]}", file=sys.stderr)
+                        continue
+                    result = {k: case[k] for k in ("model", "backend", "imgsz", "batch")}
+                    result.update(json.loads(out.stdout.strip().splitlines()[-1]))
+                    results.append(result)
+                    print(
+                        f"{weights} {backend:<11} {imgsz:>4} b{batch:<3} cold {result['cold_load_s']:.2f}s "
+                        f"p50 {result['p50_ms']:.1f} p95 {result['p95_ms']:.1f} p99 {result['p99_ms']:.1f} ms "
+                        f"{result['images_per_s']:.1f} img/s rss {result['peak_rss_mb']:.0f} MB"
+                    )
+
+    report = {"environment": environment(), "results": results}
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil -> {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline disimpan -> {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f)["results"], args.tolerance)
+        regressions = [r for r in rows if r["regressed"]]
+        for r in rows:
+            flag = "REGRESI" if r["regressed"] else "ok"
+            print(f"{flag:<7} {r['case']}: p95 {r['p95_change']:+.1%}, img/s {r['ips_change']:+.1%}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,215 @@
+# single-pass sweep of confidence / NMS IoU / abnormal-count operating points
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from src.data.data_loader import label_path_for, load_images_from_folder, load_yolo_labels
+from src.models.inference import box_iou
+from src.models.prediction_cache import PredictionCache
+from src.models.registry import get_model
+from src.models.yolo_eval import load_predictions, predict_split
+from src.utils.config import load_config
+
+DEFAULT_CONFS = np.round(np.arange(0.05, 0.95, 0.05), 2)
+DEFAULT_IOUS = (0.3, 0.4, 0.5, 0.6, 0.7)
+DEFAULT_CUTOFFS = tuple(range(0, 16))
+
+
+def greedy_nms(boxes, scores, classes, iou_thresholds):
+    """
+    Class-aware greedy NMS for several IoU thresholds at once.
+
+    The IoU matrix is computed once per image and reused for every threshold.
+    Boxes below a confidence cutoff can never suppress boxes above it, so
+    NMS at a given cutoff equals this result filtered by score. The input
+    must not be NMS'd already: greedy NMS at a loose IoU followed by a
+    stricter one is not NMS at the stricter IoU (a box suppressed at the
+    loose IoU can no longer be the one that survives at the strict IoU).
+
+    Args:
+        boxes (numpy.ndarray): (N, 4) xyxy boxes.
+        scores (numpy.ndarray): (N,) confidences.
+        classes (numpy.ndarray): (N,) class ids.
+        iou_thresholds (sequence): NMS IoU thresholds.
+
+    Returns:
+        numpy.ndarray: (len(iou_thresholds), N) bool keep masks.
+    """
+    n = len(scores)
+    keep = np.zeros((len(iou_thresholds), n), dtype=bool)
+    if n == 0:
+        return keep
+
+    order = np.argsort(-scores, kind="stable")
+    iou = box_iou(boxes[order], boxes[order])
+    iou *= classes[order][:, None] == classes[order][None, :]
+    iou = np.triu(iou, 1)
+
+    for t, threshold in enumerate(iou_thresholds):
+        suppress = iou > threshold
+        alive = np.ones(n, dtype=bool)
+        for i in np.flatnonzero(suppress.any(axis=1)):
+            if alive[i]:
+                alive &= ~suppress[i]
+        keep[t, order] = alive
+    return keep
+
+
+def abnormal_counts(predictions, abnormal_id, confs, ious):
+    """
+    Abnormal detection counts for every (IoU, conf) pair and image.
+
+    Args:
+        predictions (list): ``Detections`` per image (stored at a low conf).
+        abnormal_id (int): Class id of abnormal beats.
+        confs (numpy.ndarray): Confidence cutoffs.
+        ious (sequence): NMS IoU thresholds.
+
+    Returns:
+        numpy.ndarray: (len(ious), len(confs), n_images) int64 counts.
+    """
+    counts = np.zeros((len(ious), len(confs), len(predictions)), dtype=np.int64)
+    for j, det in enumerate(predictions):
+        keep = greedy_nms(det.boxes, det.scores, det.classes, ious)
+        abnormal = keep & (det.classes == abnormal_id)[None, :]
+        # (I, N) kept-abnormal mask x (N, C) above-conf mask -> (I, C) counts
+        above = det.scores[None, :] >= confs[:, None]
+        counts[:, :, j] = abnormal.astype(np.int64) @ above.T.astype(np.int64)
+    return counts
+
+
+def sweep(predictions, truth, abnormal_id, confs=DEFAULT_CONFS, ious=DEFAULT_IOUS, cutoffs=DEFAULT_CUTOFFS):
+    """
+    Score every (conf, NMS IoU, abnormal cutoff) operating point.
+
+    An image is predicted abnormal when its abnormal count is above the
+    cutoff, and is truly abnormal when ``truth`` is True.
+
+    Args:
+        predictions (list): ``Detections`` per image.
+        truth (numpy.ndarray): (n_images,) bool ground truth.
+        abnormal_id (int): Class id of abnormal beats.
+        confs (sequence): Confidence cutoffs.
+        ious (sequence): NMS IoU thresholds.
+        cutoffs (sequence): Abnormal-count cutoffs.
+
+    Returns:
+        list: One dict per operating point with tp/fp/tn/fn, sensitivity,
+        specificity and Youden's J.
+    """
+    confs = np.asarray(confs, dtype=np.float32)
+    cutoffs_arr = np.asarray(cutoffs, dtype=np.int64)
+    counts = abnormal_counts(predictions, abnormal_id, confs, ious)
+
+    # (A, I, C, N) verdicts against (N,) truth
+    positive = counts[None] > cutoffs_arr[:, None, None, None]
+    truth = np.asarray(truth, dtype=bool)
+    tp = (positive & truth).sum(-1)
+    fp = (positive & ~truth).sum(-1)
+    fn = truth.sum() - tp
+    tn = (~truth).sum() - fp
+    sensitivity = tp / np.maximum(tp + fn, 1)
+    specificity = tn / np.maximum(tn + fp, 1)
+
+    rows = []
+    for a, i, c in np.ndindex(tp.shape):
+        rows.append({
+            "conf": round(float(confs[c]), 4),
+            "iou": float(ious[i]),
+            "cutoff": int(cutoffs_arr[a]),
+            "tp": int(tp[a, i, c]),
+            "fp": int(fp[a, i, c]),
+            "tn": int(tn[a, i, c]),
+            "fn": int(fn[a, i, c]),
+            "sensitivity": round(float(sensitivity[a, i, c]), 4),
+            "specificity": round(float(specificity[a, i, c]), 4),
+            "youden": round(float(sensitivity[a, i, c] + specificity[a, i, c] - 1), 4),
+        })
+    return rows
+
+
+def pareto_front(rows):
+    """
+    Operating points not dominated in (sensitivity, specificity).
+
+    Returns:
+        list: Rows on the front, sorted by sensitivity (one row per point).
+    """
+    points = np.array([(r["sensitivity"], r["specificity"]) for r in rows])
+    order = np.lexsort((-points[:, 1], -points[:, 0]))
+    front, best_spec, seen = [], -1.0, set()
+    for k in order:
+        sens, spec = points[k]
+        if spec > best_spec and (sens, spec) not in seen:
+            front.append(rows[k])
+            seen.add((sens, spec))
+            best_spec = spec
+    return front[::-1]
+
+
+def image_truth(image_paths, abnormal_id, min_abnormal=1):
+    """Ground truth per image: at least ``min_abnormal`` abnormal labels."""
+    return np.array([
+        sum(1 for label in load_yolo_labels(label_path_for(p)) if label[0] == abnormal_id) >= min_abnormal
+        for p in image_paths
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep conf / NMS IoU / abnormal cutoff on a labelled split")
+    parser.add_argument("--model", type=str, help="Model used to predict --images once at --low-conf")
+    parser.add_argument("--predictions", type=str,
+                        help="Stored low-conf predictions (JSONL) instead of --model; exact only if stored "
+                             "without NMS (--iou 1.0), else IoUs stricter than the stored NMS are approximate")
+    parser.add_argument("--images", type=str, default="data_ecg/val/images")
+    parser.add_argument("--data", type=str, default="config/data.yaml", help="Path data.yaml (class names)")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--low-conf", type=float, default=0.01)
+    parser.add_argument("--cache", type=str, help="Prediction cache (SQLite) used with --model")
+    parser.add_argument("--ious", type=float, nargs="+", default=list(DEFAULT_IOUS))
+    parser.add_argument("--max-det", type=int, default=3000,
+                        help="Detections kept per image when predicting without NMS")
+    parser.add_argument("--cutoffs", type=int, nargs="+", default=list(DEFAULT_CUTOFFS))
+    parser.add_argument("--min-abnormal", type=int, default=1, help="Abnormal labels for a truly abnormal image")
+    parser.add_argument("--output", type=str, default="runs/threshold_sweep.csv")
+    args = parser.parse_args()
+    if not (args.model or args.predictions):
+        parser.error("either --model or --predictions is required")
+
+    names = dict(enumerate(load_config(args.data)["names"]))
+    abnormal_id = {v: k for k, v in names.items()}["abnormal"]
+
+    if args.model:
+        cache = PredictionCache(args.cache) if args.cache else None
+        # Predict once with NMS off (IoU 1.0): greedy_nms then gives exact NMS for every --ious value. A keep
+        # decision only depends on higher-scoring boxes, so the max_det cap drops low scorers but never
+        # changes the outcome for the boxes kept
+        model = get_model(args.model, warmup=False)
+        stored = predict_split(
+            model, load_images_from_folder(args.images), conf=args.low_conf, imgsz=args.imgsz, cache=cache,
+            iou=1.0, max_det=args.max_det,
+        )
+    else:
+        stored = load_predictions(args.predictions, names)
+
+    paths = list(stored)
+    t0 = time.perf_counter()
+    confs = DEFAULT_CONFS[DEFAULT_CONFS >= args.low_conf]
+    rows = sweep(
+        [stored[p] for p in paths], image_truth(paths, abnormal_id, args.min_abnormal), abnormal_id,
+        confs=confs, ious=args.ious, cutoffs=args.cutoffs,
+    )
+    elapsed = time.perf_counter() - t0
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"{len(rows)} operating points on {len(paths)} images in {elapsed:.2f}s -> {args.output}")
+    print("Pareto front (sensitivity vs specificity):")
+    print(f"{'conf':>6} {'iou':>5} {'cutoff':>6} {'sens':>6} {'spec':>6}")
+    for r in pareto_front(rows):
+        print(f"{r['conf']:>6.2f} {r['iou']:>5.2f} {r['cutoff']:>6d} {r['sensitivity']:>6.3f} {r['specificity']:>6.3f}")
@@ -0,0 +1,215 @@
+# vectorized ECG verdict engine shared by every prediction path
+import copy
+import os
+
+import numpy as np
+
+from src.utils.config import load_config
+
+DEFAULT_POLICY_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "config", "policy.yaml"))
+
+DEFAULT_POLICY = {
+    "abnormal_class": "abnormal",
+    "conf": 0.3,
+    "class_conf": {},
+    "severe_threshold": 5,
+    "no_abnormal": "other",
+    "messages": {
+        "normal": "✅ Detak jantung sehat (Normal)",
+        "severe": "⚠️ Detak jantung abnormal, perlu istirahat dan konsultasi dokter",
+        "mild": "⚠️ Detak jantung abnormal ringan, kurangi merokok, makan sehat, dan tambahkan waktu olahraga",
+        "other": "⚠️ Deteksi muncul tapi bukan label 'abnormal'",
+    },
+}
+
+LEVELS = np.array(["normal", "mild", "severe", "other"])
+
+
+def load_policy(path=None, profile=None):
+    """
+    Load the verdict policy, optionally applying a profile override.
+
+    Args:
+        path (str): Policy YAML; defaults to ``config/policy.yaml`` (built-in
+            defaults when that file is absent).
+        profile (str): Profile name under ``profiles`` (e.g. 'gradio').
+
+    Returns:
+        dict: Policy with every key of ``DEFAULT_POLICY`` filled in.
+
+    Raises:
+        FileNotFoundError: If an explicitly given ``path`` does not exist.
+    """
+    if path and not os.path.exists(path):
+        raise FileNotFoundError(f"Policy tidak ditemukan: {path}")
+    path = path or DEFAULT_POLICY_PATH
+    policy = copy.deepcopy(DEFAULT_POLICY)
+    raw = load_config(path) if os.path.exists(path) else {}
+    raw = raw or {}
+    profiles = raw.pop("profiles", {}) or {}
+    for layer in (raw, profiles.get(profile, {}) if profile else {}):
+        for key, value in layer.items():
+            if isinstance(value, dict) and isinstance(policy.get(key), dict):
+                policy[key].update(value)
+            else:
+                policy[key] = value
+    return policy
+
+
+def inference_conf(policy):
+    """Lowest cutoff in the policy; models must predict at least this low."""
+    return min([float(policy["conf"])] + [float(v) for v in (policy.get("class_conf") or {}).values()])
+
+
+def detection_arrays(result):
+    """
+    Return (class ids, confidences) of one image as NumPy arrays.
+
+    Accepts Ultralytics Results as well as ``Detections``.
+    """
+    if hasattr(result, "boxes") and hasattr(result.boxes, "cls"):
+        return result.boxes.cls.cpu().numpy(), result.boxes.conf.cpu().numpy()
+    return result.classes, result.scores
+
+
+class ImageVerdict:
+    """
+    Verdict of one image.
+
+    Attributes:
+        level (str): 'normal', 'mild', 'severe' or 'other'.
+        status (str): Human readable message from the policy.
+        n_abnormal (int): Abnormal detections above the cutoff.
+        n_detections (int): All detections above the cutoff.
+        counts (dict): {class name: count} above the cutoff.
+    """
+
+    __slots__ = ("level", "status", "n_abnormal", "n_detections", "counts")
+
+    def __init__(self, level, status, n_abnormal, n_detections, counts):
+        self.level = level
+        self.status = status
+        self.n_abnormal = n_abnormal
+        self.n_detections = n_detections
+        self.counts = counts
+
+    def to_dict(self):
+        return {
+            "verdict": self.status,
+            "level": self.level,
+            "n_abnormal": self.n_abnormal,
+            "n_detections": self.n_detections,
+            "counts": self.counts,
+        }
+
+
+class VerdictEngine:
+    """
+    Turn batches of detections into per-image ECG verdicts.
+
+    All detections of a batch are concatenated once and filtered, counted
+    and classified with array operations (no per-box Python loop).
+
+    Args:
+        names (dict): Class id -> name mapping (``model.names``).
+        policy (dict): Policy from ``load_policy``; defaults to the CLI profile.
+    """
+
+    def __init__(self, names, policy=None):
+        self.names = dict(names)
+        self.policy = policy or load_policy(profile="cli")
+        self.nc = max(self.names) + 1
+        ids = {name: i for i, name in self.names.items()}
+        self.abnormal_id = ids.get(self.policy["abnormal_class"], -1)
+
+        # Confidence cutoff per class id, looked up with fancy indexing
+        self.cutoffs = np.full(self.nc, float(self.policy["conf"]), dtype=np.float32)
+        for name, value in (self.policy.get("class_conf") or {}).items():
+            if name in ids:
+                self.cutoffs[ids[name]] = float(value)
+
+    def count(self, results):
+        """
+        Count detections per image and class above the cutoffs.
+
+        Args:
+            results (list): Ultralytics Results or ``Detections`` (one per image).
+
+        Returns:
+            numpy.ndarray: (n_images, n_classes) int64 count matrix.
+        """
+        n = len(results)
+        if n == 0:
+            return np.zeros((0, self.nc), dtype=np.int64)
+
+        arrays = [detection_arrays(r) for r in results]
+        lengths = np.fromiter((len(c) for c, _ in arrays), dtype=np.int64, count=n)
+        if lengths.sum() == 0:
+            return np.zeros((n, self.nc), dtype=np.int64)
+
+        cls = np.concatenate([c for c, _ in arrays]).astype(np.int64)
+        conf = np.concatenate([s for _, s in arrays]).astype(np.float32)
+        image = np.repeat(np.arange(n), lengths)
+
+        # Ids the names do not cover (a checkpoint with extra classes, a bad stored record) are not counted
+        valid = (cls >= 0) & (cls < self.nc)
+        keep = valid & (conf >= self.cutoffs[np.where(valid, cls, 0)])
+        flat = image[keep] * self.nc + cls[keep]
+        return np.bincount(flat, minlength=n * self.nc).reshape(n, self.nc)
+
+    def levels(self, counts):
+        """
+        Classify count rows into verdict levels.
+
+        Args:
+            counts (numpy.ndarray): (n_images, n_classes) count matrix.
+
+        Returns:
+            tuple: (levels array of str, abnormal counts, detection counts)
+        """
+        total = counts.sum(axis=1)
+        abnormal = counts[:, self.abnormal_id] if self.abnormal_id >= 0 else np.zeros(len(counts), np.int64)
+        no_abnormal = 0 if self.policy["no_abnormal"] == "normal" else 3
+        index = np.select(
+            [total == 0, abnormal > self.policy["severe_threshold"], abnormal > 0],
+            [0, 2, 1],
+            default=no_abnormal,
+        )
+        return LEVELS[index], abnormal, total
+
+    def analyze(self, results):
+        """
+        Compute structured verdicts for a batch of images.
+
+        Args:
+            results (list): Ultralytics Results or ``Detections`` (one per image).
+
+        Returns:
+            list: One ``ImageVerdict`` per image.
+        """
+        counts = self.count(results)
+        levels, abnormal, total = self.levels(counts)
+        messages = self.policy["messages"]
+        names = [self.names.get(i, str(i)) for i in range(self.nc)]
+        return [
+            ImageVerdict(str(level), messages[str(level)], int(a), int(t), dict(zip(names, row.tolist())))
+            for level, a, t, row in zip(levels, abnormal, total, counts)
+        ]
+
+
+def analyze_ecg_results(results, names, policy=None):
+    """
+    Verdict for one prediction call (all results counted as one scan).
+
+    Args:
+        results (list): Ultralytics Results of one image.
+        names (dict): Class id -> name mapping.
+        policy (dict): Verdict policy.
+
+    Returns:
+        tuple: (status message, abnormal count)
+    """
+    engine = VerdictEngine(names, policy)
+    counts = engine.count(results).sum(axis=0, keepdims=True)
+    levels, abnormal, _ = engine.levels(counts)
+    return engine.policy["messages"][str(levels[0])], int(abnormal[0])
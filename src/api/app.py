@@ -0,0 +1,193 @@
+# FastAPI inference service backed by the dynamic batcher
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from src.api.batcher import BatchTooLargeError, DynamicBatcher, QueueFullError
+from src.analysis.verdict import VerdictEngine, inference_conf, load_policy
+from src.models.batch_predict import build_records
+from src.models.cascade import CascadePredictor
+from src.models.inference import predict_batches
+from src.models.prediction_cache import PredictionCache
+from src.models.registry import get_model
+from src.models.result_store import ResultStore
+from src.utils import tracing
+from src.utils.decode import decode_source
+
+
+def load_settings():
+    """Read service settings from ECG_* environment variables."""
+    return {
+        "model_path": os.environ.get("ECG_MODEL_PATH", "runs/yolo11s/last.pt"),
+        "device": os.environ.get("ECG_DEVICE") or None,
+        # None: config/policy.yaml when present, else the built-in defaults
+        "policy": os.environ.get("ECG_POLICY") or None,
+        "imgsz": int(os.environ.get("ECG_IMGSZ", 640)),
+        "max_batch_size": int(os.environ.get("ECG_MAX_BATCH", 8)),
+        "max_wait_ms": float(os.environ.get("ECG_MAX_WAIT_MS", 10)),
+        "max_queue_size": int(os.environ.get("ECG_QUEUE_SIZE", 64)),
+        "cache": os.environ.get("ECG_CACHE") or None,
+        # Prediction history (SQLite); off unless set
+        "results": os.environ.get("ECG_RESULTS") or None,
+        # Calibrated cascade JSON; replaces model_path when set
+        "cascade": os.environ.get("ECG_CASCADE") or None,
+        "tile": os.environ.get("ECG_TILE", "never"),
+        # Tracing is on by default for the service so /metrics has data
+        "trace": os.environ.get("ECG_TRACE", "1").lower() not in ("0", "false", "no"),
+    }
+
+
+def decode_upload(data, imgsz=None):
+    """Decode uploaded image bytes (no larger than inference at ``imgsz`` needs)."""
+    with tracing.stage("decode"):
+        image = decode_source(data, imgsz)
+    if image is None:
+        raise HTTPException(status_code=400, detail="File bukan gambar yang valid")
+    return image
+
+
+def create_app(settings=None, loader=get_model):
+    """
+    Build the inference service.
+
+    Args:
+        settings (dict): Overrides for ``load_settings()``.
+        loader (callable): ``loader(path, device)`` returning a warm model.
+
+    Returns:
+        FastAPI: Application with /health, /ready, /metrics, /predict and
+        /predict/batch.
+    """
+    config = load_settings()
+    config.update(settings or {})
+    if config["trace"]:
+        tracing.TRACER.enable()
+    policy = load_policy(config["policy"], profile="api")
+    cache = PredictionCache(config["cache"]) if config["cache"] else None
+    store = ResultStore(config["results"]) if config["results"] else None
+    state = {"model": None, "engine": None, "error": None}
+    # Tiles are cut from the full-resolution image, so a tiling service cannot decode small
+    decode_size = config["imgsz"] if config["tile"] == "never" else None
+
+    def predict_fn(images):
+        model = state["model"]
+        outputs = list(
+            predict_batches(
+                model, images, conf=inference_conf(policy), imgsz=config["imgsz"], batch=len(images), cache=cache,
+                tile={"mode": config["tile"]} if config["tile"] != "never" else None,
+            )
+        )
+        _, detections, timings = zip(*outputs)
+        return build_records([None] * len(images), detections, state["engine"], timings)
+
+    batcher = DynamicBatcher(
+        predict_fn,
+        max_batch_size=config["max_batch_size"],
+        max_wait_ms=config["max_wait_ms"],
+        max_queue_size=config["max_queue_size"],
+    )
+
+    async def load_model():
+        try:
+            if config["cascade"]:
+                model = await asyncio.to_thread(
+                    CascadePredictor.from_calibration, config["cascade"], policy,
+                    lambda path: loader(path, config["device"]),
+                )
+            else:
+                model = await asyncio.to_thread(loader, config["model_path"], config["device"])
+            state["engine"] = VerdictEngine(model.names, policy)
+            state["model"] = model
+        except Exception as e:
+            state["error"] = repr(e)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await batcher.start()
+        loader = asyncio.create_task(load_model())
+        yield
+        loader.cancel()
+        await batcher.stop()
+        if store is not None:
+            await asyncio.to_thread(store.close)
+
+    app = FastAPI(title="ECG Detection API", lifespan=lifespan)
+
+    async def run(images, names, uploads):
+        if state["model"] is None:
+            raise HTTPException(status_code=503, detail="Model belum siap")
+        try:
+            with tracing.stage("queue_and_batch"):
+                records = await batcher.submit(images)
+        except BatchTooLargeError as e:
+            # Retrying cannot help: the client must split the request
+            tracing.count("rejected")
+            raise HTTPException(status_code=413, detail=str(e))
+        except QueueFullError as e:
+            tracing.count("rejected")
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+        for record, name in zip(records, names):
+            record["path"] = name
+        if store is not None:
+            # Hashing the upload bytes and writing happen on the store's thread
+            store.add(records, state["engine"].names, state["model"], "api", uploads)
+        return records
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "ok",
+            "ready": state["model"] is not None,
+            "model_path": config["model_path"],
+            "error": state["error"],
+            "queue": {"pending": batcher.pending, "max": config["max_queue_size"]},
+            "batcher": batcher.stats,
+            "cache": {"hits": cache.hits, "misses": cache.misses} if cache else None,
+            "results": {"written": store.written, "dropped": store.dropped} if store is not None else None,
+        }
+
+    @app.get("/ready")
+    async def ready():
+        if state["model"] is None:
+            return JSONResponse(status_code=503, content={"ready": False, "error": state["error"]})
+        return {"ready": True}
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(tracing.TRACER.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    async def read_upload(file):
+        with tracing.stage("upload"):
+            data = await file.read()
+        # A full PNG decode takes long enough to stall other requests and the batcher's wait timer
+        return data, await asyncio.to_thread(decode_upload, data, decode_size)
+
+    @app.post("/predict")
+    async def predict(file: UploadFile = File(...)):
+        with tracing.span("request", route="/predict", files=1):
+            data, image = await read_upload(file)
+            records = await run([image], [file.filename], [data])
+        return records[0]
+
+    @app.post("/predict/batch")
+    async def predict_batch(files: List[UploadFile] = File(...)):
+        with tracing.span("request", route="/predict/batch", files=len(files)):
+            uploads = [await read_upload(f) for f in files]
+            results = await run([image for _, image in uploads], [f.filename for f in files],
+                                [data for data, _ in uploads])
+        return {"results": results}
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.environ.get("ECG_HOST", "127.0.0.1"), port=int(os.environ.get("ECG_PORT", 8000)))
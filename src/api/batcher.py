@@ -0,0 +1,131 @@
+# dynamic micro-batching for the inference service
+import asyncio
+import time
+
+from src.utils import tracing
+
+
+class QueueFullError(Exception):
+    """Raised when the batcher queue cannot accept more images."""
+
+
+class BatchTooLargeError(QueueFullError):
+    """Raised when one request alone has more images than the queue holds."""
+
+
+class DynamicBatcher:
+    """
+    Collect concurrent requests and run them as one batched call.
+
+    The worker waits for the first queued item, then keeps collecting until
+    ``max_batch_size`` items are gathered or ``max_wait_ms`` has passed, and
+    runs ``predict_fn`` once for the whole batch in a worker thread. Stages
+    traced inside ``predict_fn`` are recorded in the span of every request
+    in the batch.
+
+    Args:
+        predict_fn (callable): Sync function mapping a list of inputs to a
+            list of outputs of the same length.
+        max_batch_size (int): Maximum inputs per call.
+        max_wait_ms (float): Maximum time to wait for a batch to fill.
+        max_queue_size (int): Maximum pending inputs before rejecting.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=8, max_wait_ms=10, max_queue_size=64):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._worker = None
+        self.stats = {"batches": 0, "items": 0, "rejected": 0}
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, items):
+        """
+        Queue inputs and wait for their outputs.
+
+        Args:
+            items (list): Inputs for ``predict_fn``.
+
+        Returns:
+            list: Outputs in the same order as ``items``.
+
+        Raises:
+            BatchTooLargeError: If ``items`` can never fit (more than ``max_queue_size``).
+            QueueFullError: If the queue has no room for all ``items`` right now.
+        """
+        if self._queue is None:
+            raise RuntimeError("Batcher is not started")
+        if len(items) > self.max_queue_size:
+            self.stats["rejected"] += len(items)
+            raise BatchTooLargeError(f"too many images ({len(items)} > {self.max_queue_size})")
+        # Check-then-put is atomic here: no await between them
+        if self.pending + len(items) > self.max_queue_size:
+            self.stats["rejected"] += len(items)
+            raise QueueFullError(f"queue full ({self.pending}/{self.max_queue_size})")
+
+        loop = asyncio.get_running_loop()
+        span = tracing.current_span()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._queue.put_nowait((item, future, span))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _collect(self):
+        """Wait for one item, then fill the batch until size or time limit."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _predict(self, batch):
+        with tracing.attach([span for _, _, span in batch]):
+            return self.predict_fn([item for item, _, _ in batch])
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Drop items whose caller already went away
+            batch = [(item, fut, span) for item, fut, span in batch if not fut.done()]
+            if not batch:
+                continue
+            try:
+                # to_thread runs in a copy of this context, so attach() stays local to the call
+                outputs = await asyncio.to_thread(self._predict, batch)
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+            for (_, fut, _), output in zip(batch, outputs):
+                if not fut.done():
+                    fut.set_result(output)
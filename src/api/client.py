@@ -0,0 +1,128 @@
+# load-test client for the inference service (stdlib only)
+import argparse
+import json
+import mimetypes
+import os
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.batch_predict import collect_images
+
+
+def encode_multipart(field, files):
+    """
+    Encode files as a multipart/form-data body.
+
+    Args:
+        field (str): Form field name ('file' or 'files').
+        files (list): Image paths.
+
+    Returns:
+        tuple: (body bytes, content type header)
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for path in files:
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        with open(path, "rb") as f:
+            data = f.read()
+        parts.append(
+            (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{field}"; filename="{os.path.basename(path)}"\r\n'
+                f"Content-Type: {ctype}\r\n\r\n"
+            ).encode()
+            + data
+            + b"\r\n"
+        )
+    body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def post_images(url, files, timeout=60):
+    """
+    POST images to /predict (one file) or /predict/batch (several files).
+
+    Returns:
+        tuple: (HTTP status, parsed JSON or error text, latency in ms)
+    """
+    endpoint = "/predict" if len(files) == 1 else "/predict/batch"
+    body, ctype = encode_multipart("file" if len(files) == 1 else "files", files)
+    request = urllib.request.Request(url.rstrip("/") + endpoint, data=body, headers={"Content-Type": ctype})
+
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, payload = response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        status, payload = e.code, e.read().decode(errors="replace")
+    return status, payload, (time.perf_counter() - t0) * 1000
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list (q in [0, 100])."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def load_test(url, images, requests=100, concurrency=8, per_request=1):
+    """
+    Fire ``requests`` requests with ``concurrency`` parallel clients.
+
+    Args:
+        url (str): Service base URL.
+        images (list): Image paths, reused round-robin.
+        requests (int): Total requests.
+        concurrency (int): Parallel in-flight requests.
+        per_request (int): Images per request (>1 uses /predict/batch).
+
+    Returns:
+        dict: Throughput, latency percentiles and status code counts.
+    """
+    jobs = [
+        [images[(i * per_request + j) % len(images)] for j in range(per_request)]
+        for i in range(requests)
+    ]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda files: post_images(url, files), jobs))
+    elapsed = time.perf_counter() - t0
+
+    latencies = [ms for status, _, ms in results if status == 200]
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "images_per_request": per_request,
+        "elapsed_s": round(elapsed, 3),
+        "images_per_s": round(len(latencies) * per_request / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {q: round(percentile(latencies, q), 2) for q in (50, 95, 99)},
+        "status_codes": statuses,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the ECG inference service")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8000")
+    parser.add_argument("--images", type=str, nargs="+", default=["data_ecg/val/images"])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-request", type=int, default=1)
+    args = parser.parse_args()
+
+    report = load_test(
+        args.url,
+        collect_images(args.images),
+        requests=args.requests,
+        concurrency=args.concurrency,
+        per_request=args.per_request,
+    )
+    print(json.dumps(report, indent=2))
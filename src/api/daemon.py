@@ -0,0 +1,225 @@
+# warm prediction daemon on a Unix socket, for cheap per-file CLI calls
+import argparse
+import base64
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+# Allow `python src/api/daemon.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.verdict import VerdictEngine, inference_conf, load_policy
+from src.api.daemon_client import DEFAULT_SOCKET, recv_message, request, send_message
+from src.models.batch_predict import build_records, collect_images, predict_safely
+from src.models.prediction_cache import PredictionCache
+from src.models.registry import get_model
+from src.models.result_store import ResultStore
+from src.utils import tracing
+from src.utils.decode import decode_source
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection: JSON-line requests answered in order."""
+
+    def handle(self):
+        while True:
+            try:
+                message = recv_message(self.rfile)
+            except ValueError as e:
+                send_message(self.wfile, {"ok": False, "error": f"Pesan tidak valid: {e}"})
+                return
+            if message is None:
+                return
+            send_message(self.wfile, self.server.handle_message(message))
+
+
+class PredictionDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-running prediction server that keeps models warm.
+
+    Clients (see ``daemon_client.py``) send newline-delimited JSON requests
+    over a Unix socket, so a per-file shell call costs a socket round trip
+    instead of importing torch and loading weights. Connections are served
+    on threads but inference is serialized: on a CPU host parallel forward
+    passes only compete for the same cores.
+
+    Args:
+        socket_path (str): Unix socket to listen on.
+        model_path (str): Default model, loaded and warmed at start.
+        policy (dict): Verdict policy (CLI profile by default).
+        imgsz (int): Default inference image size.
+        batch (int): Images per forward pass.
+        device (str): Inference device, None for the Ultralytics default.
+        cache (PredictionCache): Optional prediction cache.
+        tile (str): Default tile mode ('never', 'auto' or 'always').
+        store (ResultStore): Optional prediction history to record into.
+        loader (callable): ``loader(model_path, device)`` returning a model.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, model_path, policy=None, imgsz=640, batch=16, device=None, cache=None,
+                 tile="never", store=None, loader=get_model):
+        self.socket_path = socket_path
+        self.model_path = model_path
+        self.policy = policy or load_policy(profile="cli")
+        self.imgsz = imgsz
+        self.batch = batch
+        self.device = device
+        self.cache = cache
+        self.tile = tile
+        self.store = store
+        self.loader = loader
+        self.started = time.time()
+        self.stats = {"requests": 0, "images": 0, "errors": 0}
+        self._predict_lock = threading.Lock()
+        # Handler threads update the counters concurrently (errors outside the predict lock)
+        self._stats_lock = threading.Lock()
+
+        _remove_stale_socket(socket_path)
+        self.loader(model_path, device)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        if self.store is not None:
+            self.store.close()
+
+    def handle_message(self, message):
+        """
+        Answer one request.
+
+        Returns:
+            dict: Reply with ``ok`` and the result, or ``error``.
+        """
+        op = message.get("op")
+        try:
+            if op == "predict":
+                return {"ok": True, "records": self.predict(message)}
+            if op == "ping":
+                with self._stats_lock:
+                    stats = dict(self.stats)
+                return {
+                    "ok": True,
+                    "pid": os.getpid(),
+                    "model_path": self.model_path,
+                    "uptime_s": round(time.time() - self.started, 1),
+                    **stats,
+                }
+            if op == "shutdown":
+                # shutdown() waits for serve_forever, so it cannot run on a handler thread
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return {"ok": True}
+            return {"ok": False, "error": f"Operasi tidak dikenal: {op!r}"}
+        except Exception as e:
+            with self._stats_lock:
+                self.stats["errors"] += 1
+            return {"ok": False, "error": repr(e)}
+
+    def predict(self, message):
+        """
+        Predict the paths and inline images of a request.
+
+        Returns:
+            list: One record per image, like ``run_batch_prediction`` writes;
+            unreadable images get an ``error`` record.
+        """
+        imgsz = message.get("imgsz", self.imgsz)
+        tile = message.get("tile", self.tile)
+        # Tiles are cut from the full-resolution image, so tiled requests cannot decode small
+        decode_size = imgsz if tile == "never" else None
+        items = [(path, path) for path in collect_images(message.get("paths") or [])]
+        # What the result store hashes: the file, or the bytes as sent
+        raw = [path for path, _ in items]
+        for i, item in enumerate(message.get("images") or []):
+            data = base64.b64decode(item["data"])
+            items.append((item.get("name") or f"<image {i}>", decode_source(data, decode_size)))
+            raw.append(data)
+        records = [{"path": name, "error": "File bukan gambar yang valid"} for name, _ in items]
+        todo = [i for i, (_, source) in enumerate(items) if source is not None]
+
+        policy = self.policy if message.get("conf") is None else {**self.policy, "conf": message["conf"]}
+        with self._predict_lock, tracing.span("daemon_predict", images=len(todo)):
+            model_path = message.get("model") or self.model_path
+            model = self.loader(model_path, self.device)
+            engine = VerdictEngine(model.names, policy)
+            chunks = predict_safely(
+                model, [items[i][1] for i in todo], inference_conf(policy), imgsz,
+                self.batch, self.cache, {"mode": tile} if tile != "never" else None,
+            )
+            outputs = [output for chunk in chunks for output in chunk]
+
+        done = []
+        for i, (_, detections, timings) in zip(todo, outputs):
+            if detections is None:
+                records[i]["error"] = timings
+            else:
+                done.append((i, detections, timings))
+        if done:
+            index, detections, timings = zip(*done)
+            done_records = build_records([items[i][0] for i in index], detections, engine, timings)
+            for i, record in zip(index, done_records):
+                records[i] = record
+            if self.store is not None:
+                self.store.add(done_records, model.names, model_path, "daemon", [raw[i] for i in index], detections)
+
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["images"] += len(items)
+        return records
+
+
+def _remove_stale_socket(socket_path):
+    """Remove a socket left by a crashed daemon; refuse to steal a live one."""
+    if not os.path.exists(socket_path):
+        return
+    try:
+        request({"op": "ping"}, socket_path, timeout=1)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise RuntimeError(f"Daemon sudah berjalan di {socket_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daemon prediksi ECG dengan model yang tetap hangat")
+    parser.add_argument("--socket", type=str, default=DEFAULT_SOCKET, help="Unix socket (default ECG_SOCKET)")
+    parser.add_argument("--model", type=str, default=os.environ.get("ECG_MODEL_PATH", "runs/yolo11s/last.pt"))
+    parser.add_argument("--device", type=str, default=os.environ.get("ECG_DEVICE") or None)
+    parser.add_argument("--policy", type=str, default=os.environ.get("ECG_POLICY") or None,
+                        help="Path policy verdict (default config/policy.yaml)")
+    parser.add_argument("--imgsz", type=int, default=int(os.environ.get("ECG_IMGSZ", 640)))
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--cache", type=str, default=os.environ.get("ECG_CACHE") or None,
+                        help="Cache prediksi (SQLite) di path ini")
+    parser.add_argument("--results", type=str, default=os.environ.get("ECG_RESULTS") or None,
+                        help="Simpan riwayat hasil prediksi (SQLite) di path ini")
+    parser.add_argument("--tile", type=str, choices=["never", "auto", "always"],
+                        default=os.environ.get("ECG_TILE", "never"))
+    args = parser.parse_args()
+
+    server = PredictionDaemon(
+        args.socket,
+        os.path.abspath(args.model),
+        policy=load_policy(args.policy, profile="cli"),
+        imgsz=args.imgsz,
+        batch=args.batch,
+        device=args.device,
+        cache=PredictionCache(args.cache) if args.cache else None,
+        tile=args.tile,
+        store=ResultStore(args.results) if args.results else None,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    print(f"Daemon siap di {args.socket} (model {args.model})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,137 @@
+# thin client of the warm prediction daemon (stdlib only, starts in milliseconds)
+import argparse
+import base64
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# Heavy modules (torch, ultralytics, numpy, cv2) must never be imported here:
+# this file is also the wire protocol shared with src/api/daemon.py.
+DEFAULT_SOCKET = os.environ.get("ECG_SOCKET") or os.path.join(tempfile.gettempdir(), "ecg_predict.sock")
+
+
+def send_message(stream, message):
+    """Write one message (a JSON line) to a socket file."""
+    stream.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+    stream.flush()
+
+
+def recv_message(stream):
+    """Read one message from a socket file; None at end of stream."""
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+
+def request(message, socket_path=DEFAULT_SOCKET, timeout=300):
+    """
+    Send one request to the daemon and wait for its reply.
+
+    Args:
+        message (dict): Request with an ``op`` ('predict', 'ping' or 'shutdown').
+        socket_path (str): Unix socket of the daemon.
+        timeout (float): Socket timeout in seconds.
+
+    Returns:
+        dict: Reply with ``ok`` and either the result or ``error``.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        with sock.makefile("rwb") as stream:
+            send_message(stream, message)
+            reply = recv_message(stream)
+    if reply is None:
+        raise ConnectionError("Daemon menutup koneksi tanpa jawaban")
+    return reply
+
+
+def predict_message(sources, send_bytes=False, **options):
+    """
+    Build a predict request.
+
+    Paths (and a local ``model`` file) are made absolute since the daemon
+    runs in another working directory; with ``send_bytes`` the files are read here and sent inline,
+    for daemons that cannot see the client's filesystem. '-' reads one image
+    from stdin.
+
+    Args:
+        sources (list): Image files, directories, globs, list files or '-'.
+        send_bytes (bool): Send file contents instead of paths.
+        **options: Optional model, conf, imgsz and tile overrides.
+
+    Returns:
+        dict: Request message.
+    """
+    paths, images = [], []
+    for source in sources:
+        if source == "-":
+            images.append({"name": "<stdin>", "data": base64.b64encode(sys.stdin.buffer.read()).decode()})
+        elif send_bytes:
+            with open(source, "rb") as f:
+                images.append({"name": source, "data": base64.b64encode(f.read()).decode()})
+        else:
+            paths.append(os.path.abspath(source))
+    if options.get("model") and os.path.exists(options["model"]):
+        # Names that are not local files (e.g. 'yolo11n.pt' to download) pass through as sent
+        options["model"] = os.path.abspath(options["model"])
+    message = {"op": "predict", "paths": paths, "images": images}
+    message.update({k: v for k, v in options.items() if v is not None})
+    return message
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediksi ECG lewat daemon (model tetap hangat)")
+    parser.add_argument("images", type=str, nargs="*",
+                        help="Gambar ECG, folder, pola glob, file .txt berisi daftar gambar, atau '-' (stdin)")
+    parser.add_argument("--socket", type=str, default=DEFAULT_SOCKET, help="Unix socket daemon")
+    parser.add_argument("--model", type=str, help="Path model (default: model daemon)")
+    parser.add_argument("--conf", type=float, help="Confidence threshold (default dari policy daemon)")
+    parser.add_argument("--imgsz", type=int)
+    parser.add_argument("--tile", type=str, choices=["never", "auto", "always"])
+    parser.add_argument("--send-bytes", action="store_true", help="Kirim isi file, bukan path")
+    parser.add_argument("--json", action="store_true", help="Selalu tulis record JSONL")
+    parser.add_argument("--ping", action="store_true", help="Cek status daemon")
+    parser.add_argument("--shutdown", action="store_true", help="Hentikan daemon")
+    args = parser.parse_args(argv)
+
+    if args.ping or args.shutdown:
+        message = {"op": "ping" if args.ping else "shutdown"}
+    elif args.images:
+        try:
+            message = predict_message(
+                args.images, args.send_bytes, model=args.model, conf=args.conf, imgsz=args.imgsz, tile=args.tile
+            )
+        except OSError as e:
+            print(f"Gagal membaca gambar: {e}", file=sys.stderr)
+            return 1
+    else:
+        parser.error("Harap berikan gambar ECG, --ping, atau --shutdown")
+
+    try:
+        reply = request(message, args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Daemon tidak berjalan di {args.socket} (jalankan: python src/api/daemon.py)", file=sys.stderr)
+        return 2
+    if not reply.get("ok"):
+        print(f"Gagal: {reply.get('error')}", file=sys.stderr)
+        return 1
+
+    if message["op"] != "predict":
+        print(json.dumps(reply, indent=2, ensure_ascii=False))
+        return 0
+
+    records = reply["records"]
+    if len(records) == 1 and not args.json and not records[0].get("error"):
+        # Same output as `python src/main.py --mode predict` on one image
+        print(records[0]["verdict"])
+        print(f"Jumlah abnormal terdeteksi: {records[0]['n_abnormal']}")
+    else:
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False))
+    return 1 if any(r.get("error") for r in records) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,118 @@
 # functions to load ECG images
 import os
 import glob
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import cv2
+import numpy as np
+
+from src.utils.decode import decode_source
 
-def load_images_from_folder(folder, extensions=("*.jpg", "*.png")):
+def load_images_from_folder(folder, extensions=("*.jpg", "*.png"), index=None):
     """
     Load image file paths from a folder.
     
     Args:
         folder (str): Path to the folder containing images.
         extensions (tuple): File extensions to search for.
+        index (LabelIndex): Optional dataset index; paths are taken from it
+            instead of globbing the folder.
     
     Returns:
         list: List of image file paths.
     """
+    if index is not None:
+        folder = os.path.abspath(folder)
+        suffixes = tuple(ext.lstrip("*") for ext in extensions)
+        return [
+            p for p in index.image_paths()
+            if os.path.dirname(os.path.abspath(p)) == folder and p.endswith(suffixes)
+        ]
+
     image_paths = []
     for ext in extensions:
         image_paths.extend(glob.glob(os.path.join(folder, ext)))
     return image_paths
 
 
+def label_path_for(image_path):
+    """
+    Locate the YOLO label file of an image.
+
+    Uses the dataset layout ``<split>/images/x.jpg -> <split>/labels/x.txt``
+    and falls back to ``x.txt`` next to the image.
+
+    Args:
+        image_path (str): Path to the image file.
+
+    Returns:
+        str: Path to the label file (may not exist).
+    """
+    stem = os.path.splitext(image_path)[0]
+    parts = stem.split(os.sep)
+    if "images" in parts:
+        i = len(parts) - 1 - parts[::-1].index("images")
+        candidate = os.sep.join(parts[:i] + ["labels"] + parts[i + 1:]) + ".txt"
+        if os.path.exists(candidate):
+            return candidate
+    return stem + ".txt"
+
+
+def parse_yolo_labels(text):
+    """
+    Parse the contents of a YOLO label file in one pass.
+
+    Lines are split into fields first and all well-formed rows are
+    converted to floats with a single NumPy call; only when that fails
+    (a non-numeric field) are the rows converted one by one to find the
+    culprits. Blank lines are ignored.
+
+    Args:
+        text (str): Label file contents.
+
+    Returns:
+        labels (numpy.ndarray): (N, 5) float64 rows [class_id, x, y, w, h].
+        lines (numpy.ndarray): (N,) 1-based line number of every row.
+        malformed (list): 1-based line numbers that are not 5 numbers.
+    """
+    fields = [line.split() for line in text.splitlines()]
+    keep = [i for i, row in enumerate(fields) if len(row) == 5]
+    malformed = [i + 1 for i, row in enumerate(fields) if row and len(row) != 5]
+    try:
+        labels = np.array([fields[i] for i in keep], dtype=np.float64).reshape(-1, 5)
+    except ValueError:
+        rows, parsed = [], []
+        for i in keep:
+            try:
+                rows.append([float(v) for v in fields[i]])
+                parsed.append(i)
+            except ValueError:
+                malformed.append(i + 1)
+        labels = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        keep = parsed
+        malformed.sort()
+    return labels, np.array(keep, dtype=np.int64) + 1, malformed
+
+
+def read_yolo_labels(label_path):
+    """
+    Load a YOLO label file as an array (malformed lines are skipped).
+
+    Args:
+        label_path (str): Path to the YOLO label file (.txt).
+
+    Returns:
+        numpy.ndarray: (N, 5) float64 rows [class_id, x, y, w, h]; empty when
+        the file does not exist.
+    """
+    if not os.path.exists(label_path):
+        return np.zeros((0, 5), dtype=np.float64)
+    with open(label_path, "r") as f:
+        return parse_yolo_labels(f.read())[0]
+
+
 def load_yolo_labels(label_path):
     """
     Load YOLO format labels from a .txt file.
@@ -30,42 +123,158 @@ def load_yolo_labels(label_path):
     Returns:
         list: List of annotations [class_id, x_center, y_center, width, height].
     """
-    if not os.path.exists(label_path):
-        return []
-    
-    with open(label_path, "r") as f:
-        lines = f.readlines()
-    
-    labels = []
-    for line in lines:
-        parts = line.strip().split()
-        if len(parts) == 5:  # YOLO format
-            class_id, x, y, w, h = map(float, parts)
-            labels.append([int(class_id), x, y, w, h])
-    return labels
+    return [[int(row[0]), *row[1:]] for row in read_yolo_labels(label_path).tolist()]
 
 
-def load_image_and_labels(image_path):
+def load_image_and_labels(image_path, index=None):
     """
     Load an image and its corresponding YOLO labels.
     
     Args:
         image_path (str): Path to the image file.
+        index (LabelIndex): Optional dataset index to read labels from.
     
     Returns:
         image (numpy.ndarray): Loaded image (BGR).
         labels (list): YOLO labels for the image.
     """
-    # Load image
-    image = cv2.imread(image_path)
+    # Load image (upright, like cv2.imread)
+    decoded = decode_source(image_path)
+    image = decoded.image if decoded is not None else None
     
-    # Find label file (same name but .txt)
-    label_path = os.path.splitext(image_path)[0] + ".txt"
-    labels = load_yolo_labels(label_path)
+    row = index.find(image_path) if index is not None else None
+    if row is not None:
+        classes, boxes = index.labels(row)
+        labels = [[int(c), *map(float, b)] for c, b in zip(classes, boxes)]
+    else:
+        # Find label file (labels/ folder or same name but .txt)
+        label_path = label_path_for(image_path)
+        labels = load_yolo_labels(label_path)
     
     return image, labels
 
 
+def letterbox(image, imgsz=640, color=(114, 114, 114)):
+    """
+    Resize an image keeping its aspect ratio and pad it to a square.
+
+    Args:
+        image (numpy.ndarray): BGR image.
+        imgsz (int): Output side length.
+        color (tuple): Padding color.
+
+    Returns:
+        image (numpy.ndarray): (imgsz, imgsz, 3) image.
+        ratio (float): Scale applied to the original image.
+        pad (tuple): (left, top) padding in pixels.
+    """
+    height, width = image.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_w, new_h = round(width * ratio), round(height * ratio)
+    if (new_w, new_h) != (width, height):
+        interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+        image = cv2.resize(image, (new_w, new_h), interpolation=interpolation)
+    left, top = (imgsz - new_w) // 2, (imgsz - new_h) // 2
+    image = cv2.copyMakeBorder(
+        image, top, imgsz - new_h - top, left, imgsz - new_w - left, cv2.BORDER_CONSTANT, value=color
+    )
+    return image, ratio, (left, top)
+
+
+def _decode(image_path, imgsz=None, read_labels=True):
+    """Worker of ``iter_images_and_labels``: decode (and letterbox) one image."""
+    decoded = decode_source(image_path, imgsz)
+    image = decoded.image if decoded is not None else None
+    meta = {"orig_shape": decoded.orig_shape if decoded is not None else None, "ratio": 1.0, "pad": (0, 0)}
+    if image is not None and imgsz:
+        image, ratio, meta["pad"] = letterbox(image, imgsz)
+        # Ratio from the original image, which may have been decoded reduced
+        meta["ratio"] = ratio / decoded.scale[0]
+    labels = load_yolo_labels(label_path_for(image_path)) if read_labels else None
+    return image, labels, meta
+
+
+def iter_images_and_labels(image_paths, workers=4, prefetch=16, imgsz=None, processes=False, index=None):
+    """
+    Streaming, parallel version of ``load_image_and_labels``.
+
+    Images are decoded in a thread (or process) pool while at most
+    ``prefetch`` decoded images wait in memory; results come back in input
+    order.
+
+    Args:
+        image_paths (list): Image paths.
+        workers (int): Pool size.
+        prefetch (int): Maximum number of images decoded ahead.
+        imgsz (int): Letterbox images to this size when set.
+        processes (bool): Use a process pool instead of threads.
+        index (LabelIndex): Optional dataset index to read labels from.
+
+    Yields:
+        tuple: (path, image or None when unreadable, labels, meta) where meta
+        holds ``orig_shape``, letterbox ``ratio`` and ``pad``.
+    """
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    pending = deque()
+    paths = iter(image_paths)
+    with pool_cls(max_workers=workers) as pool:
+        for path in paths:
+            pending.append((path, pool.submit(_decode, path, imgsz, index is None)))
+            if len(pending) >= max(prefetch, 1):
+                break
+        while pending:
+            path, future = pending.popleft()
+            image, labels, meta = future.result()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(_decode, next_path, imgsz, index is None)))
+            if index is not None:
+                row = index.find(path)
+                if row is None:
+                    labels = load_yolo_labels(label_path_for(path))
+                else:
+                    classes, boxes = index.labels(row)
+                    labels = [[int(c), *map(float, b)] for c, b in zip(classes, boxes)]
+            yield path, image, labels, meta
+
+
+def iter_batches(image_paths, batch=16, imgsz=640, workers=4, prefetch=None, processes=False, index=None):
+    """
+    Stream letterboxed images as batched NumPy arrays.
+
+    Unreadable images are logged and left out of the batches.
+
+    Args:
+        image_paths (list): Image paths.
+        batch (int): Images per batch.
+        imgsz (int): Letterbox size.
+        workers (int): Pool size.
+        prefetch (int): Images decoded ahead (default two batches).
+        processes (bool): Use a process pool instead of threads.
+        index (LabelIndex): Optional dataset index to read labels from.
+
+    Yields:
+        tuple: (paths, images (B, imgsz, imgsz, 3) uint8 BGR, labels, metas)
+    """
+    stream = iter_images_and_labels(
+        image_paths, workers=workers, prefetch=prefetch or 2 * batch, imgsz=imgsz, processes=processes, index=index
+    )
+    paths, images, labels, metas = [], [], [], []
+    for path, image, image_labels, meta in stream:
+        if image is None:
+            logging.warning("Skipping unreadable image %s", path)
+            continue
+        paths.append(path)
+        images.append(image)
+        labels.append(image_labels)
+        metas.append(meta)
+        if len(paths) == batch:
+            yield paths, np.stack(images), labels, metas
+            paths, images, labels, metas = [], [], [], []
+    if paths:
+        yield paths, np.stack(images), labels, metas
+
+
 if __name__ == "__main__":
     # Example usage
     train_folder = "../../custom_data/data_ecg/train/images"
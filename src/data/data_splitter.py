@@ -1,10 +1,98 @@
 # functions to split ECG data into train/val/test
 import os
 import glob
+import itertools
+import json
 import random
 import shutil
+import argparse
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-def split_dataset(image_dir, output_dir, train_ratio=0.7, val_ratio=0.2, test_ratio=0.1, seed=42):
+from src.data.data_loader import label_path_for, load_yolo_labels
+
+SPLITS = ("train", "val", "test")
+MODES = ("copy", "hardlink", "symlink", "manifest")
+ASSIGNMENT_FILE = "split.json"
+
+
+def _place(src, dst, mode):
+    """Copy, hardlink or symlink ``src`` to ``dst`` (replacing ``dst``)."""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if mode == "symlink":
+        os.symlink(os.path.abspath(src), dst)
+        return
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            # Different filesystem or no link support: fall back to a copy
+            pass
+    shutil.copy(src, dst)
+
+
+def _allocate(n, ratios, counts):
+    """
+    Number of new images per split so that ``counts + allocation`` follows
+    the ratios (truncated like the original split, test takes the rest).
+    """
+    total = n + sum(counts)
+    targets = [int(total * ratios[0]), int(total * ratios[1])]
+    allocation = []
+    left = n
+    for target, count in zip(targets, counts):
+        take = min(max(target - count, 0), left)
+        allocation.append(take)
+        left -= take
+    allocation.append(left)
+    return allocation
+
+
+def source_images(image_dir, index=None):
+    """Images to split: from ``index`` when given, else the folder's jpg/png files."""
+    if index is not None:
+        return sorted(index.image_paths())
+    return glob.glob(os.path.join(image_dir, "*.jpg")) + glob.glob(os.path.join(image_dir, "*.png"))
+
+
+def image_strata(image_paths, index=None, groups=None):
+    """
+    Stratum of each image: its rarest labelled class (-1 without labels).
+
+    Args:
+        image_paths (list): Image paths.
+        index (LabelIndex): Optional dataset index to read labels from.
+        groups (dict): Optional {image path: group id}; images of a group
+            share the stratum of their combined labels.
+
+    Returns:
+        dict: {image path: stratum id}
+    """
+    classes = {}
+    for path in image_paths:
+        row = index.find(path) if index is not None else None
+        if row is not None:
+            classes[path] = {int(c) for c in index.labels(row)[0]}
+        else:
+            classes[path] = {label[0] for label in load_yolo_labels(label_path_for(path))}
+    if groups is not None:
+        combined = {}
+        for path, present in classes.items():
+            combined.setdefault(groups.get(path, path), set()).update(present)
+        classes = {path: combined[groups.get(path, path)] for path in classes}
+
+    frequency = Counter(c for present in classes.values() for c in present)
+    return {
+        path: min(present, key=lambda c: (frequency[c], c)) if present else -1
+        for path, present in classes.items()
+    }
+
+
+def split_dataset(image_dir, output_dir, train_ratio=0.7, val_ratio=0.2, test_ratio=0.1, seed=42, index=None,
+                  mode="copy", stratify=False, incremental=False, workers=8, groups=None):
     """
     Split ECG dataset into train/val/test with YOLO structure.
 
@@ -15,50 +103,127 @@ def split_dataset(image_dir, output_dir, train_ratio=0.7, val_ratio=0.2, test_ra
         val_ratio (float): Proportion of validation data.
         test_ratio (float): Proportion of test data.
         seed (int): Random seed for reproducibility.
+        index (LabelIndex): Optional index of ``image_dir`` used instead of
+            globbing the folder.
+        mode (str): ``copy``, ``hardlink``, ``symlink`` or ``manifest`` (only
+            ``<split>.txt`` image lists are written, which Ultralytics accepts
+            as train/val/test entries in data.yaml).
+        stratify (bool): Keep the class balance equal across splits, using
+            each image's rarest labelled class as its stratum.
+        incremental (bool): Keep assignments recorded in ``split.json`` by a
+            previous run and only assign (and copy) new images.
+        workers (int): Threads used to copy or link files.
+        groups (dict): Optional {image path: group id} (e.g. near-duplicate
+            clusters from ``HashIndex.groups``); all images of a group land
+            in the same split, so copies cannot leak from train into val/test.
+
+    Returns:
+        dict: {split: list of image paths}
     """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
     random.seed(seed)
 
     # Get all images
-    image_paths = glob.glob(os.path.join(image_dir, "*.jpg")) + glob.glob(os.path.join(image_dir, "*.png"))
+    image_paths = source_images(image_dir, index)
     random.shuffle(image_paths)
 
-    total = len(image_paths)
-    n_train = int(total * train_ratio)
-    n_val = int(total * val_ratio)
+    assignment_path = os.path.join(output_dir, ASSIGNMENT_FILE)
+    previous = {}
+    if incremental and os.path.exists(assignment_path):
+        with open(assignment_path) as f:
+            previous = {path: split for split, paths in json.load(f).items() for path in paths}
+    known = set(image_paths)
+    previous = {path: split for path, split in previous.items() if path in known}
+    new_paths = [p for p in image_paths if p not in previous]
 
-    train_files = image_paths[:n_train]
-    val_files = image_paths[n_train:n_train+n_val]
-    test_files = image_paths[n_train+n_val:]
+    group_of = (lambda p: groups.get(p, p)) if groups is not None else (lambda p: p)
+    strata = image_strata(image_paths, index, groups) if stratify else dict.fromkeys(image_paths, 0)
+    ratios = (train_ratio, val_ratio, test_ratio)
+    splits = {split: [p for p, s in previous.items() if s == split] for split in SPLITS}
+    # New copies of an image assigned by a previous run follow it
+    placed = {group_of(p): s for p, s in previous.items()}
+    for p in new_paths:
+        if group_of(p) in placed:
+            splits[placed[group_of(p)]].append(p)
+    for stratum in sorted(set(strata.values())):
+        units = {}
+        for p in new_paths:
+            if strata[p] == stratum and group_of(p) not in placed:
+                units.setdefault(group_of(p), []).append(p)
+        counts = [sum(strata[p] == stratum for p in splits[split]) for split in SPLITS]
+        n = sum(map(len, units.values()))
+        # A group goes to the split its first image falls in, like a slice of single images
+        bounds = list(itertools.accumulate(_allocate(n, ratios, counts)))
+        start = 0
+        for unit in units.values():
+            splits[SPLITS[min(bisect_right(bounds, start), len(SPLITS) - 1)]].extend(unit)
+            start += len(unit)
 
+    total = len(image_paths)
+    train_files, val_files, test_files = (splits[s] for s in SPLITS)
     print(f"Total: {total}, Train: {len(train_files)}, Val: {len(val_files)}, Test: {len(test_files)}")
+    if incremental:
+        print(f"Kept {len(previous)} existing assignments, assigned {len(new_paths)} new images")
 
-    # Create YOLO folders
-    for split in ["train", "val", "test"]:
-        os.makedirs(os.path.join(output_dir, split, "images"), exist_ok=True)
-        os.makedirs(os.path.join(output_dir, split, "labels"), exist_ok=True)
-
-    # Helper to copy image + corresponding label
-    def copy_files(file_list, split):
-        for img_path in file_list:
-            base = os.path.basename(img_path)
-            label_path = os.path.splitext(img_path)[0] + ".txt"
-
-            # Copy image
-            shutil.copy(img_path, os.path.join(output_dir, split, "images", base))
+    os.makedirs(output_dir, exist_ok=True)
+    if mode == "manifest":
+        for split in SPLITS:
+            with open(os.path.join(output_dir, f"{split}.txt"), "w") as f:
+                f.writelines(os.path.abspath(p) + "\n" for p in splits[split])
+    else:
+        # Create YOLO folders
+        for split in SPLITS:
+            os.makedirs(os.path.join(output_dir, split, "images"), exist_ok=True)
+            os.makedirs(os.path.join(output_dir, split, "labels"), exist_ok=True)
 
-            # Copy label if exists
-            if os.path.exists(label_path):
-                shutil.copy(label_path, os.path.join(output_dir, split, "labels", os.path.basename(label_path)))
+        # Image + corresponding label (if exists) for every image not placed yet
+        jobs = []
+        new = set(new_paths)
+        for split in SPLITS:
+            for img_path in splits[split]:
+                if img_path not in new:
+                    continue
+                jobs.append((img_path, os.path.join(output_dir, split, "images", os.path.basename(img_path))))
+                label_path = label_path_for(img_path)
+                if os.path.exists(label_path):
+                    jobs.append((label_path, os.path.join(output_dir, split, "labels", os.path.basename(label_path))))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda job: _place(*job, mode), jobs))
 
-    copy_files(train_files, "train")
-    copy_files(val_files, "val")
-    copy_files(test_files, "test")
+    with open(assignment_path, "w") as f:
+        json.dump({split: sorted(paths) for split, paths in splits.items()}, f, indent=2)
 
     print(f"✅ Dataset split complete. Saved at: {output_dir}")
+    return splits
 
 
 if __name__ == "__main__":
-    # Example usage
-    image_dir = "../../raw_ecg/images"       # where all ECG images are stored
-    output_dir = "../../custom_data/data_ecg"
-    split_dataset(image_dir, output_dir, train_ratio=0.7, val_ratio=0.2, test_ratio=0.1)
+    parser = argparse.ArgumentParser(description="Split ECG images into train/val/test")
+    parser.add_argument("--images", type=str, default="../../raw_ecg/images", help="Folder with all ECG images")
+    parser.add_argument("--output", type=str, default="../../custom_data/data_ecg")
+    parser.add_argument("--ratios", type=float, nargs=3, default=[0.7, 0.2, 0.1], metavar=("TRAIN", "VAL", "TEST"))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mode", type=str, choices=MODES, default="copy")
+    parser.add_argument("--stratify", action="store_true", help="Balance classes across splits")
+    parser.add_argument("--incremental", action="store_true", help="Only assign images not in split.json")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dedup", type=int, nargs="?", const=-1, metavar="DISTANCE",
+                        help="Keep near-duplicate images (perceptual hash) in the same split")
+    args = parser.parse_args()
+
+    groups = None
+    if args.dedup is not None:
+        from src.data.dedup_index import DEFAULT_DISTANCE, HashIndex
+
+        distance = DEFAULT_DISTANCE if args.dedup < 0 else args.dedup
+        hash_index = HashIndex.update(os.path.join(args.output, ".dedup"), source_images(args.images))
+        groups = hash_index.groups(distance)
+        print(f"{len(hash_index.clusters(distance))} near-duplicate clusters kept together")
+
+    train_ratio, val_ratio, test_ratio = args.ratios
+    split_dataset(
+        args.images, args.output, train_ratio=train_ratio, val_ratio=val_ratio, test_ratio=test_ratio,
+        seed=args.seed, mode=args.mode, stratify=args.stratify, incremental=args.incremental, workers=args.workers,
+        groups=groups,
+    )
@@ -0,0 +1,370 @@
+# perceptual-hash index of dataset images: near-duplicate clusters, split leakage and pruning
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Allow `python src/data/dedup_index.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.data_loader import label_path_for
+from src.data.label_index import IMAGE_EXTENSIONS, dataset_image_dirs
+
+HASH_SIZE = 16                  # DCT block side: 16 x 16 = 256-bit hashes
+SEGMENT_BITS = 16               # multi-index segment width
+# On data_ecg, re-uploads and crops of one figure stay within ~12 bits while
+# different recordings start around 16
+DEFAULT_DISTANCE = 12
+ARRAYS = ("paths", "hashes", "mtimes")
+
+N_SEGMENTS = HASH_SIZE * HASH_SIZE // SEGMENT_BITS
+
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(1).astype(np.uint16)
+# Segments take wrapped diagonals of the DCT block, so each one mixes low and
+# high frequencies instead of a few segments holding the rarely changing lowest
+_SEGMENT_ORDER = np.arange(HASH_SIZE * HASH_SIZE) * (SEGMENT_BITS + 1) % (HASH_SIZE * HASH_SIZE)
+
+
+def image_hash(image):
+    """
+    Perceptual (DCT) hash of an image.
+
+    The grayscale image is shrunk to a ``4 * HASH_SIZE`` square, transformed
+    with a DCT, and the lowest ``HASH_SIZE x HASH_SIZE`` frequencies are
+    compared with their median: re-encoding, rescaling and small crops or
+    shifts flip few bits, different content flips about half.
+
+    Args:
+        image (str or numpy.ndarray): Image path or decoded BGR/gray image.
+
+    Returns:
+        numpy.ndarray: (32,) uint8 packed bits, or None when the file cannot
+        be decoded.
+    """
+    if isinstance(image, str):
+        image = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            return None
+    elif image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    side = 4 * HASH_SIZE
+    small = cv2.resize(image, (side, side), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:HASH_SIZE, :HASH_SIZE].reshape(-1)
+    return np.packbits((low > np.median(low[1:]))[_SEGMENT_ORDER])
+
+
+def hamming(hashes, other):
+    """Bit distance between packed hashes (broadcasts over leading axes)."""
+    return _POPCOUNT[np.bitwise_xor(hashes, other)].sum(axis=-1, dtype=np.int64)
+
+
+def _probe_masks(max_distance):
+    """
+    XOR masks to probe in every segment table: hashes within ``max_distance``
+    share a segment within ``max_distance // N_SEGMENTS`` bits.
+    """
+    radius = max_distance // N_SEGMENTS
+    return [
+        sum(1 << b for b in flips)
+        for r in range(radius + 1) for flips in itertools.combinations(range(SEGMENT_BITS), r)
+    ]
+
+
+def list_images(folder):
+    """Sorted image paths directly inside ``folder``."""
+    with os.scandir(folder) as it:
+        return sorted(e.path for e in it if e.is_file() and e.name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+class HashIndex:
+    """
+    Perceptual-hash index for near-duplicate search.
+
+    Lookups use multi-index hashing: every 256-bit hash is cut into 16-bit
+    segments, each with its own hash table. Two hashes within ``r`` bits
+    share at least one segment within ``r // N_SEGMENTS`` bits (pigeonhole),
+    so a query probes a few buckets per table and computes exact distances
+    only for those candidates instead of against every image.
+
+    Use ``HashIndex.build`` / ``HashIndex.update`` to create it (only new or
+    modified images are hashed) and ``HashIndex.load`` to open a saved one.
+    """
+
+    def __init__(self, arrays, index_dir=None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.index_dir = index_dir
+        self._tables = None
+        self._lookup = None
+
+    @classmethod
+    def build(cls, image_paths, index_dir=None, previous=None, workers=8):
+        """
+        Hash images and build the index.
+
+        Args:
+            image_paths (list): Images to index.
+            index_dir (str): Where to save the index; not saved when None.
+            previous (HashIndex): Older index; images with an unchanged mtime
+                reuse its hash.
+            workers (int): Threads used to decode and hash images.
+
+        Returns:
+            HashIndex: The new index (unreadable images are left out).
+        """
+        paths, mtimes = list(image_paths), [os.stat(p).st_mtime_ns for p in image_paths]
+        hashes = [None] * len(paths)
+        todo = []
+        for i, (path, mtime) in enumerate(zip(paths, mtimes)):
+            old = previous.find(path) if previous is not None else None
+            if old is not None and int(previous.mtimes[old]) == mtime:
+                hashes[i] = previous.hashes[old]
+            else:
+                todo.append(i)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i, value in zip(todo, pool.map(image_hash, [paths[i] for i in todo])):
+                hashes[i] = value
+
+        keep = [i for i, h in enumerate(hashes) if h is not None]
+        arrays = {
+            "paths": np.array([paths[i] for i in keep], dtype=str),
+            "hashes": np.array([hashes[i] for i in keep], dtype=np.uint8).reshape(-1, HASH_SIZE * HASH_SIZE // 8),
+            "mtimes": np.array([mtimes[i] for i in keep], dtype=np.int64),
+        }
+        index = cls(arrays, index_dir)
+        if index_dir:
+            index.save(index_dir)
+        return index
+
+    @classmethod
+    def update(cls, index_dir, image_paths, workers=8):
+        """
+        Bring a saved index up to date with ``image_paths``.
+
+        New and modified images are hashed, removed ones dropped.
+
+        Returns:
+            HashIndex: The updated (and saved) index.
+        """
+        previous = None
+        if os.path.exists(os.path.join(index_dir, "meta.json")):
+            previous = cls.load(index_dir)
+        return cls.build(image_paths, index_dir, previous=previous, workers=workers)
+
+    def save(self, index_dir):
+        """Write every array as ``.npy`` plus ``meta.json`` (atomic per file)."""
+        os.makedirs(index_dir, exist_ok=True)
+        for name in ARRAYS:
+            tmp = os.path.join(index_dir, f".{name}.tmp.npy")
+            np.save(tmp, getattr(self, name))
+            os.replace(tmp, os.path.join(index_dir, f"{name}.npy"))
+        with open(os.path.join(index_dir, "meta.json"), "w") as f:
+            json.dump({"hash_size": HASH_SIZE, "segment_bits": SEGMENT_BITS, "images": len(self)}, f, indent=2)
+        self.index_dir = index_dir
+
+    @classmethod
+    def load(cls, index_dir):
+        """Load a saved index."""
+        arrays = {name: np.load(os.path.join(index_dir, f"{name}.npy")) for name in ARRAYS}
+        return cls(arrays, index_dir)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def find(self, image_path):
+        """Row of an image path, or None."""
+        if self._lookup is None:
+            self._lookup = {os.path.abspath(str(p)): i for i, p in enumerate(self.paths)}
+        return self._lookup.get(os.path.abspath(image_path))
+
+    def _segments(self, hashes):
+        return np.ascontiguousarray(hashes).view(f">u{SEGMENT_BITS // 8}")
+
+    @property
+    def tables(self):
+        """Per segment: {segment value: array of rows}, built on first use."""
+        if self._tables is None:
+            keys = self._segments(self.hashes)
+            self._tables = []
+            for column in keys.T:
+                order = np.argsort(column, kind="stable")
+                values, starts = np.unique(column[order], return_index=True)
+                self._tables.append(dict(zip(values.tolist(), np.split(order, starts[1:]))))
+        return self._tables
+
+    def _candidates(self, segments, masks):
+        found = [
+            rows for table, key in zip(self.tables, segments.tolist()) for mask in masks
+            if (rows := table.get(key ^ mask)) is not None
+        ]
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def query(self, image, max_distance=DEFAULT_DISTANCE):
+        """
+        Indexed images within ``max_distance`` bits of an image.
+
+        Args:
+            image (str, numpy.ndarray): Image path, decoded image, or a hash
+                from ``image_hash``.
+            max_distance (int): Maximum Hamming distance.
+
+        Returns:
+            list: (path, distance) pairs, closest first.
+        """
+        if isinstance(image, np.ndarray) and image.dtype == np.uint8 and image.shape == self.hashes.shape[1:]:
+            hashed = image
+        else:
+            hashed = image_hash(image)
+        rows = self._candidates(self._segments(hashed[None])[0], _probe_masks(max_distance))
+        distances = hamming(self.hashes[rows], hashed)
+        order = np.argsort(distances, kind="stable")
+        return [(str(self.paths[rows[i]]), int(distances[i])) for i in order if distances[i] <= max_distance]
+
+    def pairs(self, max_distance=DEFAULT_DISTANCE):
+        """
+        All pairs of indexed images within ``max_distance`` bits.
+
+        Returns:
+            numpy.ndarray: (P, 3) int64 rows (i, j, distance) with i < j.
+        """
+        masks = _probe_masks(max_distance)
+        keys = self._segments(self.hashes)
+        found = []
+        for i in range(len(self)):
+            rows = self._candidates(keys[i], masks)
+            rows = rows[rows > i]
+            distances = hamming(self.hashes[rows], self.hashes[i])
+            close = distances <= max_distance
+            found.append(np.column_stack([np.full(int(close.sum()), i), rows[close], distances[close]]))
+        return np.concatenate(found).astype(np.int64) if found else np.zeros((0, 3), dtype=np.int64)
+
+    def clusters(self, max_distance=DEFAULT_DISTANCE):
+        """
+        Near-duplicate clusters (connected components of ``pairs``).
+
+        Returns:
+            list: Clusters of two or more sorted paths, largest first.
+        """
+        parent = np.arange(len(self))
+
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j, _ in self.pairs(max_distance):
+            a, b = root(i), root(j)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+        members = {}
+        for i in range(len(self)):
+            members.setdefault(root(i), []).append(str(self.paths[i]))
+        clusters = [sorted(paths) for paths in members.values() if len(paths) > 1]
+        return sorted(clusters, key=lambda c: (-len(c), c[0]))
+
+    def groups(self, max_distance=DEFAULT_DISTANCE):
+        """
+        {image path: group id} for every indexed image; near-duplicates share
+        an id (e.g. the ``groups`` argument of ``split_dataset``).
+        """
+        groups = {str(p): i for i, p in enumerate(self.paths)}
+        for cluster in self.clusters(max_distance):
+            for path in cluster:
+                groups[path] = groups[cluster[0]]
+        return groups
+
+
+def split_of(path, image_dirs):
+    """Split whose images folder contains ``path`` (None if none does)."""
+    folder = os.path.dirname(os.path.abspath(path))
+    for split, image_dir in image_dirs.items():
+        if os.path.abspath(image_dir) == folder:
+            return split
+    return None
+
+
+def redundant_images(clusters, image_dirs, keep_order=("val", "test", "train")):
+    """
+    Images to drop so each cluster keeps a single sample.
+
+    The kept image is the one from the first split in ``keep_order`` (the
+    evaluation splits by default, so the training copy of a leaked image is
+    the one removed), ties broken by path.
+
+    Returns:
+        list: Paths to drop.
+    """
+    rank = {split: k for k, split in enumerate(keep_order)}
+
+    def priority(path):
+        return rank.get(split_of(path, image_dirs), len(rank)), path
+
+    return [path for cluster in clusters for path in sorted(cluster, key=priority)[1:]]
+
+
+def prune(paths, root, target):
+    """
+    Move images and their label files from ``root`` to ``target`` (same
+    relative layout), so pruning can be undone by moving them back.
+
+    Returns:
+        list: (source, destination) moves.
+    """
+    moves = []
+    for image in paths:
+        for src in (image, label_path_for(image)):
+            if not os.path.exists(src):
+                continue
+            dst = os.path.join(target, os.path.relpath(src, root))
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.move(src, dst)
+            moves.append((src, dst))
+    return moves
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cari gambar ECG duplikat / hampir sama (perceptual hash)")
+    parser.add_argument("--root", type=str, default="data_ecg")
+    parser.add_argument("--splits", type=str, nargs="+", default=["train", "val", "test"])
+    parser.add_argument("--index", type=str, help="Folder index (default <root>/.dedup)")
+    parser.add_argument("--distance", type=int, default=DEFAULT_DISTANCE, help="Maks. jarak Hamming (dari 256 bit)")
+    parser.add_argument("--show", type=int, default=10, help="Jumlah cluster yang ditampilkan")
+    parser.add_argument("--json", type=str, help="Simpan semua cluster ke file JSON")
+    parser.add_argument("--prune", type=str, metavar="DIR",
+                        help="Pindahkan gambar redundan (dan labelnya) ke folder ini")
+    parser.add_argument("--keep", type=str, nargs="+", default=["val", "test", "train"],
+                        help="Urutan split yang dipertahankan saat prune")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    image_dirs = dataset_image_dirs(args.root, args.splits)
+    image_paths = [p for folder in image_dirs.values() for p in list_images(folder)]
+    index = HashIndex.update(args.index or os.path.join(args.root, ".dedup"), image_paths, workers=args.workers)
+    clusters = index.clusters(args.distance)
+    leaked = [c for c in clusters if len({split_of(p, image_dirs) for p in c}) > 1]
+    redundant = redundant_images(clusters, image_dirs, args.keep)
+
+    print(f"{len(index)} gambar, {len(clusters)} cluster duplikat ({sum(map(len, clusters))} gambar), "
+          f"{len(redundant)} redundan, {len(leaked)} cluster lintas split")
+    for cluster in clusters[:args.show]:
+        splits = sorted({split_of(p, image_dirs) for p in cluster})
+        print(f"  [{', '.join(splits)}] {len(cluster)}: " + ", ".join(os.path.basename(p) for p in cluster[:5])
+              + (" ..." if len(cluster) > 5 else ""))
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"distance": args.distance, "clusters": clusters, "redundant": redundant}, f, indent=2)
+    if args.prune:
+        moves = prune(redundant, args.root, args.prune)
+        with open(os.path.join(args.prune, "pruned.json"), "w") as f:
+            json.dump(moves, f, indent=2)
+        HashIndex.update(index.index_dir, [p for p in image_paths if os.path.exists(p)], workers=args.workers)
+        print(f"{len(moves)} file dipindahkan ke {args.prune} (daftar di pruned.json)")
@@ -0,0 +1,183 @@
+# pre-resized images of a split stored as one memory-mapped uint8 array
+import argparse
+import hashlib
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+
+from src.data.data_loader import iter_images_and_labels, load_images_from_folder
+
+DEFAULT_IMAGE_CACHE_DIR = os.environ.get("ECG_IMAGE_CACHE", "runs/cache/images")
+
+
+def resize_long_side(image, imgsz):
+    """
+    Resize the long side of an image to ``imgsz`` keeping the aspect ratio.
+
+    Matches the resize of Ultralytics datasets (rect mode), so cached images
+    are identical to what training would decode.
+    """
+    h0, w0 = image.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+    return image
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class ImageCache:
+    """
+    Resized images of one split in a single ``(N, imgsz, imgsz, 3)`` uint8
+    ``.npy`` memmap.
+
+    Image ``i`` is resized with ``resize_long_side`` and stored in the top
+    left corner of slot ``i``; the padded remainder is gray (114). A JSON
+    sidecar keeps per image the original (h, w), resized (h, w) and the
+    source mtime/size used to invalidate stale slots; boxes map back to the
+    original image by dividing by ``ratio(i)``.
+
+    Args:
+        path (str): Cache file prefix (``<path>.npy`` and ``<path>.json``).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        self.imgsz = meta["imgsz"]
+        self.paths = meta["paths"]
+        self.orig_hw = [tuple(hw) for hw in meta["orig_hw"]]
+        self.hw = [tuple(hw) for hw in meta["hw"]]
+        self._rows = {p: i for i, p in enumerate(self.paths)}
+        self._images = None
+
+    @staticmethod
+    def path_for(image_paths, imgsz, cache_dir=DEFAULT_IMAGE_CACHE_DIR):
+        """Cache prefix of an image list at a given imgsz."""
+        paths = sorted(os.path.abspath(p) for p in image_paths)
+        digest = hashlib.sha1("\n".join(paths).encode()).hexdigest()[:16]
+        return os.path.join(cache_dir, f"{digest}_{int(imgsz)}")
+
+    @classmethod
+    def build(cls, image_paths, imgsz, cache_dir=DEFAULT_IMAGE_CACHE_DIR, workers=4):
+        """
+        Create or refresh the cache of an image list.
+
+        Only slots whose source image changed (mtime or size) are decoded
+        again; a different image list or imgsz gets its own cache file.
+
+        Args:
+            image_paths (list): Image paths (slots follow their sorted order).
+            imgsz (int): Long side of the cached images.
+            cache_dir (str): Folder of the cache files.
+            workers (int): Decode threads.
+
+        Returns:
+            ImageCache: The up to date cache.
+        """
+        image_paths = sorted(os.path.abspath(p) for p in image_paths)
+        path = cls.path_for(image_paths, imgsz, cache_dir)
+        stamps = [_source_stamp(p) for p in image_paths]
+
+        meta = None
+        if os.path.exists(path + ".json") and os.path.exists(path + ".npy"):
+            with open(path + ".json") as f:
+                meta = json.load(f)
+        if meta is not None and meta["paths"] == image_paths and meta["imgsz"] == imgsz:
+            stale = [i for i, stamp in enumerate(stamps) if meta["stamps"][i] != stamp]
+            images = np.load(path + ".npy", mmap_mode="r+")
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            meta = {
+                "imgsz": imgsz, "paths": image_paths, "stamps": [None] * len(image_paths),
+                "orig_hw": [[0, 0]] * len(image_paths), "hw": [[0, 0]] * len(image_paths),
+            }
+            stale = list(range(len(image_paths)))
+            images = np.lib.format.open_memmap(
+                path + ".npy", mode="w+", dtype=np.uint8, shape=(len(image_paths), imgsz, imgsz, 3)
+            )
+
+        stream = iter_images_and_labels([image_paths[i] for i in stale], workers=workers)
+        for i, (_, image, _, _) in zip(stale, stream):
+            images[i] = 114
+            if image is None:
+                # Unreadable images keep an empty slot and are never served
+                meta["orig_hw"][i], meta["hw"][i] = [0, 0], [0, 0]
+            else:
+                resized = resize_long_side(image, imgsz)
+                h, w = resized.shape[:2]
+                images[i, :h, :w] = resized
+                meta["orig_hw"][i], meta["hw"][i] = list(image.shape[:2]), [h, w]
+            meta["stamps"][i] = stamps[i]
+        images.flush()
+        del images
+
+        with open(path + ".json.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".json.tmp", path + ".json")
+        return cls(path)
+
+    @property
+    def images(self):
+        # Opened lazily so the cache pickles cheaply into dataloader workers
+        if self._images is None:
+            self._images = np.load(self.path + ".npy", mmap_mode="r")
+        return self._images
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, image_path):
+        return self.find(image_path) is not None
+
+    def find(self, image_path):
+        """Slot of an image, or None when missing or unreadable."""
+        i = self._rows.get(os.path.abspath(image_path))
+        if i is None or self.hw[i][0] == 0:
+            return None
+        return i
+
+    def ratio(self, i):
+        """Scale from original to cached pixels of slot ``i``."""
+        return self.hw[i][0] / self.orig_hw[i][0]
+
+    def get(self, image_path):
+        """
+        Cached image in the format of Ultralytics ``load_image``.
+
+        Returns:
+            tuple: (image copy (h, w, 3), (h0, w0), (h, w)) or None.
+        """
+        i = self.find(image_path)
+        if i is None:
+            return None
+        h, w = self.hw[i]
+        return np.array(self.images[i, :h, :w]), self.orig_hw[i], self.hw[i]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the resized image cache of a split")
+    parser.add_argument("--images", type=str, nargs="+", default=["data_ecg/train/images", "data_ecg/val/images"])
+    parser.add_argument("--imgsz", type=int, default=960)
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_IMAGE_CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for folder in args.images:
+        paths = load_images_from_folder(folder, ("*.jpg", "*.jpeg", "*.png", "*.bmp", "*.webp"))
+        cache = ImageCache.build(paths, args.imgsz, args.cache_dir, args.workers)
+        size = os.path.getsize(cache.path + ".npy") / 1e6
+        print(f"{folder}: {len(cache)} images at {args.imgsz} -> {cache.path}.npy ({size:.0f} MB)")
@@ -0,0 +1,230 @@
+# columnar, memory-mappable index of YOLO images and labels
+import argparse
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from src.data.data_loader import label_path_for, read_yolo_labels
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+ARRAYS = ("paths", "split", "offsets", "boxes", "classes", "sizes", "mtimes")
+
+
+def _scan_split(image_dir):
+    """List (image path, image mtime ns, label path, label mtime ns) of a folder."""
+    entries = []
+    with os.scandir(image_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                label = label_path_for(entry.path)
+                label_mtime = os.stat(label).st_mtime_ns if os.path.exists(label) else 0
+                entries.append((entry.path, entry.stat().st_mtime_ns, label, label_mtime))
+    return sorted(entries)
+
+
+def _image_size(path):
+    """(height, width) read from the image header only."""
+    with Image.open(path) as im:
+        width, height = im.size
+    return height, width
+
+
+class LabelIndex:
+    """
+    Columnar index of a YOLO dataset.
+
+    Per image: path, split id, (height, width) and (image, label) mtimes.
+    Labels of all images are stored flat in ``boxes`` (M, 4) float32 xywhn
+    and ``classes`` (M,) int16; image ``i`` owns rows
+    ``offsets[i]:offsets[i + 1]``.
+
+    Use ``LabelIndex.build`` / ``LabelIndex.update`` to create it and
+    ``LabelIndex.load`` to memory-map it.
+    """
+
+    def __init__(self, arrays, splits, index_dir=None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.splits = list(splits)
+        self.index_dir = index_dir
+        self._lookup = None
+
+    @classmethod
+    def build(cls, image_dirs, index_dir=None, previous=None):
+        """
+        Scan image folders and build the index.
+
+        Args:
+            image_dirs (dict): {split name: images folder}.
+            index_dir (str): Where to save the index; not saved when None.
+            previous (LabelIndex): Older index; entries whose image and label
+                mtimes are unchanged are reused instead of re-read.
+
+        Returns:
+            LabelIndex: The new index.
+        """
+        splits = list(image_dirs)
+        reuse = {}
+        if previous is not None:
+            for i, path in enumerate(previous.paths):
+                reuse[str(path)] = i
+
+        paths, split_ids, sizes, mtimes, boxes, classes, counts = [], [], [], [], [], [], []
+        for split_id, split in enumerate(splits):
+            for image, image_mtime, label, label_mtime in _scan_split(image_dirs[split]):
+                old = reuse.get(image)
+                if old is not None and tuple(previous.mtimes[old]) == (image_mtime, label_mtime):
+                    size = tuple(previous.sizes[old])
+                    start, end = previous.offsets[old], previous.offsets[old + 1]
+                    rows_cls, rows_box = previous.classes[start:end], previous.boxes[start:end]
+                else:
+                    size = _image_size(image)
+                    labels = read_yolo_labels(label).astype(np.float32)
+                    rows_cls, rows_box = labels[:, 0], labels[:, 1:]
+
+                paths.append(image)
+                split_ids.append(split_id)
+                sizes.append(size)
+                mtimes.append((image_mtime, label_mtime))
+                classes.append(np.asarray(rows_cls, dtype=np.int16))
+                boxes.append(np.asarray(rows_box, dtype=np.float32))
+                counts.append(len(rows_cls))
+
+        arrays = {
+            "paths": np.array(paths, dtype=str),
+            "split": np.array(split_ids, dtype=np.uint8),
+            "offsets": np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64),
+            "boxes": np.concatenate(boxes) if boxes else np.zeros((0, 4), np.float32),
+            "classes": np.concatenate(classes) if classes else np.zeros(0, np.int16),
+            "sizes": np.array(sizes, dtype=np.int32).reshape(-1, 2),
+            "mtimes": np.array(mtimes, dtype=np.int64).reshape(-1, 2),
+        }
+        index = cls(arrays, splits, index_dir)
+        if index_dir:
+            index.save(index_dir, image_dirs)
+        return index
+
+    @classmethod
+    def update(cls, index_dir, image_dirs=None):
+        """
+        Bring a saved index up to date, re-reading only changed files.
+
+        Args:
+            index_dir (str): Saved index folder.
+            image_dirs (dict): {split: folder}; defaults to the saved ones.
+
+        Returns:
+            LabelIndex: The updated (and saved) index.
+        """
+        previous, saved_dirs = None, None
+        if os.path.exists(os.path.join(index_dir, "meta.json")):
+            previous = cls.load(index_dir, mmap=False)
+            with open(os.path.join(index_dir, "meta.json")) as f:
+                saved_dirs = json.load(f)["image_dirs"]
+        return cls.build(image_dirs or saved_dirs, index_dir, previous=previous)
+
+    def save(self, index_dir, image_dirs):
+        """Write every array as ``.npy`` plus ``meta.json`` (atomic per file)."""
+        os.makedirs(index_dir, exist_ok=True)
+        for name in ARRAYS:
+            tmp = os.path.join(index_dir, f".{name}.tmp.npy")
+            np.save(tmp, getattr(self, name))
+            os.replace(tmp, os.path.join(index_dir, f"{name}.npy"))
+        with open(os.path.join(index_dir, "meta.json"), "w") as f:
+            json.dump({"splits": self.splits, "image_dirs": image_dirs}, f, indent=2)
+        self.index_dir = index_dir
+
+    @classmethod
+    def load(cls, index_dir, mmap=True):
+        """
+        Load a saved index; arrays are memory-mapped unless ``mmap=False``.
+        """
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS}
+        return cls(arrays, meta["splits"], index_dir)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def find(self, image_path):
+        """Row of an image path, or None."""
+        if self._lookup is None:
+            self._lookup = {str(p): i for i, p in enumerate(self.paths)}
+            self._lookup.update({os.path.abspath(str(p)): i for i, p in enumerate(self.paths)})
+        i = self._lookup.get(image_path)
+        return i if i is not None else self._lookup.get(os.path.abspath(image_path))
+
+    def labels(self, i):
+        """
+        Labels of image ``i``.
+
+        Returns:
+            tuple: (classes (K,) int16, boxes (K, 4) float32 xywhn)
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.classes[start:end], self.boxes[start:end]
+
+    def image_paths(self, split=None):
+        """Image paths, optionally of one split."""
+        if split is None:
+            return [str(p) for p in self.paths]
+        mask = self.split == self.splits.index(split)
+        return [str(p) for p in self.paths[mask]]
+
+    def image_classes(self, nc):
+        """
+        (n_images, nc) label counts per image and class.
+        """
+        image = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        flat = image * nc + self.classes.astype(np.int64)
+        return np.bincount(flat, minlength=len(self) * nc).reshape(len(self), nc)
+
+    def stats(self, names):
+        """
+        Dataset statistics per split without touching the files.
+
+        Args:
+            names (dict): Class id -> name mapping.
+
+        Returns:
+            dict: {split: {images, unlabelled, boxes, per-class counts}}
+        """
+        per_image = self.image_classes(len(names))
+        out = {}
+        for split_id, split in enumerate(self.splits):
+            mask = self.split == split_id
+            counts = per_image[mask]
+            out[split] = {
+                "images": int(mask.sum()),
+                "unlabelled": int((counts.sum(1) == 0).sum()),
+                "boxes": int(counts.sum()),
+                "classes": {names[c]: int(counts[:, c].sum()) for c in range(len(names))},
+            }
+        return out
+
+
+def dataset_image_dirs(root, splits=("train", "val")):
+    """{split: <root>/<split>/images} for splits that exist."""
+    dirs = {}
+    for split in splits:
+        path = os.path.join(root, split, "images")
+        if os.path.isdir(path):
+            dirs[split] = path
+    return dirs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the dataset label index")
+    parser.add_argument("--root", type=str, default="data_ecg")
+    parser.add_argument("--index", type=str, help="Index folder (default <root>/.index)")
+    parser.add_argument("--names", type=str, nargs="+", default=["abnormal", "normal"])
+    args = parser.parse_args()
+
+    index_dir = args.index or os.path.join(args.root, ".index")
+    index = LabelIndex.update(index_dir, dataset_image_dirs(args.root))
+    print(f"Indexed {len(index)} images, {len(index.classes)} boxes -> {index_dir}")
+    print(json.dumps(index.stats(dict(enumerate(args.names))), indent=2))
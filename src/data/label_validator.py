@@ -0,0 +1,256 @@
+# dataset validator: malformed / out-of-range / duplicate labels and orphan files, all splits in parallel
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Allow `python src/data/label_validator.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.data_loader import parse_yolo_labels
+from src.data.label_index import IMAGE_EXTENSIONS
+from src.utils.config import load_config
+
+# Issues that break training vs. ones worth a look (background images, stray files)
+ERROR_KINDS = ("malformed", "bad_class", "out_of_range", "zero_area", "duplicate")
+WARNING_KINDS = ("missing_label", "orphan_label")
+
+CHUNK_SIZE = 512
+# Boxes equal after rounding to this many decimals count as duplicates
+DUPLICATE_DECIMALS = 6
+
+
+def dataset_config(data_yaml=None, root=None, splits=("train", "val", "test")):
+    """
+    Resolve the dataset root, split folders and class names.
+
+    Class names come from ``data_yaml`` (``names``) when given, otherwise
+    from ``<root>/classes.txt``. A relative ``path`` in the YAML is tried
+    from the working directory, then next to the YAML file.
+
+    Args:
+        data_yaml (str): Ultralytics dataset YAML (e.g. config/data.yaml).
+        root (str): Dataset root; overrides the YAML ``path``.
+        splits (tuple): Split names to look for.
+
+    Returns:
+        root (str): Dataset root.
+        image_dirs (dict): {split: images folder} for splits that exist.
+        names (list): Class names (index = class id).
+    """
+    config = load_config(data_yaml) if data_yaml else {}
+    if root is None:
+        root = config.get("path", ".")
+        if not os.path.isabs(root) and not os.path.isdir(root):
+            root = os.path.join(os.path.dirname(os.path.abspath(data_yaml)), root)
+
+    image_dirs = {}
+    for split in splits:
+        path = os.path.join(root, config.get(split) or os.path.join(split, "images"))
+        if os.path.isdir(path):
+            image_dirs[split] = path
+
+    names = config.get("names")
+    if isinstance(names, dict):
+        names = [names[k] for k in sorted(names)]
+    if not names and os.path.exists(os.path.join(root, "classes.txt")):
+        with open(os.path.join(root, "classes.txt")) as f:
+            names = [line.strip() for line in f if line.strip()]
+    return root, image_dirs, list(names or [])
+
+
+def _stems(folder, suffixes):
+    """{file stem: path} of the files in ``folder`` with one of ``suffixes``."""
+    if not os.path.isdir(folder):
+        return {}
+    with os.scandir(folder) as it:
+        return {
+            os.path.splitext(e.name)[0]: e.path for e in it if e.is_file() and e.name.lower().endswith(suffixes)
+        }
+
+
+def pair_split(image_dir):
+    """
+    Match the images of a split with their label files by name.
+
+    Labels are looked up in the sibling ``labels`` folder, or next to the
+    images when there is none (same layout as ``label_path_for``).
+
+    Returns:
+        pairs (list): Sorted (image path, label path) pairs.
+        missing (list): Images without a label file.
+        orphans (list): Label files without an image.
+    """
+    images = _stems(image_dir, IMAGE_EXTENSIONS)
+    parent, leaf = os.path.split(os.path.normpath(image_dir))
+    label_dir = os.path.join(parent, "labels") if leaf == "images" else image_dir
+    if not os.path.isdir(label_dir):
+        label_dir = image_dir
+    labels = _stems(label_dir, (".txt",))
+    pairs = sorted((images[s], labels[s]) for s in images.keys() & labels.keys())
+    missing = sorted(images[s] for s in images.keys() - labels.keys())
+    orphans = sorted(labels[s] for s in labels.keys() - images.keys() if label_dir != image_dir or s != "classes")
+    return pairs, missing, orphans
+
+
+def validate_labels(label_paths, nc):
+    """
+    Check a group of label files.
+
+    Every file is parsed with ``parse_yolo_labels``; the rows of all files
+    are then checked together with array operations (one pass per check
+    for the whole group rather than per file or line).
+
+    Args:
+        label_paths (list): Label files.
+        nc (int): Number of classes (valid ids are 0..nc-1); None when the
+            class names are unknown, which only checks for integer ids.
+
+    Returns:
+        issues (list): Dicts with file, line, kind and detail.
+        stats (dict): Files, boxes and empty (background) files.
+    """
+    issues, arrays, lines, owners = [], [], [], []
+    empty = 0
+    for k, path in enumerate(label_paths):
+        with open(path, "r") as f:
+            labels, rows, malformed = parse_yolo_labels(f.read())
+        issues.extend({"file": path, "line": n, "kind": "malformed", "detail": "expected 5 numbers"} for n in malformed)
+        if not len(labels) and not malformed:
+            empty += 1
+        arrays.append(labels)
+        lines.append(rows)
+        owners.append(np.full(len(labels), k, dtype=np.int64))
+
+    labels = np.concatenate(arrays) if arrays else np.zeros((0, 5))
+    lines = np.concatenate(lines) if lines else np.zeros(0, dtype=np.int64)
+    owners = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int64)
+    cls, xywh = labels[:, 0], labels[:, 1:]
+
+    checks = {
+        "bad_class": (cls != np.round(cls)) | (cls < 0) | (cls >= (np.inf if nc is None else nc)),
+        # Written as "not inside" so NaN values are caught too
+        "out_of_range": ~((xywh >= 0) & (xywh <= 1)).all(axis=1),
+        "zero_area": (xywh[:, 2] <= 0) | (xywh[:, 3] <= 0),
+    }
+    keyed = np.column_stack([owners, np.round(labels, DUPLICATE_DECIMALS)])
+    _, first, inverse = np.unique(keyed, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    checks["duplicate"] = first[inverse] != np.arange(len(labels))
+
+    for kind, mask in checks.items():
+        for i in np.flatnonzero(mask):
+            detail = " ".join(f"{v:g}" for v in labels[i])
+            if kind == "duplicate":
+                detail += f" (same as line {int(lines[first[inverse[i]]])})"
+            issues.append({"file": label_paths[owners[i]], "line": int(lines[i]), "kind": kind, "detail": detail})
+    issues.sort(key=lambda issue: (issue["file"], issue["line"]))
+    return issues, {"labels": len(label_paths), "boxes": int(len(labels)), "empty": empty}
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def validate_dataset(data_yaml=None, root=None, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Validate every split of a YOLO dataset.
+
+    Label files are checked in chunks on a process pool (inline when the
+    dataset fits in one chunk, where starting workers would cost more than
+    it saves).
+
+    Args:
+        data_yaml (str): Dataset YAML (split folders and class names).
+        root (str): Dataset root; overrides the YAML ``path``.
+        workers (int): Worker processes (default: CPU count).
+        chunk_size (int): Label files per task.
+
+    Returns:
+        dict: ``root``, ``names``, per-split ``splits`` stats, issue
+        ``counts`` per kind and the ``issues`` list (each with its split).
+    """
+    root, image_dirs, names = dataset_config(data_yaml, root)
+    if not image_dirs:
+        raise FileNotFoundError(f"Tidak ada folder split (train/val/test) di {root}")
+
+    tasks, splits, issues = [], {}, []
+    for split, image_dir in image_dirs.items():
+        pairs, missing, orphans = pair_split(image_dir)
+        splits[split] = {"images": len(pairs) + len(missing), "labels": 0, "boxes": 0, "empty": 0}
+        issues.extend({"split": split, "file": p, "line": 0, "kind": "missing_label", "detail": ""} for p in missing)
+        issues.extend({"split": split, "file": p, "line": 0, "kind": "orphan_label", "detail": ""} for p in orphans)
+        tasks.extend((split, chunk) for chunk in _chunks([label for _, label in pairs], chunk_size))
+
+    nc = len(names) or None
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(validate_labels, [c for _, c in tasks], [nc] * len(tasks)))
+    else:
+        results = [validate_labels(chunk, nc) for _, chunk in tasks]
+
+    for (split, _), (chunk_issues, stats) in zip(tasks, results):
+        for key, value in stats.items():
+            splits[split][key] += value
+        issues.extend(dict(issue, split=split) for issue in chunk_issues)
+
+    counts = Counter(issue["kind"] for issue in issues)
+    return {
+        "root": root,
+        "names": names,
+        "splits": splits,
+        "counts": {kind: counts.get(kind, 0) for kind in ERROR_KINDS + WARNING_KINDS},
+        "issues": issues,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validasi label dataset YOLO (semua split, paralel)")
+    parser.add_argument("--data", type=str, default="config/data.yaml", help="YAML dataset (split & nama kelas)")
+    parser.add_argument("--root", type=str, help="Root dataset (menimpa 'path' di YAML)")
+    parser.add_argument("--workers", type=int, help="Jumlah proses (default: jumlah CPU)")
+    parser.add_argument("--show", type=int, default=10, help="Contoh masalah yang ditampilkan per jenis")
+    parser.add_argument("--json", type=str, help="Simpan laporan lengkap ke file JSON")
+    parser.add_argument("--strict", action="store_true", help="Gambar tanpa label / label yatim juga dianggap gagal")
+    args = parser.parse_args()
+
+    try:
+        report = validate_dataset(args.data, args.root, args.workers)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(2)
+    if report["names"]:
+        print(f"Dataset {report['root']} ({len(report['names'])} kelas: {', '.join(report['names'])})")
+    else:
+        print(f"Dataset {report['root']} (nama kelas tidak ditemukan: class id tidak dicek terhadap daftar kelas)")
+    for split, stats in report["splits"].items():
+        print(f"  {split}: {stats['images']} gambar, {stats['labels']} file label, {stats['boxes']} box, "
+              f"{stats['empty']} label kosong")
+
+    by_kind = {}
+    for issue in report["issues"]:
+        by_kind.setdefault(issue["kind"], []).append(issue)
+    for kind, count in report["counts"].items():
+        if not count:
+            continue
+        print(f"{kind}: {count}")
+        for issue in by_kind[kind][:args.show]:
+            where = f"{issue['file']}:{issue['line']}" if issue["line"] else issue["file"]
+            print(f"    {where} {issue['detail']}".rstrip())
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = ERROR_KINDS + (WARNING_KINDS if args.strict else ())
+    if any(report["counts"][kind] for kind in failed):
+        print("Validasi GAGAL")
+        sys.exit(1)
+    print("Validasi OK")
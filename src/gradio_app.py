@@ -1,33 +1,111 @@
+import os
+import sys
+import time
+from collections import defaultdict
+
 import gradio as gr
-from ultralytics import YOLO
-import cv2
-from PIL import Image
 
-def analyze_ecg_results(results, model):
-    jumlah_abnormal = sum(
-        1 for r in results for box in r.boxes if model.names[int(box.cls[0])] == "abnormal"
-    )
-    if len(results[0].boxes) == 0:
-        status = "✅ Detak jantung sehat (Normal)"
-    elif jumlah_abnormal > 6:
-        status = "⚠️ Detak jantung abnormal, perlu istirahat dan konsultasi dokter"
-    elif jumlah_abnormal > 0:
-        status = "⚠️ Detak jantung abnormal ringan, kurangi merokok, makan sehat, dan tambahkan waktu olahraga"
-    else:
-        status = "✅ Detak jantung sehat (Normal)"
-    return status, jumlah_abnormal
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def predict_ecg(image, model_path):
-    model = YOLO(model_path)
-    results = model(image, conf=0.4)
+from src.analysis.verdict import VerdictEngine, inference_conf, load_policy
+from src.models.batch_predict import build_records
+from src.models.inference import predict_batches
+from src.models.prediction_cache import PredictionCache
+from src.models.registry import get_model
+from src.models.result_store import ResultStore
+from src.utils import tracing
+from src.utils.decode import decode_source
+from src.utils.render import render
+
+POLICY = load_policy(profile="gradio")
+IMGSZ = int(os.environ.get("ECG_IMGSZ", 640))
+# Opt-in prediction cache for repeated demo images (set ECG_CACHE=<path>)
+CACHE = PredictionCache(os.environ["ECG_CACHE"]) if os.environ.get("ECG_CACHE") else None
+# Opt-in prediction history (set ECG_RESULTS=<path>)
+STORE = ResultStore(os.environ["ECG_RESULTS"]) if os.environ.get("ECG_RESULTS") else None
+
+# Gradio queue: requests waiting together are handled as one batch of up to MAX_BATCH
+MAX_BATCH = int(os.environ.get("ECG_MAX_BATCH", 8))
+QUEUE_SIZE = int(os.environ.get("ECG_QUEUE_SIZE", 64))
+# Batches running at once; on a CPU node parallel forward passes only compete for the same cores
+CONCURRENCY = int(os.environ.get("ECG_CONCURRENCY", 1))
+
+
+def submitted():
+    """Click time, taken before the request waits in the queue."""
+    return time.time()
+
+
+def predict_ecg_batch(images, model_paths, submitted_at):
+    """
+    Batched Gradio handler: every argument holds one value per queued request.
 
-    status, jumlah_abnormal = analyze_ecg_results(results, model)
+    Requests are grouped by checkpoint and every group takes one
+    ``predict_batches`` call (one forward pass) on the warm registry model.
+    A failing group (e.g. a wrong model path) only fails its own requests.
 
-    plotted = results[0].plot()
-    plotted = cv2.cvtColor(plotted, cv2.COLOR_BGR2RGB)
-    plotted_image = Image.fromarray(plotted)
+    Args:
+        images (list): Uploaded image file paths (None when missing).
+        model_paths (list): Checkpoint per request.
+        submitted_at (list): Click time per request (see ``submitted``).
+
+    Returns:
+        tuple: (rendered images, analysis texts), one per request.
+    """
+    n = len(images)
+    plotted, texts, decoded = [None] * n, [""] * n, [None] * n
+    groups = defaultdict(list)
+    with tracing.span("gradio_predict", requests=n):
+        for i, (image, model_path) in enumerate(zip(images, model_paths)):
+            if not image:
+                texts[i] = "Harap unggah gambar ECG terlebih dahulu"
+                continue
+            # Decode once, no larger than inference needs: the same image feeds the model and the renderer
+            with tracing.stage("decode"):
+                decoded[i] = decode_source(image, IMGSZ)
+            if decoded[i] is None:
+                texts[i] = "File bukan gambar yang valid"
+                continue
+            groups[model_path].append(i)
+
+        for model_path, index in groups.items():
+            try:
+                model = get_model(model_path)
+                outputs = list(
+                    predict_batches(model, [decoded[i] for i in index], conf=inference_conf(POLICY),
+                                    imgsz=IMGSZ, batch=len(index), cache=CACHE)
+                )
+            except Exception as e:
+                for i in index:
+                    texts[i] = f"Gagal memproses dengan model {model_path}: {e}"
+                continue
+            _, detections, timings = zip(*outputs)
+            records = build_records([os.path.basename(images[i]) for i in index], detections,
+                                    VerdictEngine(model.names, POLICY), timings)
+            if STORE is not None:
+                STORE.add(records, model.names, model_path, "gradio", [images[i] for i in index], detections)
+
+            with tracing.stage("render"):
+                for i, dets, record in zip(index, detections, records):
+                    plotted[i] = render(decoded[i], dets, model.names, fmt="pil")
+                    texts[i] = (
+                        f"{record['verdict']}\nJumlah abnormal terdeteksi: {record['n_abnormal']}\n"
+                        f"Inferensi: {record['timings_ms']['total']:.0f} ms/gambar (batch {len(index)} gambar)"
+                    )
+
+    done = time.time()
+    for i, started in enumerate(submitted_at):
+        if started:
+            # Click to answer: queue wait included
+            texts[i] += f"\nLatensi: {(done - started) * 1000:.0f} ms"
+    return plotted, texts
+
+
+def predict_ecg(image, model_path):
+    """Single-request version of ``predict_ecg_batch``."""
+    plotted, texts = predict_ecg_batch([image], [model_path], [None])
+    return plotted[0], texts[0]
 
-    return plotted_image, f"{status}\nJumlah abnormal terdeteksi: {jumlah_abnormal}"
 
 with gr.Blocks() as demo:
     gr.Markdown("## 🫀 ECG Detection with YOLO11")
@@ -38,8 +116,19 @@ with gr.Blocks() as demo:
         image_output = gr.Image(type="pil", label="Hasil Deteksi")
         text_output = gr.Textbox(label="Analisis")
     btn = gr.Button("Deteksi Sekarang")
-    btn.click(fn=predict_ecg, inputs=[image_input, model_input], outputs=[image_output, text_output])
+    submitted_at = gr.State()
+    # Stamp the click outside the queue, then wait for a batch slot; the outputs show the
+    # queue position and ETA while waiting
+    btn.click(fn=submitted, outputs=submitted_at, queue=False).then(
+        fn=predict_ecg_batch,
+        inputs=[image_input, model_input, submitted_at],
+        outputs=[image_output, text_output],
+        batch=True,
+        max_batch_size=MAX_BATCH,
+        concurrency_limit=CONCURRENCY,
+        show_progress="full",
+    )
+    demo.queue(max_size=QUEUE_SIZE)
 
 if __name__ == "__main__":
     demo.launch()
- 
\ No newline at end of file
@@ -1,53 +1,165 @@
 import argparse
-from ultralytics import YOLO
-from models.yolo_trainer import train_yolo
+import os
+import sys
 
+# Allow `python src/main.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def analyze_ecg_results(results, model):
+from src.analysis.verdict import VerdictEngine, analyze_ecg_results, inference_conf, load_policy
+from src.data.image_cache import DEFAULT_IMAGE_CACHE_DIR
+from src.models.batch_predict import build_records, collect_images, run_batch_prediction
+from src.models.cascade import DEFAULT_CASCADE_PATH, CascadePredictor
+from src.models.inference import predict_batches
+from src.models.monitor import LatestFrameReader, open_capture, run_monitor
+from src.models.prediction_cache import DEFAULT_CACHE_PATH, PredictionCache
+from src.models.registry import get_model
+from src.models.result_store import DEFAULT_RESULTS_PATH, ResultStore
+from src.models.yolo_trainer import load_train_params, train_yolo
+
+
+# Defaults of the flags params.yaml can also set: train mode takes them only for keys the
+# params file leaves out, so an explicit flag always wins even when it equals the default
+DEFAULTS = {"model": "yolo11n.pt", "data": "config/data.yaml", "epochs": 50, "imgsz": 640, "batch": 16}
+
+
+def print_ecg_verdict(results, model, policy):
     """
-    Analisis hasil YOLO prediksi ECG (tanpa detail per box).
+    Tampilkan hasil analisis ECG (tanpa detail per box).
     """
-    jumlah_abnormal = sum(
-        1 for r in results for box in r.boxes if model.names[int(box.cls[0])] == "abnormal"
-    )
-
-    # Decision logic
-    if len(results[0].boxes) == 0:
-        print("✅ Detak jantung sehat (Normal)")
-    elif jumlah_abnormal > 5:
-        print("⚠️ Detak jantung abnormal, perlu istirahat")
-    elif jumlah_abnormal > 0:
-        print("⚠️ Detak jantung abnormal ringan, kurangi merokok dan lebihkan olahraga")
-    else:
-        print("⚠️ Deteksi muncul tapi bukan label 'abnormal'")
-
+    status, jumlah_abnormal = analyze_ecg_results(results, model.names, policy)
+    print(status)
     print(f"Jumlah abnormal terdeteksi: {jumlah_abnormal}")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", type=str, choices=["train", "predict"], required=True)
-    parser.add_argument("--model", type=str, default="yolo11n.pt", help="Path model .pt")
-    parser.add_argument("--data", type=str, default="config/data.yaml", help="Path data.yaml")
-    parser.add_argument("--image", type=str, help="Path ke gambar ECG untuk prediksi")
-    parser.add_argument("--epochs", type=int, default=50)
-    parser.add_argument("--imgsz", type=int, default=640)
-    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--mode", type=str, choices=["train", "predict", "monitor"], required=True)
+    parser.add_argument("--model", type=str,
+                        help="Path model (.pt, .onnx, atau folder *_openvino_model; default yolo11n.pt)")
+    parser.add_argument("--data", type=str, help="Path data.yaml (default config/data.yaml)")
+    parser.add_argument("--params", type=str, default="config/params.yaml",
+                        help="Mode train: hyperparameter dasar (flag yang diberikan menimpa nilainya)")
+    parser.add_argument("--image", type=str, nargs="+",
+                        help="Gambar ECG, folder, pola glob, atau file .txt berisi daftar gambar")
+    parser.add_argument("--output", type=str, help="File hasil batch (.jsonl atau .csv)")
+    parser.add_argument("--format", type=str, choices=["jsonl", "csv"], help="Format output (default dari ekstensi)")
+    parser.add_argument("--resume", action="store_true", help="Lewati gambar yang sudah ada di --output")
+    parser.add_argument("--conf", type=float, help="Confidence threshold (default dari --policy)")
+    parser.add_argument("--cache", type=str, nargs="?", const=DEFAULT_CACHE_PATH,
+                        help="Gunakan cache prediksi (SQLite) di path ini")
+    parser.add_argument("--results", type=str, nargs="?", const=DEFAULT_RESULTS_PATH,
+                        help="Simpan riwayat hasil prediksi (SQLite) di path ini")
+    parser.add_argument("--cascade", type=str, nargs="?", const=DEFAULT_CASCADE_PATH,
+                        help="Pakai cascade model hasil kalibrasi (JSON) sebagai ganti --model")
+    parser.add_argument("--tile", type=str, choices=["never", "auto", "always"], default="never",
+                        help="Inferensi per potongan (tile) untuk strip panjang / scan resolusi tinggi")
+    parser.add_argument("--source", type=str, default="0", help="Mode monitor: indeks webcam atau file/URL video")
+    parser.add_argument("--fps", type=float, default=5.0, help="Mode monitor: target frame dianalisis per detik")
+    parser.add_argument("--window", type=float, default=10.0, help="Mode monitor: jendela verdict (detik)")
+    parser.add_argument("--diff", type=float, default=0.01,
+                        help="Mode monitor: beda minimal antar frame untuk inferensi ulang (0 = selalu)")
+    parser.add_argument("--policy", type=str, help="Path policy verdict (default config/policy.yaml)")
+    parser.add_argument("--epochs", type=int, help="Default 50")
+    parser.add_argument("--imgsz", type=int, help="Default 640")
+    parser.add_argument("--batch", type=int, help="Default 16")
+    parser.add_argument("--image-cache", type=str, nargs="?", const=DEFAULT_IMAGE_CACHE_DIR,
+                        help="Latih dari cache gambar yang sudah di-resize (memmap) di folder ini")
     args = parser.parse_args()
+    # Flags actually given on the command line (None: not given)
+    given = {key: getattr(args, key) for key in DEFAULTS}
+    for key, value in DEFAULTS.items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
 
     if args.mode == "predict":
         if not args.image:
             raise ValueError("Harap berikan path gambar ECG dengan --image")
 
-        model = YOLO(args.model)
-        results = model(args.image, conf=0.3)
-        analyze_ecg_results(results, model)
+        policy = load_policy(args.policy, profile="cli")
+        if args.conf is not None:
+            policy["conf"] = args.conf
+
+        # Single-shot run: a warm-up pass would only add latency here
+        if args.cascade:
+            model = CascadePredictor.from_calibration(args.cascade, policy, lambda p: get_model(p, warmup=False))
+        else:
+            model = get_model(args.model, warmup=False)
+        images = collect_images(args.image)
+        cache = PredictionCache(args.cache) if args.cache else None
+        tile = {"mode": args.tile} if args.tile != "never" else None
+        store = ResultStore(args.results) if args.results else None
+
+        if len(images) == 1 and not args.output:
+            _, detections, timings = next(
+                predict_batches(
+                    model, images, conf=inference_conf(policy), imgsz=args.imgsz, batch=1, cache=cache, tile=tile
+                )
+            )
+            print_ecg_verdict([detections], model, policy)
+            if "tier" in timings:
+                print(f"Model cascade: {timings['tier']}")
+            if store is not None:
+                records = build_records(images, [detections], VerdictEngine(model.names, policy), [timings])
+                store.add(records, model.names, model, "cli", images, [detections])
+        else:
+            summary = run_batch_prediction(
+                model,
+                images,
+                output=args.output,
+                fmt=args.format,
+                policy=policy,
+                imgsz=args.imgsz,
+                batch=args.batch,
+                resume=args.resume,
+                cache=cache,
+                tile=tile,
+                store=store,
+            )
+            print(
+                f"Selesai: {summary['processed']} diproses, {summary['skipped']} dilewati, "
+                f"{summary['failed']} gagal dari {summary['total']} gambar",
+                file=sys.stderr,
+            )
+        if store is not None:
+            # Wait for the background writer before the process exits
+            store.close()
+
+    elif args.mode == "monitor":
+        policy = load_policy(args.policy, profile="cli")
+        if args.conf is not None:
+            policy["conf"] = args.conf
+        model = get_model(args.model)
+        # Local video files replay at their own FPS, like a live monitor; cameras and
+        # streams (rtsp://, http://) already deliver frames in real time
+        reader = LatestFrameReader(open_capture(args.source), realtime=os.path.isfile(args.source)).start()
+        last_status, event = None, None
+        try:
+            for event in run_monitor(
+                model, reader, policy, fps=args.fps, window_s=args.window, imgsz=args.imgsz, diff_threshold=args.diff
+            ):
+                verdict = event["verdict"]
+                if verdict["status"] != last_status:
+                    print(
+                        f"[frame {event['frame']}] {verdict['status']} "
+                        f"(abnormal/frame {verdict['abnormal_per_frame']:.2f}, {verdict['frames']} frame)"
+                    )
+                    last_status = verdict["status"]
+        except KeyboardInterrupt:
+            pass
+        finally:
+            reader.stop()
+        if event:
+            print(
+                f"Selesai: {event['captured']} frame ditangkap, {event['dropped']} dibuang, "
+                f"{event['inferred']} diinferensi, {event['skipped']} dilewati (tidak berubah), "
+                f"latensi terakhir {event['latency_ms']:.0f} ms",
+                file=sys.stderr,
+            )
 
     elif args.mode == "train":
-        train_yolo(
-            data=args.data,
-            model=args.model,
-            epochs=args.epochs,
-            imgsz=args.imgsz,
-            batch=args.batch,
-        )
+        # params.yaml is the base config; flags given on the command line win
+        params = load_train_params(args.params)
+        for key, value in given.items():
+            if value is not None or key not in params:
+                params[key] = getattr(args, key)
+        train_yolo(**params, image_cache=args.image_cache)
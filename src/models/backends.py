@@ -0,0 +1,47 @@
+# inference backends: PyTorch checkpoints and exported ONNX / OpenVINO models
+import os
+
+from ultralytics import YOLO
+
+BACKENDS = ("pytorch", "onnxruntime", "openvino")
+
+
+def backend_of(model_path):
+    """
+    Inference backend of a model path.
+
+    Args:
+        model_path (str): ``.pt`` checkpoint, ``.onnx`` file or Ultralytics
+            ``*_openvino_model`` folder (or its ``.xml``).
+
+    Returns:
+        str: One of ``BACKENDS``.
+    """
+    path = os.path.normpath(model_path)
+    if path.endswith(".onnx"):
+        return "onnxruntime"
+    if path.endswith("_openvino_model") or path.endswith(".xml"):
+        return "openvino"
+    return "pytorch"
+
+
+def load_model(model_path):
+    """
+    Load any supported model behind the Ultralytics ``YOLO`` API.
+
+    Exported models run through ONNX Runtime or OpenVINO but keep
+    ``predict`` / ``names`` / results identical to a PyTorch checkpoint, so
+    every caller of ``predict_batches`` works unchanged.
+
+    Args:
+        model_path (str): Model path (see ``backend_of``).
+
+    Returns:
+        YOLO: Loaded model.
+    """
+    if backend_of(model_path) == "pytorch":
+        return YOLO(model_path)
+    if model_path.endswith(".xml"):
+        model_path = os.path.dirname(model_path)
+    # Exported files carry no task metadata Ultralytics can rely on
+    return YOLO(model_path, task="detect")
@@ -0,0 +1,211 @@
+# batch prediction over folders/globs with streamed JSONL/CSV output
+import csv
+import glob
+import json
+import os
+import sys
+
+from src.analysis.verdict import VerdictEngine, inference_conf
+from src.models.inference import predict_batches
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+CSV_FIELDS = [
+    "path", "verdict", "level", "tier", "n_abnormal", "n_detections", "counts",
+    "boxes", "classes", "confidences", "orig_shape", "timings_ms", "error",
+]
+
+
+def collect_images(sources):
+    """
+    Expand directories, glob patterns and list files into image paths.
+
+    Args:
+        sources (list): Items that are image files, directories, glob
+            patterns, or ``.txt`` files listing one image path per line.
+
+    Returns:
+        list: De-duplicated image paths in input order.
+    """
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            found = sorted(
+                p for p in glob.glob(os.path.join(source, "*")) if p.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        elif glob.has_magic(source):
+            found = sorted(
+                p for p in glob.glob(source, recursive=True) if p.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        elif source.lower().endswith(".txt"):
+            with open(source, "r") as f:
+                found = [line.strip() for line in f if line.strip()]
+        else:
+            found = [source]
+        paths.extend(found)
+    return list(dict.fromkeys(paths))
+
+
+def build_records(paths, detections, engine, timings):
+    """
+    Build output records for a batch of images.
+
+    Args:
+        paths (list): Image paths (or names).
+        detections (list): ``Detections`` per image.
+        engine (VerdictEngine): Verdict engine; analyzes the whole batch at once.
+        timings (list): Timing dicts per image.
+
+    Returns:
+        list: One record dict per image.
+    """
+    records = []
+    for path, dets, verdict, timing in zip(paths, detections, engine.analyze(detections), timings):
+        record = {"path": path}
+        record.update(verdict.to_dict())
+        record.update(dets.to_dict(engine.names))
+        if "tier" in timing:
+            # Checkpoint of a cascade that produced this verdict
+            timing = dict(timing)
+            record["tier"] = timing.pop("tier")
+        record["timings_ms"] = timing
+        records.append(record)
+    return records
+
+
+def load_done_paths(output_path):
+    """
+    Read the image paths already present in an output file.
+
+    Args:
+        output_path (str): Existing JSONL or CSV output.
+
+    Returns:
+        set: Paths that were processed successfully.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r", newline="") as f:
+        if output_path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if not row.get("error"):
+                done.add(row["path"])
+    return done
+
+
+class RecordWriter:
+    """
+    Append records to a JSONL or CSV stream, flushing after every write.
+
+    Args:
+        stream (file): Open text file (or ``sys.stdout``).
+        fmt (str): 'jsonl' or 'csv'.
+        write_header (bool): Write the CSV header row.
+    """
+
+    def __init__(self, stream, fmt="jsonl", write_header=True):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == "csv":
+            self._csv = csv.DictWriter(stream, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if write_header:
+                self._csv.writeheader()
+
+    def write(self, record):
+        if self.fmt == "csv":
+            row = {
+                k: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+                for k, v in record.items()
+            }
+            self._csv.writerow(row)
+        else:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+def predict_safely(model, paths, conf, imgsz, batch, cache=None, tile=None):
+    """
+    Predict in batches; on a failing batch, fall back to one image at a time.
+
+    Yields:
+        list: (path, Detections or None, timings dict or error text) per batch.
+    """
+    for start in range(0, len(paths), batch):
+        chunk = paths[start:start + batch]
+        try:
+            yield list(predict_batches(model, chunk, conf=conf, imgsz=imgsz, batch=batch, cache=cache, tile=tile))
+        except Exception:
+            outputs = []
+            for path in chunk:
+                try:
+                    outputs.extend(
+                        predict_batches(model, [path], conf=conf, imgsz=imgsz, batch=1, cache=cache, tile=tile)
+                    )
+                except Exception as e:
+                    outputs.append((path, None, repr(e)))
+            yield outputs
+
+
+def run_batch_prediction(
+    model, sources, output=None, fmt=None, policy=None, imgsz=640, batch=16, resume=False, cache=None, tile=None,
+    store=None,
+):
+    """
+    Predict every image in ``sources`` and stream one record per image.
+
+    Args:
+        model (YOLO): Loaded model.
+        sources (list): Files, directories, globs or list files.
+        output (str): Output path (.jsonl or .csv); None writes JSONL to stdout.
+        fmt (str): 'jsonl' or 'csv'; inferred from ``output`` when None.
+        policy (dict): Verdict policy (see ``load_policy``); also sets the
+            inference confidence threshold.
+        imgsz (int): Inference image size.
+        batch (int): Images per forward pass.
+        resume (bool): Skip images already recorded in ``output``.
+        cache (PredictionCache): Optional prediction cache.
+        tile (dict): Tiled inference options (see ``predict_tiled``).
+        store (ResultStore): Optional prediction history to record into.
+
+    Returns:
+        dict: Summary with total, skipped, processed and failed counts.
+    """
+    paths = collect_images(sources)
+    fmt = fmt or ("csv" if output and output.endswith(".csv") else "jsonl")
+    engine = VerdictEngine(model.names, policy)
+
+    done = load_done_paths(output) if (resume and output) else set()
+    todo = [p for p in paths if p not in done]
+    summary = {"total": len(paths), "skipped": len(paths) - len(todo), "processed": 0, "failed": 0}
+
+    if output:
+        append = resume and os.path.exists(output)
+        stream = open(output, "a" if append else "w", newline="")
+        write_header = not (append and os.path.getsize(output) > 0)
+    else:
+        stream, write_header = sys.stdout, True
+
+    try:
+        writer = RecordWriter(stream, fmt=fmt, write_header=write_header)
+        conf = inference_conf(engine.policy)
+        for outputs in predict_safely(model, todo, conf, imgsz, batch, cache, tile):
+            ok = [o for o in outputs if o[1] is not None]
+            for path, _, error in (o for o in outputs if o[1] is None):
+                writer.write({"path": path, "error": error})
+                summary["failed"] += 1
+            if ok:
+                paths_ok, detections, timings = zip(*ok)
+                records = build_records(paths_ok, detections, engine, timings)
+                for record in records:
+                    writer.write(record)
+                if store is not None:
+                    store.add(records, model.names, model, "batch", paths_ok, detections)
+                summary["processed"] += len(ok)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return summary
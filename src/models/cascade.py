@@ -0,0 +1,259 @@
+# model cascade: small checkpoint first, larger ones only for uncertain scans
+import argparse
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+
+# Allow `python src/models/cascade.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.verdict import VerdictEngine, inference_conf, load_policy
+from src.models.inference import Detections, predict_batches
+from src.models.registry import get_model
+
+DEFAULT_CASCADE_PATH = "runs/cascade.json"
+
+# Calibration grid of the escalation rule of each tier
+BAND_LOWS = (0.05, 0.1, 0.15, 0.2)
+BAND_HIGH_OFFSETS = (0.0, 0.1, 0.2, 0.3)
+COUNT_MARGINS = (0, 1, 2)
+
+
+def escalation_mask(engine, detections, band, count_margin=0):
+    """
+    Which images a tier is unsure about.
+
+    An image escalates when a detection's confidence falls inside ``band``
+    (close to the policy cutoff, so a better model may flip it), or when its
+    abnormal count is within ``count_margin`` boxes of changing the verdict
+    level (to normal, or across ``severe_threshold``).
+
+    Args:
+        engine (VerdictEngine): Verdict engine of the policy.
+        detections (list): ``Detections`` per image (predicted at or below
+            ``band[0]``).
+        band (tuple): (low, high) uncertain confidence range.
+        count_margin (int): Boxes from a verdict boundary that count as close.
+
+    Returns:
+        numpy.ndarray: Boolean mask, True for images to escalate.
+    """
+    if not detections:
+        return np.zeros(0, dtype=bool)
+    low, high = band
+    in_band = np.array([int(((d.scores >= low) & (d.scores < high)).sum()) for d in detections])
+    _, abnormal, _ = engine.levels(engine.count(detections))
+    severe = engine.policy["severe_threshold"]
+    to_normal = np.where(abnormal > 0, abnormal, np.iinfo(np.int64).max)
+    to_severe = np.where(abnormal > severe, abnormal - severe, severe + 1 - abnormal)
+    near = np.minimum(to_normal, to_severe) <= count_margin
+    return (in_band > 0) | near
+
+
+def _above(detections, conf):
+    keep = detections.scores >= conf
+    return Detections(detections.boxes[keep], detections.scores[keep], detections.classes[keep], detections.orig_shape)
+
+
+class CascadePredictor:
+    """
+    Predict with a chain of models of increasing cost.
+
+    Every image goes through the first tier; only those ``escalation_mask``
+    flags move on to the next one, and the last tier always answers. The
+    predictor stands in for a model anywhere ``predict_batches`` is used
+    (CLI, batch runs, API): it exposes ``names`` and yields the usual
+    outputs, with the answering checkpoint in ``timings["tier"]`` and the
+    time spent in every tier visited in ``timings["total"]``.
+
+    Args:
+        tiers (list): Dicts with ``model`` (path) and, for all but the last,
+            ``band`` and ``count_margin`` (see ``calibrate_cascade``).
+        policy (dict): Verdict policy the tiers were calibrated for.
+        loader (callable): Function that loads a model from a path.
+    """
+
+    def __init__(self, tiers, policy=None, loader=get_model):
+        if not tiers:
+            raise ValueError("a cascade needs at least one tier")
+        self.tiers = tiers
+        self.models = [loader(tier["model"]) for tier in tiers]
+        self.names = self.models[0].names
+        if any(dict(m.names) != dict(self.names) for m in self.models):
+            raise ValueError("every tier of a cascade must share the same class names")
+        self.engine = VerdictEngine(self.names, policy)
+        self.answered = [0] * len(tiers)
+
+    @classmethod
+    def from_calibration(cls, path=DEFAULT_CASCADE_PATH, policy=None, loader=get_model):
+        """Build from the JSON written by ``calibrate_cascade``."""
+        with open(path) as f:
+            return cls(json.load(f)["tiers"], policy, loader)
+
+    def predict_batches(self, sources, conf=0.3, imgsz=640, batch=16, cache=None, iou=0.7, tile=None):
+        """
+        Cascade counterpart of ``predict_batches`` (which delegates here).
+
+        Yields:
+            tuple: (source, Detections, timings_ms dict) in input order.
+        """
+        outputs = [None] * len(sources)
+        spent = [0.0] * len(sources)
+        pending = list(range(len(sources)))
+        for k, (tier, model) in enumerate(zip(self.tiers, self.models)):
+            if not pending:
+                break
+            last = k == len(self.tiers) - 1
+            # Non-final tiers also need the boxes inside the uncertain band
+            tier_conf = conf if last else min(conf, tier["band"][0])
+            results = list(
+                predict_batches(model, [sources[i] for i in pending], conf=tier_conf, imgsz=imgsz, batch=batch,
+                                cache=cache, iou=iou, tile=tile)
+            )
+            detections = [d for _, d, _ in results]
+            if last:
+                escalate = np.zeros(len(pending), dtype=bool)
+            else:
+                escalate = escalation_mask(self.engine, detections, tier["band"], tier.get("count_margin", 0))
+
+            for i, (source, dets, timings), up in zip(pending, results, escalate):
+                spent[i] += timings["total"]
+                if not up:
+                    timings = dict(timings, total=round(spent[i], 2), tier=tier["model"])
+                    outputs[i] = (source, _above(dets, conf), timings)
+                    self.answered[k] += 1
+            pending = [i for i, up in zip(pending, escalate) if up]
+        yield from outputs
+
+
+def _tier_predictions(model, image_paths, conf, imgsz, batch):
+    detections, elapsed = [], []
+    for _, dets, timings in predict_batches(model, image_paths, conf=conf, imgsz=imgsz, batch=batch):
+        detections.append(dets)
+        elapsed.append(timings["total"])
+    return detections, float(np.mean(elapsed)) if elapsed else 0.0
+
+
+def _candidates(policy_conf):
+    """Escalation rules to try, cheapest (never escalate) first."""
+    yield (1.0, 1.0), 0
+    for low, offset, margin in itertools.product(BAND_LOWS, BAND_HIGH_OFFSETS, COUNT_MARGINS):
+        high = round(policy_conf + offset, 4)
+        if low < high:
+            yield (low, high), margin
+
+
+def calibrate_cascade(model_paths, image_paths, policy=None, tolerance=0.02, imgsz=640, batch=8, loader=get_model):
+    """
+    Choose the escalation rule of every tier on validation images (no labels needed).
+
+    The last (largest) model's verdicts are the reference. Tiers are tuned
+    from the smallest up: each takes the rule that escalates the fewest of
+    the images reaching it while keeping the verdicts it answers within its
+    share of ``tolerance`` (the share of all images allowed to disagree with
+    the reference), so the whole cascade stays within ``tolerance``. A tier
+    that cannot meet its share is left out.
+
+    Args:
+        model_paths (list): Checkpoints from cheapest to most accurate.
+        image_paths (list): Calibration images (e.g. ``data_ecg/val``).
+        policy (dict): Verdict policy.
+        tolerance (float): Maximum share of verdicts differing from the last model.
+        imgsz (int): Inference size.
+        batch (int): Inference batch size.
+        loader (callable): Function that loads a model from a path.
+
+    Returns:
+        dict: ``tiers`` (for ``CascadePredictor``) plus the simulated
+        agreement, mean cost per image and speedup over the last model.
+    """
+    engine = VerdictEngine(loader(model_paths[0]).names, policy)
+    policy_conf = inference_conf(engine.policy)
+    predict_conf = min(min(BAND_LOWS), policy_conf)
+
+    detections, latency = [], []
+    for path in model_paths:
+        dets, ms = _tier_predictions(loader(path), image_paths, predict_conf, imgsz, batch)
+        detections.append(dets)
+        latency.append(ms)
+    levels = [engine.levels(engine.count(dets))[0] for dets in detections]
+    reference = levels[-1]
+
+    n = len(image_paths)
+    budget = tolerance * n
+    active = np.arange(n)
+    cost = np.zeros(n)
+    tiers = []
+    for k, path in enumerate(model_paths):
+        if k == len(model_paths) - 1:
+            cost[active] += latency[k]
+            tiers.append({"model": path, "answered": int(len(active)), "ms_per_image": round(latency[k], 2)})
+            break
+        share = (budget - sum(t["disagree"] for t in tiers)) / (len(model_paths) - 1 - k)
+        agree = levels[k][active] == reference[active]
+        best = None
+        for band, margin in _candidates(policy_conf):
+            escalate = escalation_mask(engine, [detections[k][i] for i in active], band, margin)
+            wrong = int((~agree & ~escalate).sum())
+            if wrong <= share and (best is None or escalate.sum() < best[2].sum()):
+                best = (band, margin, escalate, wrong)
+        if best is None:
+            # No rule of this tier is accurate enough: it would only add latency
+            continue
+        band, margin, escalate, wrong = best
+        cost[active] += latency[k]
+        tiers.append({
+            "model": path,
+            "band": [float(band[0]), float(band[1])],
+            "count_margin": int(margin),
+            "answered": int((~escalate).sum()),
+            "escalate_rate": round(float(escalate.mean()) if len(active) else 0.0, 4),
+            "ms_per_image": round(latency[k], 2),
+            "disagree": wrong,
+        })
+        active = active[escalate]
+
+    disagree = sum(t.pop("disagree", 0) for t in tiers)
+    mean_ms = float(cost.mean()) if n else 0.0
+    return {
+        "tiers": tiers,
+        "images": n,
+        "tolerance": tolerance,
+        "agreement": round(1 - disagree / n, 4) if n else 1.0,
+        "mean_ms_per_image": round(mean_ms, 2),
+        "reference_ms_per_image": round(latency[-1], 2),
+        "speedup": round(latency[-1] / mean_ms, 2) if mean_ms else None,
+    }
+
+
+if __name__ == "__main__":
+    from src.models.batch_predict import collect_images
+
+    parser = argparse.ArgumentParser(description="Kalibrasi cascade model (kecil dulu, besar bila ragu)")
+    parser.add_argument("--models", type=str, nargs="+", required=True,
+                        help="Checkpoint dari yang termurah ke yang paling akurat")
+    parser.add_argument("--images", type=str, nargs="+", default=["data_ecg/val/images"])
+    parser.add_argument("--policy", type=str, help="Path policy verdict (default config/policy.yaml)")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Maks. porsi verdict yang boleh beda")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--output", type=str, default=DEFAULT_CASCADE_PATH)
+    args = parser.parse_args()
+
+    report = calibrate_cascade(
+        args.models, collect_images(args.images), load_policy(args.policy, profile="cli"), args.tolerance,
+        args.imgsz, args.batch,
+    )
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for tier in report["tiers"]:
+        print(f"{tier['model']}: menjawab {tier['answered']} gambar, {tier['ms_per_image']:.1f} ms/gambar")
+    print(
+        f"Kecocokan verdict {report['agreement']:.1%} (toleransi {args.tolerance:.1%}), "
+        f"{report['mean_ms_per_image']:.1f} ms/gambar vs {report['reference_ms_per_image']:.1f} "
+        f"({report['speedup']}x) -> {args.output}"
+    )
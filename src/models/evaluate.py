@@ -0,0 +1,59 @@
+# offline detection evaluation: stored predictions (or a model run) against YOLO labels
+import argparse
+import json
+import os
+import sys
+import time
+
+# Allow `python src/models/evaluate.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.data_loader import load_images_from_folder
+from src.data.label_index import LabelIndex
+from src.models.prediction_cache import PredictionCache
+from src.models.registry import get_model
+from src.models.yolo_eval import evaluate_detections, load_predictions, predict_split
+from src.utils.config import load_config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate stored predictions against YOLO labels")
+    parser.add_argument("--predictions", type=str, help="JSONL from main.py --mode predict --output")
+    parser.add_argument("--model", type=str, help="Predict --images with this model instead of --predictions")
+    parser.add_argument("--images", type=str, default="data_ecg/val/images", help="Images folder for --model")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--cache", type=str, help="Prediction cache (SQLite) used with --model")
+    parser.add_argument("--data", type=str, default="config/data.yaml", help="Path data.yaml (class names)")
+    parser.add_argument("--index", type=str, help="Label index folder (see src.data.label_index)")
+    parser.add_argument("--output", type=str, help="Write metrics and PR curves as JSON")
+    args = parser.parse_args()
+    if not (args.predictions or args.model):
+        parser.error("either --predictions or --model is required")
+
+    names = dict(enumerate(load_config(args.data)["names"]))
+    if args.model:
+        cache = PredictionCache(args.cache) if args.cache else None
+        predictions = predict_split(
+            get_model(args.model, warmup=False), load_images_from_folder(args.images), imgsz=args.imgsz, cache=cache
+        )
+    else:
+        predictions = load_predictions(args.predictions, names)
+
+    t0 = time.perf_counter()
+    index = LabelIndex.load(args.index) if args.index else None
+    metrics = evaluate_detections(predictions, names, index=index)
+    elapsed = time.perf_counter() - t0
+
+    print(f"Images: {metrics['images']}  mAP50: {metrics['mAP50']:.4f}  mAP50-95: {metrics['mAP50-95']:.4f}  ({elapsed:.3f}s)")
+    for name, m in metrics["per_class"].items():
+        print(f"  {name:<10} P={m['precision']:.3f} R={m['recall']:.3f} mAP50={m['mAP50']:.3f} mAP50-95={m['mAP50-95']:.3f}")
+    print("Confusion matrix (rows: predicted, cols: true, last: background):")
+    print(metrics["confusion_matrix"])
+
+    if args.output:
+        metrics["pr_curves"] = {
+            "recall": metrics["pr_curves"]["recall"].tolist(),
+            "precision": {names[c]: p.tolist() for c, p in enumerate(metrics["pr_curves"]["precision"])},
+        }
+        metrics["confusion_matrix"] = metrics["confusion_matrix"].tolist()
+        with open(args.output, "w") as f:
+            json.dump(metrics, f, indent=2)
@@ -0,0 +1,201 @@
+# export checkpoints for CPU serving (ONNX, INT8 ONNX, OpenVINO) and check parity
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from ultralytics import YOLO
+
+from src.data.data_loader import iter_batches, load_images_from_folder
+from src.models.backends import backend_of, load_model
+from src.models.inference import box_iou, predict_batches
+from src.models.yolo_eval import evaluate_detections, match_predictions
+from src.utils.config import load_config
+
+
+def export_onnx(weights, imgsz=640, dynamic=True):
+    """
+    Export a checkpoint to ONNX (next to the checkpoint).
+
+    Returns:
+        str: Path of the ``.onnx`` file.
+    """
+    return YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True)
+
+
+def export_openvino(weights, imgsz=640, int8=False, data=None, dynamic=False):
+    """
+    Export a checkpoint to an OpenVINO folder, optionally INT8 (NNCF
+    calibrated on the val split of ``data``).
+
+    Returns:
+        str: Path of the ``*_openvino_model`` folder.
+    """
+    kwargs = {"int8": True, "data": data} if int8 else {}
+    return YOLO(weights).export(format="openvino", imgsz=imgsz, dynamic=dynamic, **kwargs)
+
+
+class _CalibrationReader:
+    """ONNX Runtime calibration reader feeding letterboxed RGB float images."""
+
+    def __init__(self, input_name, image_paths, imgsz):
+        self.input_name = input_name
+        self.batches = iter_batches(image_paths, batch=1, imgsz=imgsz)
+
+    def get_next(self):
+        batch = next(self.batches, None)
+        if batch is None:
+            return None
+        images = batch[1][..., ::-1].transpose(0, 3, 1, 2)  # BGR HWC -> RGB CHW
+        return {self.input_name: np.ascontiguousarray(images, dtype=np.float32) / 255.0}
+
+
+def quantize_onnx_int8(onnx_path, calib_images, imgsz=640, output=None, max_images=128):
+    """
+    Statically quantize an ONNX model to INT8 with ONNX Runtime.
+
+    Activations are calibrated on real ECG images, preprocessed exactly as
+    Ultralytics does at inference (letterbox, RGB, 0-1).
+
+    Args:
+        onnx_path (str): FP32 ONNX model.
+        calib_images (list): Calibration image paths.
+        imgsz (int): Calibration image size.
+        output (str): INT8 model path (default ``<name>_int8.onnx``).
+        max_images (int): Maximum calibration images.
+
+    Returns:
+        str: Path of the INT8 model.
+    """
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    output = output or os.path.splitext(onnx_path)[0] + "_int8.onnx"
+    prepared = os.path.splitext(output)[0] + "_prep.onnx"
+    quant_pre_process(onnx_path, prepared, skip_symbolic_shape=True)
+
+    input_name = onnxruntime.InferenceSession(prepared, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = _CalibrationReader(input_name, list(calib_images)[:max_images], imgsz)
+    quantize_static(
+        prepared, output, reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+        # Box decoding stays in float: quantized DFL / concat outputs lose box precision
+        op_types_to_quantize=["Conv", "MatMul"],
+    )
+    os.remove(prepared)
+    return output
+
+
+def box_agreement(reference, candidate, conf=0.25, iou=0.5):
+    """
+    Share of boxes two models agree on (same class, IoU >= ``iou``).
+
+    Args:
+        reference (dict): {image path: Detections} of the reference model.
+        candidate (dict): {image path: Detections} of the candidate model.
+        conf (float): Confidence cutoff applied to both.
+        iou (float): IoU needed for two boxes to agree.
+
+    Returns:
+        float: 2 * matched / (reference boxes + candidate boxes), 1.0 when
+        neither model detects anything.
+    """
+    matched, total = 0, 0
+    for path, ref in reference.items():
+        cand = candidate[path]
+        r, c = ref.scores >= conf, cand.scores >= conf
+        total += int(r.sum()) + int(c.sum())
+        overlap = box_iou(ref.boxes[r], cand.boxes[c])
+        matched += int(match_predictions(cand.classes[c], ref.classes[r], overlap, np.array([iou])).sum())
+    return 2 * matched / total if total else 1.0
+
+
+def _timed_predictions(model, image_paths, conf, imgsz, batch):
+    predictions, elapsed = {}, []
+    for path, detections, timings in predict_batches(model, image_paths, conf=conf, imgsz=imgsz, batch=batch):
+        predictions[path] = detections
+        elapsed.append(timings["total"])
+    return predictions, float(np.mean(elapsed)) if elapsed else 0.0
+
+
+def parity_check(reference_path, candidate_path, image_paths, names, imgsz=640, batch=1, conf=0.25):
+    """
+    Compare an exported model against its PyTorch reference on labelled images.
+
+    Args:
+        reference_path (str): Reference model (usually the ``.pt``).
+        candidate_path (str): Exported model.
+        image_paths (list): Labelled images.
+        names (dict): Class id -> name mapping.
+        imgsz (int): Inference size.
+        batch (int): Inference batch size.
+        conf (float): Confidence cutoff of the box agreement.
+
+    Returns:
+        dict: mAP50 / mAP50-95 of both, their deltas, box agreement and mean
+        latency per image (ms).
+    """
+    report = {}
+    predictions = {}
+    for role, path in (("reference", reference_path), ("candidate", candidate_path)):
+        model = load_model(path)
+        predictions[role], latency = _timed_predictions(model, image_paths, 0.001, imgsz, batch)
+        metrics = evaluate_detections(predictions[role], names)
+        report[role] = {
+            "model": path,
+            "backend": backend_of(path),
+            "mAP50": round(metrics["mAP50"], 4),
+            "mAP50-95": round(metrics["mAP50-95"], 4),
+            "ms_per_image": round(latency, 2),
+        }
+    for key in ("mAP50", "mAP50-95"):
+        report[f"{key}_delta"] = round(report["candidate"][key] - report["reference"][key], 4)
+    report["box_agreement"] = round(box_agreement(predictions["reference"], predictions["candidate"], conf), 4)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a checkpoint for CPU serving and check parity")
+    parser.add_argument("--weights", type=str, default="runs/yolo11s/best.pt")
+    parser.add_argument("--formats", type=str, nargs="+", choices=["onnx", "onnx-int8", "openvino", "openvino-int8"],
+                        default=["onnx", "onnx-int8"])
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calib", type=str, default="data_ecg/val/images", help="Calibration / parity images")
+    parser.add_argument("--data", type=str, default="config/data.yaml", help="data.yaml (names, OpenVINO INT8)")
+    parser.add_argument("--parity", action="store_true", help="Compare each export against --weights")
+    parser.add_argument("--output", type=str, help="Write the parity report as JSON")
+    args = parser.parse_args()
+
+    images = sorted(load_images_from_folder(args.calib, ("*.jpg", "*.jpeg", "*.png")))
+    exported = []
+    t0 = time.perf_counter()
+    onnx_path = None
+    for fmt in args.formats:
+        if fmt.startswith("onnx"):
+            onnx_path = onnx_path or export_onnx(args.weights, args.imgsz)
+            path = onnx_path if fmt == "onnx" else quantize_onnx_int8(onnx_path, images, args.imgsz)
+        else:
+            path = export_openvino(args.weights, args.imgsz, int8=fmt.endswith("int8"), data=args.data)
+        exported.append(path)
+        print(f"{fmt}: {path}")
+    print(f"Export selesai dalam {time.perf_counter() - t0:.1f}s")
+
+    if args.parity:
+        names = dict(enumerate(load_config(args.data)["names"]))
+        reports = [parity_check(args.weights, path, images, names, args.imgsz) for path in exported]
+        for report in reports:
+            ref, cand = report["reference"], report["candidate"]
+            print(
+                f"{cand['model']}: mAP50 {cand['mAP50']:.4f} (delta {report['mAP50_delta']:+.4f}), "
+                f"mAP50-95 delta {report['mAP50-95_delta']:+.4f}, box agreement {report['box_agreement']:.3f}, "
+                f"{cand['ms_per_image']:.1f} ms/img vs {ref['ms_per_image']:.1f} ms/img ({ref['backend']})"
+            )
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(reports, f, indent=2)
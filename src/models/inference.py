@@ -0,0 +1,241 @@
+# shared inference helpers (detections container, batched prediction)
+import os
+import time
+
+import numpy as np
+
+from src.utils import tracing
+from src.utils.decode import decode_source
+
+
+class Detections:
+    """
+    Detections of one image as plain NumPy arrays.
+
+    Args:
+        boxes (numpy.ndarray): (N, 4) float32 boxes in xyxy pixel coordinates.
+        scores (numpy.ndarray): (N,) float32 confidences.
+        classes (numpy.ndarray): (N,) int64 class ids.
+        orig_shape (tuple): (height, width) of the source image.
+    """
+
+    __slots__ = ("boxes", "scores", "classes", "orig_shape")
+
+    def __init__(self, boxes, scores, classes, orig_shape):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.classes = np.asarray(classes, dtype=np.int64).reshape(-1)
+        self.orig_shape = tuple(int(v) for v in orig_shape)
+
+    @classmethod
+    def from_result(cls, result):
+        """Build from an Ultralytics Results object."""
+        boxes = result.boxes
+        return cls(
+            boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy(),
+            result.orig_shape,
+        )
+
+    def __len__(self):
+        return len(self.scores)
+
+    def rescaled(self, scale, orig_shape):
+        """
+        Map detections made on a resized image back to the original.
+
+        Args:
+            scale (tuple): (x, y) factors from predicted to original pixels.
+            orig_shape (tuple): (height, width) of the original image.
+        """
+        sx, sy = scale
+        return Detections(self.boxes * np.array([sx, sy, sx, sy], dtype=np.float32), self.scores, self.classes,
+                          orig_shape)
+
+    def to_bytes(self):
+        """
+        Pack into a compact blob: int32 header (n, h, w), float32 boxes and
+        scores, int16 classes.
+        """
+        header = np.array([len(self), *self.orig_shape], dtype=np.int32)
+        return b"".join([
+            header.tobytes(),
+            self.boxes.tobytes(),
+            self.scores.tobytes(),
+            self.classes.astype(np.int16).tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Unpack a blob written by ``to_bytes``."""
+        n, height, width = np.frombuffer(blob, dtype=np.int32, count=3)
+        offset = 12
+        boxes = np.frombuffer(blob, dtype=np.float32, count=n * 4, offset=offset)
+        offset += n * 16
+        scores = np.frombuffer(blob, dtype=np.float32, count=n, offset=offset)
+        offset += n * 4
+        classes = np.frombuffer(blob, dtype=np.int16, count=n, offset=offset)
+        return cls(boxes, scores, classes, (height, width))
+
+    def to_result(self, orig_img, names, path=""):
+        """Wrap as an Ultralytics Results (e.g. to call ``.plot()``)."""
+        import torch
+        from ultralytics.engine.results import Results
+
+        data = np.concatenate(
+            [self.boxes, self.scores[:, None], self.classes[:, None].astype(np.float32)], axis=1
+        )
+        return Results(orig_img, path, names, boxes=torch.from_numpy(data))
+
+    def class_counts(self, names):
+        """
+        Count detections per class name.
+
+        Args:
+            names (dict): Class id -> name mapping (``model.names``).
+
+        Returns:
+            dict: {class name: count} for every class in ``names``.
+        """
+        counts = np.bincount(self.classes, minlength=len(names))
+        return {names[i]: int(counts[i]) for i in range(len(names))}
+
+    def to_dict(self, names):
+        """Serialize boxes, class names, confidences and image shape for JSON output."""
+        return {
+            "boxes": np.round(self.boxes.astype(np.float64), 2).tolist(),
+            "classes": [names[int(c)] for c in self.classes],
+            "confidences": np.round(self.scores.astype(np.float64), 4).tolist(),
+            "orig_shape": list(self.orig_shape),
+        }
+
+    @classmethod
+    def from_dict(cls, record, names):
+        """
+        Rebuild from a record written by ``to_dict``.
+
+        Args:
+            record (dict): Record with boxes, classes, confidences, orig_shape.
+            names (dict): Class id -> name mapping.
+        """
+        ids = {name: i for i, name in names.items()}
+        classes = [ids[c] if isinstance(c, str) else int(c) for c in record["classes"]]
+        return cls(record["boxes"], record["confidences"], classes, record["orig_shape"])
+
+
+def box_iou(boxes1, boxes2):
+    """
+    Compute the IoU matrix between two sets of boxes.
+
+    Args:
+        boxes1 (numpy.ndarray): (N, 4) boxes [x1, y1, x2, y2].
+        boxes2 (numpy.ndarray): (M, 4) boxes [x1, y1, x2, y2].
+
+    Returns:
+        numpy.ndarray: (N, M) IoU values.
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+
+    lt = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    rb = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def predict_batches(model, sources, conf=0.3, imgsz=640, batch=16, cache=None, iou=0.7, tile=None, max_det=300):
+    """
+    Run inference over many images, one forward pass per batch.
+
+    Args:
+        model (YOLO): Loaded model, or a predictor with its own
+            ``predict_batches`` (e.g. ``CascadePredictor``).
+        sources (list): Image paths, encoded bytes, arrays or
+            ``DecodedImage``; paths and bytes go through ``decode_source``
+            (reduced-resolution decode, EXIF orientation) and boxes are
+            mapped back to original pixels.
+        conf (float): Confidence threshold.
+        imgsz (int): Inference image size.
+        batch (int): Number of images per forward pass.
+        cache (PredictionCache): Optional cache; hits skip the model.
+        iou (float): NMS IoU threshold.
+        tile (dict): Options of ``predict_tiled`` (e.g. ``{"mode": "auto"}``)
+            to tile large or elongated images; tiled runs bypass the cache.
+        max_det (int): Maximum detections per image (untiled single-model
+            runs; composite and tiled predictors keep their own limit).
+
+    Yields:
+        tuple: (source, Detections, timings_ms dict) in input order.
+    """
+    if hasattr(model, "predict_batches"):
+        # Composite predictors (e.g. CascadePredictor) drive their own models
+        yield from model.predict_batches(sources, conf=conf, imgsz=imgsz, batch=batch, cache=cache, iou=iou, tile=tile)
+        return
+
+    if tile:
+        from src.models.tiling import predict_tiled
+
+        yield from predict_tiled(model, sources, conf=conf, imgsz=imgsz, batch=batch, iou=iou, **tile)
+        return
+
+    if cache is not None:
+        yield from cache.predict(model, sources, conf=conf, imgsz=imgsz, batch=batch, iou=iou, max_det=max_det)
+        return
+
+    for start in range(0, len(sources), batch):
+        chunk = sources[start:start + batch]
+        with tracing.span("predict_batch", size=len(chunk), imgsz=imgsz):
+            t0 = time.perf_counter()
+            images = [load_source(source, imgsz) for source in chunk]
+            results = model.predict([d.image for d in images], conf=conf, iou=iou, imgsz=imgsz, batch=len(chunk),
+                                    max_det=max_det, verbose=False)
+            wall = (time.perf_counter() - t0) * 1000 / len(chunk)
+            outputs = []
+            for source, image, result in zip(chunk, images, results):
+                timings = {k: round(v, 2) for k, v in result.speed.items()}
+                timings["total"] = round(wall, 2)
+                outputs.append((source, to_original(Detections.from_result(result), image), timings))
+            if tracing.TRACER.enabled:
+                _trace_speed(outputs)
+        yield from outputs
+
+
+def load_source(source, imgsz=None):
+    """
+    ``decode_source`` that raises instead of returning None.
+
+    Returns:
+        DecodedImage: The decoded image.
+    """
+    decoded = decode_source(source, imgsz)
+    if decoded is None:
+        if isinstance(source, str) and not os.path.exists(source):
+            raise FileNotFoundError(f"Gambar tidak ditemukan: {source}")
+        raise ValueError(f"Gagal membaca gambar: {source if isinstance(source, str) else '<bytes>'}")
+    return decoded
+
+
+def to_original(detections, decoded):
+    """Detections on ``decoded.image`` in the coordinates of the original image."""
+    if not decoded.reduced:
+        return detections
+    return detections.rescaled(decoded.scale, decoded.orig_shape)
+
+
+def _trace_speed(outputs):
+    """Feed Ultralytics per-image speeds into the tracer as pipeline stages."""
+    for _, detections, timings in outputs:
+        model_ms = 0.0
+        for key, stage in (("preprocess", "preprocess"), ("inference", "forward"), ("postprocess", "nms")):
+            if key in timings:
+                tracing.observe(stage, timings[key] / 1000)
+                model_ms += timings[key]
+        # Whatever the model did not account for: reading and decoding the source
+        tracing.observe("load", max(timings["total"] - model_ms, 0.0) / 1000)
+        tracing.count("detections", len(detections))
+    tracing.count("images", len(outputs))
@@ -0,0 +1,255 @@
+# streaming ECG monitor: live capture, frame skipping and a time-window verdict
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from src.analysis.verdict import VerdictEngine, inference_conf
+from src.models.inference import predict_batches
+from src.utils import tracing
+
+
+def open_capture(source):
+    """
+    Open a webcam index ('0', 0) or a video file / stream URL.
+
+    Returns:
+        cv2.VideoCapture: Opened capture.
+    """
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not capture.isOpened():
+        raise ValueError(f"Tidak bisa membuka sumber video: {source}")
+    return capture
+
+
+class LatestFrameReader:
+    """
+    Read frames on a background thread, keeping only the newest one.
+
+    The consumer always gets the most recent frame; frames it had no time
+    to take are dropped (and counted) instead of queueing up latency.
+    Recorded videos are paced at their own FPS when ``realtime`` is set,
+    so a file replays like a live monitor.
+
+    Args:
+        capture (cv2.VideoCapture): Anything with ``read()`` (and optionally
+            ``get`` / ``release``).
+        realtime (bool): Pace reads at the capture's FPS.
+    """
+
+    def __init__(self, capture, realtime=False):
+        self.capture = capture
+        fps = capture.get(cv2.CAP_PROP_FPS) if realtime and hasattr(capture, "get") else 0
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.captured = 0
+        self.dropped = 0
+        self.finished = False
+        self._frame = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            ok, frame = self.capture.read()
+            if not ok:
+                break
+            with self._cond:
+                if self._frame is not None:
+                    self.dropped += 1
+                self._frame = (self.captured, time.perf_counter(), frame)
+                self.captured += 1
+                self._cond.notify()
+            if self.interval:
+                next_at += self.interval
+                time.sleep(max(0.0, next_at - time.perf_counter()))
+        with self._cond:
+            self.finished = True
+            self._cond.notify()
+
+    def read(self, timeout=None):
+        """
+        Take the newest unread frame, waiting for one if needed.
+
+        Returns:
+            tuple: (frame index, capture time from perf_counter, BGR frame), or
+            None once the source is exhausted (or on timeout).
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._frame is not None or self.finished, timeout)
+            item, self._frame = self._frame, None
+            return item
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        if hasattr(self.capture, "release"):
+            self.capture.release()
+
+
+def frame_changed(previous, frame, threshold=0.01, size=128):
+    """
+    Whether ``frame`` differs visibly from ``previous``.
+
+    Both are shrunk to ``size`` pixels wide in grayscale and compared by mean
+    absolute difference, so sensor noise and compression flicker stay below
+    the threshold while a new sweep of the trace does not.
+
+    Args:
+        previous (numpy.ndarray): Reference BGR frame (None: always changed).
+        frame (numpy.ndarray): New BGR frame.
+        threshold (float): Mean absolute difference (0-1) counted as a change.
+        size (int): Comparison width in pixels.
+
+    Returns:
+        bool: True when the frame should be analyzed again.
+    """
+    if previous is None or previous.shape != frame.shape:
+        return True
+    height = max(1, round(frame.shape[0] * size / frame.shape[1]))
+
+    def small(image):
+        return cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), (size, height), interpolation=cv2.INTER_AREA)
+
+    diff = cv2.absdiff(small(previous), small(frame))
+    return float(diff.mean()) / 255.0 > threshold
+
+
+class TemporalVerdict:
+    """
+    Stable verdict over a sliding time window of per-frame detections.
+
+    Per-class counts of the frames seen in the last ``window_s`` seconds are
+    averaged and rounded before the policy levels are applied, so a single
+    spurious box does not flip the verdict while a persistent abnormal beat
+    does.
+
+    Args:
+        engine (VerdictEngine): Verdict engine of the model.
+        window_s (float): Window length in seconds.
+    """
+
+    def __init__(self, engine, window_s=10.0):
+        self.engine = engine
+        self.window_s = window_s
+        self._window = deque()
+
+    def update(self, timestamp, detections):
+        """
+        Add one analyzed frame.
+
+        Args:
+            timestamp (float): Frame time in seconds.
+            detections (Detections): Detections of the frame.
+        """
+        self.add_counts(timestamp, self.engine.count([detections])[0])
+
+    def add_counts(self, timestamp, counts):
+        """Add one frame's per-class count row."""
+        self._window.append((timestamp, counts))
+        while self._window and self._window[0][0] < timestamp - self.window_s:
+            self._window.popleft()
+
+    @property
+    def last_counts(self):
+        return self._window[-1][1] if self._window else None
+
+    def verdict(self):
+        """
+        Current aggregated verdict.
+
+        Returns:
+            dict: level, status, mean abnormal count per frame, share of
+            frames with an abnormal detection, and frames in the window.
+        """
+        if not self._window:
+            return {"level": None, "status": None, "abnormal_per_frame": 0.0, "abnormal_frames": 0.0, "frames": 0}
+        engine = self.engine
+        counts = np.stack([c for _, c in self._window])
+        levels, _, _ = engine.levels(np.rint(counts.mean(axis=0, keepdims=True)).astype(np.int64))
+        abnormal = counts[:, engine.abnormal_id] if engine.abnormal_id >= 0 else np.zeros(len(counts), np.int64)
+        level = str(levels[0])
+        return {
+            "level": level,
+            "status": engine.policy["messages"][level],
+            "abnormal_per_frame": round(float(abnormal.mean()), 3),
+            "abnormal_frames": round(float((abnormal > 0).mean()), 3),
+            "frames": len(counts),
+        }
+
+
+def run_monitor(model, reader, policy=None, fps=5.0, window_s=10.0, imgsz=640, diff_threshold=0.01,
+                max_frames=None):
+    """
+    Analyze a live frame source at (up to) ``fps`` frames per second.
+
+    The reader captures on its own thread; this loop wakes at the target
+    rate, takes the newest frame and runs the model on it only when it
+    changed (``frame_changed``). Unchanged frames reuse the last counts, so
+    the time window stays evenly weighted.
+
+    Args:
+        model (YOLO): Loaded model.
+        reader (LatestFrameReader): Started frame reader.
+        policy (dict): Verdict policy.
+        fps (float): Target analysis rate (0: as fast as possible).
+        window_s (float): Verdict window in seconds.
+        imgsz (int): Inference image size.
+        diff_threshold (float): See ``frame_changed`` (0 analyzes every frame).
+        max_frames (int): Stop after this many analyzed frames.
+
+    Yields:
+        dict: One event per analyzed frame with the frame index, whether the
+        model ran, end-to-end latency (capture to verdict, ms), capture and
+        drop counters and the window verdict.
+    """
+    engine = VerdictEngine(model.names, policy)
+    conf = inference_conf(engine.policy)
+    window = TemporalVerdict(engine, window_s)
+    interval = 1.0 / fps if fps else 0.0
+    reference, n = None, 0
+    stats = {"inferred": 0, "skipped": 0}
+
+    next_at = time.perf_counter()
+    while max_frames is None or n < max_frames:
+        item = reader.read(timeout=5)
+        if item is None:
+            break
+        index, captured_at, frame = item
+        with tracing.span("monitor_frame", frame=index):
+            ran = window.last_counts is None or diff_threshold <= 0 or frame_changed(reference, frame, diff_threshold)
+            if ran:
+                _, detections, _ = next(predict_batches(model, [frame], conf=conf, imgsz=imgsz, batch=1))
+                window.update(captured_at, detections)
+                reference = frame
+                stats["inferred"] += 1
+            else:
+                window.add_counts(captured_at, window.last_counts)
+                stats["skipped"] += 1
+                tracing.count("frames_skipped")
+        n += 1
+        yield {
+            "frame": index,
+            "ran_model": ran,
+            "latency_ms": round((time.perf_counter() - captured_at) * 1000, 2),
+            "captured": reader.captured,
+            "dropped": reader.dropped,
+            **stats,
+            "verdict": window.verdict(),
+        }
+
+        if interval:
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Running behind: restart the schedule instead of bursting to catch up
+                next_at = time.perf_counter()
@@ -0,0 +1,210 @@
+# content-addressed, disk-backed cache of raw predictions
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.models.inference import Detections, predict_batches
+from src.utils import tracing
+from src.utils.decode import DecodedImage
+
+DEFAULT_CACHE_PATH = os.environ.get("ECG_CACHE", "runs/cache/predictions.sqlite")
+
+# Digests of recently hashed files, least recently used first; bounded because
+# long-running servers see an endless stream of new files
+MAX_FILE_HASHES = 4096
+_file_hashes = OrderedDict()
+_file_hashes_lock = threading.Lock()
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    SHA-256 of a file, memoized by (path, mtime, size) for the last
+    ``MAX_FILE_HASHES`` files.
+
+    Args:
+        path (str): File path.
+        chunk_size (int): Read size in bytes.
+
+    Returns:
+        str: Hex digest.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _file_hashes_lock:
+        if key in _file_hashes:
+            _file_hashes.move_to_end(key)
+            return _file_hashes[key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    hexdigest = digest.hexdigest()
+    with _file_hashes_lock:
+        _file_hashes[key] = hexdigest
+        while len(_file_hashes) > MAX_FILE_HASHES:
+            _file_hashes.popitem(last=False)
+    return hexdigest
+
+
+def image_hash(source):
+    """
+    Content hash of an image given as a path, raw bytes, a NumPy array or a
+    ``DecodedImage``.
+
+    Returns:
+        str: Hex digest.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    if isinstance(source, DecodedImage):
+        # Detections are stored in original pixels, which the pixels alone do not pin down
+        digest = hashlib.sha256(str((source.image.shape, source.orig_shape)).encode())
+        digest.update(np.ascontiguousarray(source.image).data)
+        return digest.hexdigest()
+    if isinstance(source, np.ndarray):
+        digest = hashlib.sha256(str(source.shape).encode())
+        digest.update(np.ascontiguousarray(source).data)
+        return digest.hexdigest()
+    return file_sha256(source)
+
+
+def checkpoint_id(model):
+    """
+    Stable id of the weights behind a model (content hash when on disk).
+
+    Args:
+        model (YOLO): Loaded model.
+
+    Returns:
+        str: Checkpoint id.
+    """
+    path = getattr(model, "ckpt_path", None) or getattr(model, "model_name", None)
+    if path and os.path.isfile(path):
+        return file_sha256(path)
+    return str(path)
+
+
+class PredictionCache:
+    """
+    SQLite-backed prediction cache with a size cap and LRU eviction.
+
+    Entries are keyed by image content hash + checkpoint hash + imgsz + conf
+    + NMS IoU and store the packed ``Detections`` blob, so a hit never
+    touches the model.
+
+    Args:
+        path (str): SQLite database file.
+        max_bytes (int): Total blob size above which old entries are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON predictions(last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(image_digest, model_digest, imgsz, conf, iou=0.7, max_det=300):
+        key = f"{image_digest}:{model_digest}:{int(imgsz)}:{float(conf):.4f}:{float(iou):.2f}"
+        # Keys of the default limit keep their old form, so existing caches stay valid
+        return key if max_det == 300 else f"{key}:{int(max_det)}"
+
+    def get(self, key):
+        """Return cached ``Detections`` or None."""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM predictions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                tracing.count("cache_misses")
+                return None
+            self._db.execute("UPDATE predictions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+        tracing.count("cache_hits")
+        return Detections.from_bytes(row[0])
+
+    def put(self, key, detections):
+        """Store ``Detections`` and evict least recently used entries over the cap."""
+        blob = detections.to_bytes()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO predictions (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(blob), len(blob), time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM predictions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the cap so eviction does not run on every insert
+        excess = total - int(self.max_bytes * 0.9)
+        stale, freed = [], 0
+        for key, size in self._db.execute("SELECT key, size FROM predictions ORDER BY last_access"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM predictions WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM predictions")
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def predict(self, model, sources, conf=0.3, imgsz=640, batch=16, iou=0.7, max_det=300):
+        """
+        Cached drop-in for ``predict_batches``: only misses are sent to the model.
+
+        Yields:
+            tuple: (source, Detections, timings_ms dict) in input order; cache
+            hits carry ``{"cache": "hit"}`` in their timings.
+        """
+        model_digest = checkpoint_id(model)
+        for start in range(0, len(sources), batch):
+            chunk = sources[start:start + batch]
+            t0 = time.perf_counter()
+            with tracing.stage("cache_lookup"):
+                keys = [self.make_key(image_hash(s), model_digest, imgsz, conf, iou, max_det) for s in chunk]
+                cached = [self.get(k) for k in keys]
+            lookup_ms = (time.perf_counter() - t0) * 1000 / len(chunk)
+
+            missing = [i for i, d in enumerate(cached) if d is None]
+            computed = {}
+            if missing:
+                outputs = predict_batches(
+                    model, [chunk[i] for i in missing], conf=conf, imgsz=imgsz, batch=batch, iou=iou, max_det=max_det
+                )
+                for i, (_, detections, timings) in zip(missing, outputs):
+                    self.put(keys[i], detections)
+                    timings["cache"] = "miss"
+                    computed[i] = (detections, timings)
+
+            tracing.count("images", len(chunk) - len(missing))
+            for i, source in enumerate(chunk):
+                if i in computed:
+                    yield (source, *computed[i])
+                else:
+                    yield source, cached[i], {"cache": "hit", "total": round(lookup_ms, 2)}
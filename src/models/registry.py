@@ -0,0 +1,141 @@
+# warm YOLO model registry shared by the CLI and web apps
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.models.backends import load_model
+
+
+class ModelRegistry:
+    """
+    Keep a bounded number of warmed YOLO models in memory.
+
+    Any model ``load_model`` understands can be registered, so a ``.onnx``
+    file or an OpenVINO folder is served exactly like a ``.pt`` checkpoint.
+
+    Models are keyed by (absolute path, file mtime, device), so a checkpoint
+    that is rewritten on disk is reloaded on the next lookup. Once more than
+    ``max_models`` models are loaded, the least recently used one is evicted.
+    Loading and warm-up run outside the registry lock: lookups of warm models
+    never wait behind another model's load, and concurrent lookups of the
+    same checkpoint share one load.
+
+    Args:
+        max_models (int): Maximum number of models kept in memory.
+        warmup_imgsz (int): Image size of the dummy warm-up inference.
+        loader (callable): Function that builds a model from a path.
+    """
+
+    def __init__(self, max_models=2, warmup_imgsz=640, loader=load_model):
+        self.max_models = max_models
+        self.warmup_imgsz = warmup_imgsz
+        self.loader = loader
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+        # Keys being loaded -> Event set when the load finishes (or fails)
+        self._loading = {}
+
+    @staticmethod
+    def make_key(model_path, device=None):
+        """
+        Build the cache key for a checkpoint.
+
+        Args:
+            model_path (str): Path to the model file.
+            device (str): Inference device (e.g. 'cpu', '0'), None for default.
+
+        Returns:
+            tuple: (absolute path, mtime or None, device)
+        """
+        path = os.path.abspath(model_path)
+        # Hub names such as "yolo11n.pt" may not exist locally yet
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        return path, mtime, device
+
+    def get(self, model_path, device=None, warmup=True):
+        """
+        Return a loaded model, loading (and warming up) it on a cache miss.
+
+        Args:
+            model_path (str): Path to the model file.
+            device (str): Inference device, None for the Ultralytics default.
+            warmup (bool): Run a dummy inference after loading.
+
+        Returns:
+            YOLO: Loaded model.
+        """
+        key = self.make_key(model_path, device)
+        while True:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # Another thread is loading this checkpoint; look again once it is done
+            loading.wait()
+
+        try:
+            model = self.loader(model_path)
+            if warmup:
+                self._warmup(model, device)
+            with self._lock:
+                # Drop stale entries of the same checkpoint (file changed on disk)
+                for stale in [k for k in self._models if k[0] == key[0] and k[2] == device]:
+                    del self._models[stale]
+                self._models[key] = model
+                while len(self._models) > self.max_models:
+                    self._models.popitem(last=False)
+            return model
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def _warmup(self, model, device):
+        """Run one inference on a blank image to build the predictor."""
+        dummy = np.zeros((self.warmup_imgsz, self.warmup_imgsz, 3), dtype=np.uint8)
+        model.predict(dummy, imgsz=self.warmup_imgsz, device=device, verbose=False)
+
+    def evict(self, model_path=None):
+        """
+        Remove one checkpoint (all devices/versions) or every model.
+
+        Args:
+            model_path (str): Path to evict, None to clear the registry.
+        """
+        with self._lock:
+            if model_path is None:
+                self._models.clear()
+                return
+            path = os.path.abspath(model_path)
+            for key in [k for k in self._models if k[0] == path]:
+                del self._models[key]
+
+    def __len__(self):
+        return len(self._models)
+
+    def __contains__(self, model_path):
+        return self.make_key(model_path) in self._models
+
+
+_default_registry = ModelRegistry(max_models=int(os.environ.get("ECG_MODEL_CACHE_SIZE", 2)))
+
+
+def get_model(model_path, device=None, warmup=True):
+    """
+    Get a warmed model from the process-wide registry.
+
+    Args:
+        model_path (str): Path to the model file.
+        device (str): Inference device, None for the Ultralytics default.
+        warmup (bool): Run a dummy inference after loading.
+
+    Returns:
+        YOLO: Loaded model.
+    """
+    return _default_registry.get(model_path, device=device, warmup=warmup)
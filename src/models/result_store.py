@@ -0,0 +1,374 @@
+# prediction history: indexed SQLite (WAL) store fed by a background batched writer
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Allow `python src/models/result_store.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.models.inference import Detections
+from src.models.prediction_cache import file_sha256, image_hash
+from src.utils import tracing
+
+DEFAULT_RESULTS_PATH = os.environ.get("ECG_RESULTS", "runs/results/history.sqlite")
+
+SCHEMA_VERSION = 1
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS results ("
+    "id INTEGER PRIMARY KEY, ts REAL NOT NULL, origin TEXT, path TEXT, image_hash TEXT, model TEXT, "
+    "checkpoint TEXT, level TEXT NOT NULL, verdict TEXT, n_abnormal INTEGER NOT NULL, "
+    "n_detections INTEGER NOT NULL, counts TEXT NOT NULL, boxes BLOB, timings TEXT, total_ms REAL)",
+    "CREATE INDEX IF NOT EXISTS idx_results_ts ON results(ts)",
+    "CREATE INDEX IF NOT EXISTS idx_results_level_ts ON results(level, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_results_hash ON results(image_hash)",
+)
+COLUMNS = (
+    "ts", "origin", "path", "image_hash", "model", "checkpoint", "level", "verdict", "n_abnormal", "n_detections",
+    "counts", "boxes", "timings", "total_ms",
+)
+
+_STOP = object()
+
+
+def _connect(path):
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL: a commit is a WAL append without fsync (durable up to the last checkpoint)
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def model_path(model):
+    """Path (or name) of the weights behind a model, as stored in the ``model`` column."""
+    if model is None or isinstance(model, str):
+        return model
+    return getattr(model, "ckpt_path", None) or getattr(model, "model_name", None) or type(model).__name__
+
+
+def _checkpoint(path):
+    """Content hash of a checkpoint file, else the path itself."""
+    # file_sha256 memoizes by (path, mtime, size): a checkpoint retrained in place gets its new hash
+    return file_sha256(path) if path and os.path.isfile(path) else path
+
+
+def parse_time(value, now=None):
+    """
+    Timestamp from a CLI/query value.
+
+    Args:
+        value (str or float): Epoch seconds, an ISO date/datetime
+            ('2024-05-01', '2024-05-01T08:00') or an age like '7d', '12h',
+            '30m' (counted back from ``now``).
+
+    Returns:
+        float: Epoch seconds.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if re.fullmatch(r"\d+(?:\.\d+)?", value.strip()):
+        return float(value)
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", value.strip())
+    if match:
+        unit = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}[match.group(2)]
+        return (now or time.time()) - float(match.group(1)) * unit
+    return datetime.fromisoformat(value.strip()).timestamp()
+
+
+class ResultStore:
+    """
+    Append-only history of per-image predictions.
+
+    ``add`` only puts the batch on a bounded queue, so predict paths never
+    wait on the disk. A writer thread takes whatever is queued (up to
+    ``batch_size`` records), builds the rows there (image and checkpoint
+    hashes, packed boxes) and inserts them in one transaction. The
+    database runs in WAL mode, so queries and dashboards read while the
+    writer appends. When the queue is full, new records are dropped and
+    counted rather than slowing down inference.
+
+    Each row holds time, origin (batch, api, daemon, ...), path, image
+    content hash (same hash as ``PredictionCache``), model path and
+    checkpoint hash, verdict level and message, abnormal / detection counts,
+    per-class counts (JSON), boxes (``Detections.to_bytes`` blob) and
+    timings; time, verdict level and image hash are indexed.
+
+    Args:
+        path (str): SQLite database file.
+        batch_size (int): Most records written per transaction.
+        max_queue (int): Most pending ``add`` calls before records are dropped.
+    """
+
+    def __init__(self, path=DEFAULT_RESULTS_PATH, batch_size=512, max_queue=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.closed = False
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = _connect(path)
+        with db:
+            for statement in SCHEMA:
+                db.execute(statement)
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        db.close()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._run, name="result-store-writer", daemon=True)
+        self._writer.start()
+        # Long-running apps never call close(): write the queue out at exit
+        atexit.register(self.close)
+
+    def add(self, records, names, model=None, origin=None, images=None, detections=None):
+        """
+        Queue records for writing; never blocks.
+
+        Args:
+            records (list): Records from ``build_records`` (``error`` records
+                are skipped).
+            names (dict): Class id -> name mapping of the model.
+            model (YOLO or str): Model (or its path); a cascade's ``tier`` in
+                the record takes precedence.
+            origin (str): Predict path ('batch', 'api', 'daemon', ...).
+            images (list): Per-record image path, encoded bytes or array,
+                hashed on the writer thread (arrays must not be modified
+                afterwards).
+            detections (list): Per-record ``Detections``; rebuilt from the
+                record when not given.
+
+        Returns:
+            bool: False when the records were dropped (queue full or closed).
+        """
+        if self.closed:
+            self.dropped += len(records)
+            return False
+        item = (time.time(), records, dict(names), model_path(model), origin, images, detections)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += len(records)
+            tracing.count("results_dropped", len(records))
+            return False
+        return True
+
+    def flush(self):
+        """Wait until everything queued so far is written."""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread."""
+        self.closed = True
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        db = _connect(self.path)
+        stop = False
+        while not stop:
+            items = [self._queue.get()]
+            # Take what else is already queued: bigger transactions exactly when the load is high
+            pending = len(items[0][1]) if items[0] is not _STOP else 0
+            while pending < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                items.append(item)
+                pending += len(item[1]) if item is not _STOP else 0
+            stop = any(item is _STOP for item in items)
+            try:
+                rows = [row for item in items if item is not _STOP for row in self._rows(*item)]
+                with db:
+                    db.executemany(
+                        f"INSERT INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+                    )
+                self.written += len(rows)
+                tracing.count("results_written", len(rows))
+            except Exception:
+                self.errors += 1
+                logging.exception("Gagal menulis %d hasil ke %s", len(items), self.path)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+        db.close()
+
+    @staticmethod
+    def _rows(ts, records, names, model, origin, images, detections):
+        rows = []
+        for k, record in enumerate(records):
+            if record.get("error") or "level" not in record:
+                continue
+            source = images[k] if images is not None else None
+            if source is None and isinstance(record.get("path"), str) and os.path.isfile(record["path"]):
+                source = record["path"]
+            try:
+                digest = image_hash(source) if source is not None else None
+            except OSError:
+                # e.g. an upload temp file already removed
+                digest = None
+            dets = detections[k] if detections is not None else Detections.from_dict(record, names)
+            timings = record.get("timings_ms") or {}
+            tier = record.get("tier") or model
+            rows.append((
+                ts,
+                origin,
+                record.get("path"),
+                digest,
+                tier,
+                _checkpoint(tier),
+                record["level"],
+                record.get("verdict"),
+                int(record["n_abnormal"]),
+                int(record["n_detections"]),
+                json.dumps(record.get("counts") or {}, ensure_ascii=False),
+                sqlite3.Binary(dets.to_bytes()),
+                json.dumps(timings),
+                timings.get("total"),
+            ))
+        return rows
+
+    def _reader(self):
+        # One read connection per thread; WAL readers never block the writer
+        if getattr(self._local, "db", None) is None:
+            self._local.db = _connect(self.path)
+            self._local.db.row_factory = sqlite3.Row
+        return self._local.db
+
+    @staticmethod
+    def _where(since=None, until=None, level=None, min_abnormal=None, image_hash=None, model=None, origin=None):
+        clauses, params = [], []
+        for column, op, value in (
+            ("ts", ">=", parse_time(since) if since is not None else None),
+            ("ts", "<", parse_time(until) if until is not None else None),
+            ("n_abnormal", ">=", min_abnormal),
+            ("image_hash", "=", image_hash),
+            ("model", "=", model),
+            ("origin", "=", origin),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        if level is not None:
+            levels = [level] if isinstance(level, str) else list(level)
+            clauses.append(f"level IN ({', '.join('?' * len(levels))})")
+            params.extend(levels)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, since=None, until=None, level=None, min_abnormal=None, image_hash=None, model=None, origin=None,
+              limit=100, with_boxes=False):
+        """
+        Most recent results matching all given filters.
+
+        Args:
+            since, until: Time range (see ``parse_time``), ``until`` exclusive.
+            level (str or list): Verdict level(s): normal, mild, severe, other.
+            min_abnormal (int): At least this many abnormal detections.
+            image_hash (str): Image content hash (see ``image_hash``).
+            model (str): Model path.
+            origin (str): Predict path that wrote the result.
+            limit (int): Most rows returned (None for all).
+            with_boxes (bool): Unpack the boxes into ``detections``.
+
+        Returns:
+            list: Row dicts, newest first; ``counts`` and ``timings`` decoded.
+        """
+        where, params = self._where(since, until, level, min_abnormal, image_hash, model, origin)
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM results{where} ORDER BY ts DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = []
+        for row in self._reader().execute(sql, params):
+            row = dict(row)
+            row["counts"] = json.loads(row["counts"])
+            row["timings"] = json.loads(row["timings"]) if row["timings"] else {}
+            blob = row.pop("boxes")
+            if with_boxes and blob is not None:
+                row["detections"] = Detections.from_bytes(blob)
+            rows.append(row)
+        return rows
+
+    def summary(self, since=None, until=None, bucket="day", **filters):
+        """
+        Result counts per time bucket and verdict level (dashboard series).
+
+        Args:
+            since, until: Time range (see ``parse_time``).
+            bucket (str): 'hour', 'day' or 'month' (local time).
+            **filters: ``level``, ``min_abnormal``, ``image_hash``, ``model``
+                or ``origin`` as in ``query``.
+
+        Returns:
+            list: Dicts with bucket, level, images, abnormal (sum) and
+            mean_ms, oldest bucket first.
+        """
+        fmt = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d", "month": "%Y-%m"}[bucket]
+        where, params = self._where(since, until, **filters)
+        sql = (
+            f"SELECT strftime('{fmt}', ts, 'unixepoch', 'localtime') AS bucket, level, COUNT(*) AS images, "
+            f"SUM(n_abnormal) AS abnormal, ROUND(AVG(total_ms), 2) AS mean_ms "
+            f"FROM results{where} GROUP BY bucket, level ORDER BY bucket, level"
+        )
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    def __len__(self):
+        return self._reader().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cari riwayat prediksi ECG di result store")
+    parser.add_argument("--db", type=str, default=DEFAULT_RESULTS_PATH, help="File SQLite result store")
+    parser.add_argument("--since", type=str, help="Mulai dari (mis. 7d, 12h, 2024-05-01)")
+    parser.add_argument("--until", type=str, help="Sampai sebelum (format sama dengan --since)")
+    parser.add_argument("--level", type=str, nargs="+", choices=["normal", "mild", "severe", "other"])
+    parser.add_argument("--min-abnormal", type=int, help="Minimal jumlah deteksi abnormal")
+    parser.add_argument("--hash", type=str, help="Hash isi gambar")
+    parser.add_argument("--model", type=str, help="Path model")
+    parser.add_argument("--origin", type=str, help="Asal prediksi (batch, api, daemon, streamlit, gradio)")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--summary", type=str, nargs="?", const="day", choices=["hour", "day", "month"],
+                        help="Rekap jumlah per waktu dan level (bukan daftar hasil)")
+    parser.add_argument("--json", action="store_true", help="Tulis hasil sebagai JSON lines")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Result store tidak ditemukan: {args.db}", file=sys.stderr)
+        sys.exit(2)
+    store = ResultStore(args.db)
+    filters = dict(level=args.level, min_abnormal=args.min_abnormal, image_hash=args.hash, model=args.model,
+                   origin=args.origin)
+    t0 = time.perf_counter()
+    if args.summary:
+        rows = store.summary(args.since, args.until, bucket=args.summary, **filters)
+    else:
+        rows = store.query(args.since, args.until, limit=args.limit, **filters)
+    elapsed = (time.perf_counter() - t0) * 1000
+
+    for row in rows:
+        if args.json:
+            print(json.dumps(row, ensure_ascii=False))
+        elif args.summary:
+            print(f"{row['bucket']}  {row['level']:<7} {row['images']:>6} gambar  {row['abnormal'] or 0:>6} abnormal  "
+                  f"{row['mean_ms'] or 0:.1f} ms")
+        else:
+            when = datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{when}  {row['level']:<7} abnormal={row['n_abnormal']:<3} {row['path'] or row['image_hash']}")
+    print(f"{len(rows)} baris dalam {elapsed:.1f} ms", file=sys.stderr)
+    store.close()
@@ -0,0 +1,306 @@
+# parallel hyperparameter sweeps over config/params.yaml with early pruning
+import argparse
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Allow `python src/models/sweep.py` from the repo root to import the src package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.models.yolo_trainer import load_train_params, train_yolo
+from src.utils.config import load_config
+
+DEFAULT_METRIC = "metrics/mAP50-95(B)"
+DEFAULT_SWEEP_DIR = "runs/sweeps"
+
+
+def sample_value(spec, rng):
+    """
+    Draw one value of a search-space entry.
+
+    A list is a choice, ``{type: uniform|loguniform|int, low, high}`` a range
+    and anything else a fixed value.
+    """
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    if not isinstance(spec, dict):
+        return spec
+    kind, low, high = spec.get("type", "uniform"), spec["low"], spec["high"]
+    if kind == "int":
+        return rng.randint(int(low), int(high))
+    if kind == "loguniform":
+        return round(math.exp(rng.uniform(math.log(low), math.log(high))), 6)
+    if kind == "uniform":
+        return round(rng.uniform(low, high), 6)
+    raise ValueError(f"Unknown search space type {kind!r}")
+
+
+def sample_trials(space, n_trials=None, method="random", seed=0):
+    """
+    Trial configurations of a search space.
+
+    Args:
+        space (dict): {train argument: spec} (see ``sample_value``).
+        n_trials (int): Number of trials (grid: cap, None for the full grid).
+        method (str): 'random' or 'grid' (lists only).
+        seed (int): Random seed; the same seed gives the same trials.
+
+    Returns:
+        list: {"trial": id, "params": {...}} per trial.
+    """
+    keys = sorted(space)
+    if method == "grid":
+        if any(isinstance(space[k], dict) for k in keys):
+            raise ValueError("grid sweeps need lists of values, not ranges")
+        values = [space[k] if isinstance(space[k], list) else [space[k]] for k in keys]
+        combos = [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+        combos = combos[:n_trials] if n_trials else combos
+    elif method == "random":
+        rng = random.Random(seed)
+        combos = [{k: sample_value(space[k], rng) for k in keys} for _ in range(n_trials or 10)]
+    else:
+        raise ValueError(f"method must be 'random' or 'grid', got {method!r}")
+    return [{"trial": f"trial_{i:03d}", "params": params} for i, params in enumerate(combos)]
+
+
+def available_memory_gb():
+    """Memory available to new processes (MemAvailable on Linux)."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024 ** 2
+    except OSError:
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024 ** 3
+
+
+def plan_workers(cpus_per_trial=2, ram_per_trial_gb=4.0, max_workers=None, cpus=None, ram_gb=None):
+    """
+    Number of trials that fit side by side on this machine.
+
+    Args:
+        cpus_per_trial (int): Cores (torch threads) given to each trial.
+        ram_per_trial_gb (float): Expected peak memory of one trial.
+        max_workers (int): Upper bound.
+        cpus (int): Usable cores (default: this process's CPU affinity).
+        ram_gb (float): Available memory (default: ``available_memory_gb()``).
+
+    Returns:
+        tuple: (workers, cpus per trial)
+    """
+    cpus = cpus or len(os.sched_getaffinity(0))
+    ram_gb = available_memory_gb() if ram_gb is None else ram_gb
+    cpus_per_trial = max(1, min(cpus_per_trial, cpus))
+    workers = max(1, min(cpus // cpus_per_trial, int(ram_gb // ram_per_trial_gb)))
+    if max_workers:
+        workers = min(workers, max_workers)
+    return workers, cpus_per_trial
+
+
+def should_prune(history, peers, warmup_epochs=5, min_trials=3):
+    """
+    Median rule: stop a trial whose best metric so far is below the median
+    of the other trials' best metric at the same epoch.
+
+    Args:
+        history (list): Metric of this trial per finished epoch.
+        peers (list): Histories of the other trials.
+        warmup_epochs (int): Never prune before this many epochs.
+        min_trials (int): Peers that must have reached this epoch.
+
+    Returns:
+        bool: True when the trial should stop.
+    """
+    epoch = len(history)
+    if epoch < warmup_epochs:
+        return False
+    reached = [max(peer[:epoch]) for peer in peers if len(peer) >= epoch]
+    if len(reached) < min_trials:
+        return False
+    return max(history) < statistics.median(reached)
+
+
+def _read_history(path):
+    with open(path) as f:
+        return [json.loads(line)["value"] for line in f if line.strip()]
+
+
+def _pruning_callback(history_dir, trial_id, metric, prune, state):
+    """``on_fit_epoch_end`` callback logging the metric and pruning losers."""
+    own = os.path.join(history_dir, f"{trial_id}.jsonl")
+
+    def callback(trainer):
+        # Also fired by the final validation of best.pt, after training stopped
+        if state.get("stopped"):
+            return
+        value = float(trainer.metrics.get(metric, 0.0))
+        with open(own, "a") as f:
+            f.write(json.dumps({"epoch": trainer.epoch + 1, "value": value}) + "\n")
+        peers = [
+            _read_history(os.path.join(history_dir, name))
+            for name in os.listdir(history_dir)
+            if name.endswith(".jsonl") and name != f"{trial_id}.jsonl"
+        ]
+        history = _read_history(own)
+        if prune and should_prune(history, peers, prune.get("warmup_epochs", 5), prune.get("min_trials", 3)):
+            state["pruned_at"] = len(history)
+            trainer.stop = True
+        state["stopped"] = trainer.stop
+
+    return callback
+
+
+def run_trial(trial, base, sweep_dir, metric=DEFAULT_METRIC, prune=None, cpus=1):
+    """
+    Train one trial (in the current process) and summarize it.
+
+    Args:
+        trial (dict): Entry of ``sample_trials``.
+        base (dict): Base ``train_yolo`` arguments (params.yaml + fixed ones).
+        sweep_dir (str): Sweep output folder.
+        metric (str): Ultralytics metric key to maximize.
+        prune (dict): ``warmup_epochs`` / ``min_trials``; None disables pruning.
+        cpus (int): Torch threads of this trial.
+
+    Returns:
+        dict: Result row (status, best metric and epoch, epochs run, duration).
+    """
+    import torch
+
+    torch.set_num_threads(cpus)
+    history_dir = os.path.join(sweep_dir, "history")
+    os.makedirs(history_dir, exist_ok=True)
+    history_path = os.path.join(history_dir, f"{trial['trial']}.jsonl")
+    if os.path.exists(history_path):
+        os.remove(history_path)
+
+    config = {"workers": min(cpus, 2), "plots": False, **base, **trial["params"]}
+    # Absolute, or Ultralytics would nest a relative project under its runs dir
+    config.update(project=os.path.abspath(sweep_dir), name=trial["trial"], exist_ok=True)
+    state = {}
+    row = {"trial": trial["trial"], "params": trial["params"]}
+    t0 = time.perf_counter()
+    try:
+        train_yolo(callbacks={"on_fit_epoch_end": _pruning_callback(history_dir, trial["trial"], metric, prune, state)},
+                   **config)
+        row["status"] = "pruned" if "pruned_at" in state else "complete"
+    except Exception as e:
+        row.update(status="failed", error=repr(e))
+    row["duration_s"] = round(time.perf_counter() - t0, 1)
+
+    history = _read_history(history_path) if os.path.exists(history_path) else []
+    row["epochs"] = len(history)
+    row[metric] = round(max(history), 5) if history else None
+    row["best_epoch"] = history.index(max(history)) + 1 if history else None
+    row["save_dir"] = os.path.join(sweep_dir, trial["trial"])
+    return row
+
+
+def load_results(path):
+    """Result rows already recorded in ``trials.jsonl``."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_table(rows, path, metric=DEFAULT_METRIC):
+    """
+    Write every trial as one CSV row, best first.
+
+    Columns: trial, status, metric, best_epoch, epochs, duration_s, one
+    column per swept parameter, save_dir and error.
+    """
+    param_keys = sorted({k for row in rows for k in row["params"]})
+    fields = ["trial", "status", metric, "best_epoch", "epochs", "duration_s"] + param_keys + ["save_dir", "error"]
+    ordered = sorted(rows, key=lambda r: (r.get(metric) is None, -(r.get(metric) or 0.0)))
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for row in ordered:
+            writer.writerow({**row, **row["params"]})
+    return ordered
+
+
+def run_sweep(params_path="config/params.yaml", name="sweep", n_trials=None, max_workers=None, seed=0,
+              resume=True, output_dir=DEFAULT_SWEEP_DIR):
+    """
+    Run the sweep described in the ``sweep`` section of params.yaml.
+
+    The rest of params.yaml is the base config of every trial; ``sweep.fixed``
+    overrides it for all trials (e.g. fewer epochs) and ``sweep.space``
+    per trial. Trials run in a process pool sized by ``plan_workers`` from
+    ``sweep.resources``; finished trials are appended to ``trials.jsonl``
+    (so an interrupted sweep resumes) and ranked in ``trials.csv``.
+
+    Returns:
+        list: Result rows, best first.
+    """
+    config = load_config(params_path).get("sweep") or {}
+    if not config.get("space"):
+        raise ValueError(f"{params_path} tidak punya bagian sweep.space")
+    base = {**load_train_params(params_path), **(config.get("fixed") or {})}
+    metric = config.get("metric", DEFAULT_METRIC)
+    prune = config.get("prune")
+    trials = sample_trials(config["space"], n_trials or config.get("trials"), config.get("method", "random"), seed)
+
+    sweep_dir = os.path.join(output_dir, name)
+    os.makedirs(sweep_dir, exist_ok=True)
+    results_path = os.path.join(sweep_dir, "trials.jsonl")
+    rows = load_results(results_path) if resume else []
+    done = {row["trial"] for row in rows if row["status"] != "failed"}
+    rows = [row for row in rows if row["trial"] in done]
+    todo = [t for t in trials if t["trial"] not in done]
+
+    resources = config.get("resources") or {}
+    workers, cpus = plan_workers(
+        resources.get("cpus_per_trial", 2), resources.get("ram_per_trial_gb", 4.0), max_workers or len(todo) or 1
+    )
+    print(f"{len(todo)} trial ({len(done)} sudah selesai), {workers} paralel x {cpus} core", file=sys.stderr)
+
+    def record(row):
+        rows.append(row)
+        with open(results_path, "a") as f:
+            f.write(json.dumps(row) + "\n")
+        print(f"{row['trial']}: {row['status']} {metric}={row[metric]} ({row['epochs']} epoch, {row['duration_s']}s)",
+              file=sys.stderr)
+
+    if workers == 1:
+        for trial in todo:
+            record(run_trial(trial, base, sweep_dir, metric, prune, cpus))
+    else:
+        # spawn: forked children would inherit the parent's torch thread pools
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(run_trial, t, base, sweep_dir, metric, prune, cpus) for t in todo]
+            for future in as_completed(futures):
+                record(future.result())
+
+    return write_table(rows, os.path.join(sweep_dir, "trials.csv"), metric)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep dari config/params.yaml")
+    parser.add_argument("--params", type=str, default="config/params.yaml")
+    parser.add_argument("--name", type=str, default="sweep", help="Folder sweep di runs/sweeps")
+    parser.add_argument("--trials", type=int, help="Jumlah trial (default dari sweep.trials)")
+    parser.add_argument("--workers", type=int, help="Batas trial paralel (default dari CPU dan RAM)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-resume", action="store_true", help="Ulangi trial yang sudah selesai")
+    args = parser.parse_args()
+
+    ranked = run_sweep(args.params, args.name, args.trials, args.workers, args.seed, resume=not args.no_resume)
+    metric = (load_config(args.params).get("sweep") or {}).get("metric", DEFAULT_METRIC)
+    for row in ranked:
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items())
+        print(f"{row['trial']}  {row['status']:<8} {metric}={row[metric]}  {params}")
+    print(f"Tabel -> {os.path.join(DEFAULT_SWEEP_DIR, args.name, 'trials.csv')}")
@@ -0,0 +1,235 @@
+# tiled (sliding-window) inference for wide strips and high-resolution scans
+import math
+import time
+
+import numpy as np
+
+from src.models.inference import Detections, box_iou, load_source, to_original
+from src.utils import tracing
+from src.utils.decode import DecodedImage, read_header
+
+TILE_MODES = ("never", "auto", "always")
+
+
+def tile_shape(height, width, imgsz=640, max_downscale=2.0, max_aspect=2.0):
+    """
+    Tile (height, width) in source pixels.
+
+    Tiles are at most ``imgsz * max_downscale`` per side, so a tile is never
+    shrunk more than ``max_downscale`` times when letterboxed, and at most
+    ``max_aspect`` times longer than wide (or the reverse).
+    """
+    side = imgsz * max_downscale
+    tile_h, tile_w = min(height, side), min(width, side)
+    tile_w = min(tile_w, max_aspect * tile_h)
+    tile_h = min(tile_h, max_aspect * tile_w)
+    return int(tile_h), int(tile_w)
+
+
+def needs_tiling(height, width, imgsz=640, max_downscale=2.0, max_aspect=2.0):
+    """
+    Whether letterboxing the whole image would lose small structures: the
+    long side shrinks more than ``max_downscale`` times, or the image is a
+    strip more than ``max_aspect`` times longer than wide.
+    """
+    long_side, short_side = max(height, width), min(height, width)
+    return long_side > imgsz * max_downscale or long_side > max_aspect * short_side
+
+
+def _positions(length, tile, overlap):
+    if length <= tile:
+        return [0]
+    n = math.ceil((length - tile) / (tile * (1 - overlap))) + 1
+    return np.linspace(0, length - tile, n).round().astype(int).tolist()
+
+
+def tile_windows(height, width, tile_h, tile_w, overlap=0.25):
+    """
+    Overlapping windows covering an image.
+
+    Returns:
+        numpy.ndarray: (T, 4) int windows as x0, y0, x1, y1.
+    """
+    return np.array([
+        (x, y, x + tile_w, y + tile_h)
+        for y in _positions(height, tile_h, overlap)
+        for x in _positions(width, tile_w, overlap)
+    ], dtype=np.int64).reshape(-1, 4)
+
+
+def _inner_edge_mask(boxes, window, height, width, margin):
+    """Boxes touching a tile edge that is not an image border (cut objects)."""
+    x0, y0, x1, y1 = window
+    cut = np.zeros(len(boxes), dtype=bool)
+    if x0 > 0:
+        cut |= boxes[:, 0] <= x0 + margin
+    if y0 > 0:
+        cut |= boxes[:, 1] <= y0 + margin
+    if x1 < width:
+        cut |= boxes[:, 2] >= x1 - margin
+    if y1 < height:
+        cut |= boxes[:, 3] >= y1 - margin
+    return cut
+
+
+def merge_boxes(boxes, scores, classes, iou=0.5, method="nms"):
+    """
+    Merge duplicate detections from overlapping tiles, per class.
+
+    Args:
+        boxes (numpy.ndarray): (N, 4) xyxy boxes.
+        scores (numpy.ndarray): (N,) confidences.
+        classes (numpy.ndarray): (N,) class ids.
+        iou (float): Overlap above which two boxes are the same object.
+        method (str): ``nms`` keeps the best box; ``wbf`` fuses each cluster
+            into its score-weighted average box with the cluster's best score.
+
+    Returns:
+        tuple: (boxes, scores, classes) after merging.
+    """
+    if len(boxes) == 0:
+        return boxes, scores, classes
+    order = np.argsort(-scores, kind="stable")
+    boxes, scores, classes = boxes[order], scores[order], classes[order]
+    overlap = box_iou(boxes, boxes)
+    same = (overlap > iou) & (classes[:, None] == classes[None, :])
+
+    # Greedy clustering in score order: every box joins the first kept box it overlaps
+    owner = np.full(len(boxes), -1)
+    for i in range(len(boxes)):
+        if owner[i] >= 0:
+            continue
+        members = np.flatnonzero(same[i] & (owner < 0))
+        owner[members] = i
+        owner[i] = i
+    keep = np.flatnonzero(owner == np.arange(len(boxes)))
+    if method == "nms":
+        return boxes[keep], scores[keep], classes[keep]
+
+    fused = np.empty((len(keep), 4), dtype=np.float32)
+    for k, i in enumerate(keep):
+        members = owner == i
+        weights = scores[members][:, None]
+        fused[k] = (boxes[members] * weights).sum(0) / weights.sum()
+    return fused, scores[keep], classes[keep]
+
+
+def predict_tiled(model, sources, conf=0.3, imgsz=640, batch=16, iou=0.7, mode="auto", overlap=0.25,
+                  max_downscale=2.0, max_aspect=2.0, merge="nms", merge_iou=0.5, full_image=True, edge_margin=2):
+    """
+    Drop-in for ``predict_batches`` that tiles large or elongated images.
+
+    Each tiled image runs its tiles (plus the whole image when
+    ``full_image``, to keep objects larger than the overlap) as one batch;
+    boxes are shifted to global coordinates, boxes cut by an inner tile
+    edge are dropped and duplicates are merged with ``merge_boxes``.
+    Images that need no tiling are predicted as usual. The tiling decision
+    is taken from the image header, so only tiled images are decoded at full
+    resolution; the others get the reduced decode of ``predict_batches``.
+
+    Args:
+        model (YOLO): Loaded model.
+        sources (list): Image paths, encoded bytes, BGR arrays or ``DecodedImage``.
+        conf (float): Confidence threshold.
+        imgsz (int): Inference image size (of every tile).
+        batch (int): Untiled images per forward pass (the tiles of an image
+            always share one pass).
+        iou (float): NMS IoU threshold inside each tile.
+        mode (str): ``auto`` (see ``needs_tiling``), ``always`` or ``never``.
+        overlap (float): Fraction of a tile shared with its neighbour.
+        max_downscale (float): See ``tile_shape``.
+        max_aspect (float): See ``tile_shape``.
+        merge (str): ``nms`` or ``wbf``.
+        merge_iou (float): IoU of duplicates across tiles.
+        full_image (bool): Also predict the whole image.
+        edge_margin (int): Pixels from an inner tile edge counted as cut.
+
+    Yields:
+        tuple: (source, Detections, timings_ms dict) in input order; tiled
+        images carry ``tiles`` in their timings.
+    """
+    if mode not in TILE_MODES:
+        raise ValueError(f"mode must be one of {TILE_MODES}, got {mode!r}")
+
+    pending = []
+
+    def flush():
+        if not pending:
+            return []
+        t0 = time.perf_counter()
+        results = model.predict([d.image for _, d in pending], conf=conf, iou=iou, imgsz=imgsz, batch=batch,
+                                verbose=False)
+        wall = (time.perf_counter() - t0) * 1000 / len(pending)
+        out = []
+        for (source, decoded), result in zip(pending, results):
+            timings = {k: round(v, 2) for k, v in result.speed.items()}
+            timings["total"] = round(wall, 2)
+            out.append((source, to_original(Detections.from_result(result), decoded), timings))
+        pending.clear()
+        return out
+
+    for source in sources:
+        shape = _source_shape(source)
+        decoded = None
+        if shape is None:
+            decoded = load_source(source)
+            shape = decoded.orig_shape
+        if mode == "never" or (mode == "auto" and not needs_tiling(*shape, imgsz, max_downscale, max_aspect)):
+            pending.append((source, decoded or load_source(source, imgsz)))
+            if len(pending) >= batch:
+                yield from flush()
+            continue
+
+        yield from flush()
+        # Tiles exist to keep the detail: full resolution
+        decoded = decoded or load_source(source)
+        detections, timings = _predict_one_tiled(
+            model, decoded.image, conf, imgsz, iou, overlap, max_downscale, max_aspect, merge, merge_iou, full_image,
+            edge_margin,
+        )
+        yield source, to_original(detections, decoded), timings
+    yield from flush()
+
+
+def _source_shape(source):
+    """Upright (height, width) of a source without decoding it (None if unknown)."""
+    if isinstance(source, np.ndarray):
+        return source.shape[:2]
+    if isinstance(source, DecodedImage):
+        return source.orig_shape
+    header = read_header(source)
+    return (header["height"], header["width"]) if header else None
+
+
+def _predict_one_tiled(model, image, conf, imgsz, iou, overlap, max_downscale, max_aspect, merge, merge_iou,
+                       full_image, edge_margin):
+    height, width = image.shape[:2]
+    tile_h, tile_w = tile_shape(height, width, imgsz, max_downscale, max_aspect)
+    windows = tile_windows(height, width, tile_h, tile_w, overlap)
+
+    t0 = time.perf_counter()
+    with tracing.stage("tile_crop"):
+        crops = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in windows]
+        if full_image:
+            crops.append(image)
+    # All tiles of an image in one forward pass
+    results = model.predict(crops, conf=conf, iou=iou, imgsz=imgsz, batch=len(crops), verbose=False)
+
+    with tracing.stage("tile_merge"):
+        boxes, scores, classes = [], [], []
+        for k, result in enumerate(results):
+            det = Detections.from_result(result)
+            if k < len(windows):
+                x0, y0 = windows[k][:2]
+                det.boxes += np.array([x0, y0, x0, y0], dtype=np.float32)
+                keep = ~_inner_edge_mask(det.boxes, windows[k], height, width, edge_margin)
+            else:
+                keep = np.ones(len(det), dtype=bool)
+            boxes.append(det.boxes[keep])
+            scores.append(det.scores[keep])
+            classes.append(det.classes[keep])
+        merged = merge_boxes(np.concatenate(boxes), np.concatenate(scores), np.concatenate(classes), merge_iou, merge)
+    tracing.count("tiles", len(crops))
+
+    timings = {"tiles": len(crops), "total": round((time.perf_counter() - t0) * 1000, 2)}
+    return Detections(*merged, (height, width)), timings
@@ -1,29 +1,305 @@
 # YOLO evaluation metrics (mAP, confusion matrix)
+import json
 import os
 import cv2
 import unittest
 import numpy as np
 
 from ultralytics import YOLO
+from src.data.data_loader import label_path_for, read_yolo_labels
+from src.models.inference import Detections, box_iou, predict_batches
 from src.models.yolo_predict import predict_ecg
 
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
 def compute_iou(box1, box2):
     """
     Compute IoU between two bounding boxes.
     Each box: [x1, y1, x2, y2]
     """
-    x1 = max(box1[0], box2[0])
-    y1 = max(box1[1], box2[1])
-    x2 = min(box1[2], box2[2])
-    y2 = min(box1[3], box2[3])
+    return float(box_iou([box1], [box2])[0, 0])
+
+
+def xywhn_to_xyxy(boxes, width, height):
+    """Convert normalized YOLO [xc, yc, w, h] boxes to pixel [x1, y1, x2, y2]."""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    xy = boxes[:, :2] * (width, height)
+    wh = boxes[:, 2:] * (width, height) / 2
+    return np.concatenate([xy - wh, xy + wh], axis=1)
+
+
+def load_ground_truth(image_path, orig_shape, index=None):
+    """
+    Load labels of an image as pixel boxes.
+
+    Args:
+        image_path (str): Path to the image.
+        orig_shape (tuple): (height, width) of the image.
+        index (LabelIndex): Optional dataset index to read labels from.
+
+    Returns:
+        tuple: (boxes (K, 4) xyxy, classes (K,))
+    """
+    height, width = orig_shape
+    row = index.find(image_path) if index is not None else None
+    if row is not None:
+        classes, boxes = index.labels(row)
+        return xywhn_to_xyxy(boxes, width, height), classes.astype(np.int64)
+
+    labels = read_yolo_labels(label_path_for(image_path)).astype(np.float32)
+    return xywhn_to_xyxy(labels[:, 1:], width, height), labels[:, 0].astype(np.int64)
+
+
+def _greedy_match(iou, mask):
+    """
+    One-to-one matching among candidate pairs, highest IoU first.
+
+    Args:
+        iou (numpy.ndarray): (M, N) IoU between ground truth and predictions.
+        mask (numpy.ndarray): (M, N) bool, candidate pairs.
+
+    Returns:
+        tuple: (ground-truth indices, prediction indices) of the matches.
+    """
+    gt_idx, pred_idx = np.nonzero(mask)
+    if gt_idx.size == 0:
+        return gt_idx, pred_idx
+    order = np.argsort(-iou[gt_idx, pred_idx], kind="stable")
+    gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+    _, first = np.unique(pred_idx, return_index=True)
+    gt_idx, pred_idx = gt_idx[first], pred_idx[first]
+    order = np.argsort(-iou[gt_idx, pred_idx], kind="stable")
+    gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+    _, first = np.unique(gt_idx, return_index=True)
+    return gt_idx[first], pred_idx[first]
 
-    inter_area = max(0, x2 - x1) * max(0, y2 - y1)
-    box1_area = (box1[2] - box1[0]) * (box1[3] - box1[1])
-    box2_area = (box2[2] - box2[0]) * (box2[3] - box2[1])
 
-    union_area = box1_area + box2_area - inter_area
-    iou = inter_area / union_area if union_area > 0 else 0.0
-    return iou
+def match_predictions(pred_classes, true_classes, iou, thresholds=IOU_THRESHOLDS):
+    """
+    Greedily match predictions to ground truth at several IoU thresholds.
+
+    Args:
+        pred_classes (numpy.ndarray): (N,) predicted class ids.
+        true_classes (numpy.ndarray): (M,) ground-truth class ids.
+        iou (numpy.ndarray): (M, N) IoU between ground truth and predictions.
+        thresholds (numpy.ndarray): IoU thresholds.
+
+    Returns:
+        numpy.ndarray: (N, T) bool, True where the prediction is a true positive.
+    """
+    correct = np.zeros((len(pred_classes), len(thresholds)), dtype=bool)
+    if len(pred_classes) == 0 or len(true_classes) == 0:
+        return correct
+
+    iou = iou * (true_classes[:, None] == pred_classes[None, :])
+    for t, threshold in enumerate(thresholds):
+        gt_idx, pred_idx = _greedy_match(iou, iou >= threshold)
+        correct[pred_idx, t] = True
+    return correct
+
+
+def compute_ap(recall, precision):
+    """
+    Average precision from one recall/precision curve (101-point COCO interpolation).
+
+    Precision drops to zero right after the highest recall reached, so
+    unreached recall levels do not count towards the AP.
+
+    Returns:
+        tuple: (ap, recall envelope, precision envelope)
+    """
+    mrec = np.concatenate(([0.0], recall, [recall[-1] if len(recall) else 1.0], [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0], [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return float(_trapezoid(np.interp(x, mrec, mpre), x)), mrec, mpre
+
+
+def ap_per_class(tp, conf, pred_classes, target_classes, nc):
+    """
+    Per-class precision, recall, AP and PR curves.
+
+    Args:
+        tp (numpy.ndarray): (N, T) true-positive flags of all predictions.
+        conf (numpy.ndarray): (N,) confidences.
+        pred_classes (numpy.ndarray): (N,) predicted class ids.
+        target_classes (numpy.ndarray): (M,) ground-truth class ids.
+        nc (int): Number of classes.
+
+    Returns:
+        dict: precision/recall (nc,) at the max-F1 confidence, ap (nc, T),
+        and curves: recall grid, precision (nc, 1000) at IoU 0.5.
+    """
+    order = np.argsort(-conf, kind="stable")
+    tp, conf, pred_classes = tp[order], conf[order], pred_classes[order]
+    n_targets = np.bincount(target_classes, minlength=nc)
+
+    px = np.linspace(0, 1, 1000)
+    ap = np.zeros((nc, tp.shape[1]))
+    p_curve, r_curve = np.zeros((nc, 1000)), np.zeros((nc, 1000))
+    pr_curve = np.zeros((nc, 1000))
+
+    for c in range(nc):
+        mask = pred_classes == c
+        if mask.sum() == 0 or n_targets[c] == 0:
+            continue
+        tpc = tp[mask].cumsum(0)
+        fpc = (1 - tp[mask]).cumsum(0)
+        recall = tpc / n_targets[c]
+        precision = tpc / (tpc + fpc)
+
+        # Curves against confidence (for the max-F1 operating point)
+        r_curve[c] = np.interp(-px, -conf[mask], recall[:, 0], left=0)
+        p_curve[c] = np.interp(-px, -conf[mask], precision[:, 0], left=1)
+
+        for t in range(tp.shape[1]):
+            ap[c, t], mrec, mpre = compute_ap(recall[:, t], precision[:, t])
+            if t == 0:
+                pr_curve[c] = np.interp(px, mrec, mpre)
+
+    f1 = 2 * p_curve * r_curve / np.maximum(p_curve + r_curve, 1e-16)
+    best = int(f1.mean(0).argmax()) if nc else 0
+    return {
+        "precision": p_curve[:, best],
+        "recall": r_curve[:, best],
+        "ap": ap,
+        "best_conf": float(px[best]),
+        "curves": {"recall": px, "precision": pr_curve},
+    }
+
+
+def confusion_matrix(pred_boxes, pred_classes, true_boxes, true_classes, nc, iou_threshold=0.45):
+    """
+    Detection confusion matrix of one image (rows: predicted, cols: true).
+
+    Index ``nc`` is background: row ``nc`` counts missed ground truth and
+    column ``nc`` counts unmatched predictions.
+
+    Returns:
+        numpy.ndarray: (nc + 1, nc + 1) int64 counts.
+    """
+    matrix = np.zeros((nc + 1, nc + 1), dtype=np.int64)
+    gt_matched = np.zeros(len(true_classes), dtype=bool)
+    pred_matched = np.zeros(len(pred_classes), dtype=bool)
+
+    if len(true_classes) and len(pred_classes):
+        iou = box_iou(true_boxes, pred_boxes)
+        gt_idx, pred_idx = _greedy_match(iou, iou > iou_threshold)
+        np.add.at(matrix, (pred_classes[pred_idx], true_classes[gt_idx]), 1)
+        gt_matched[gt_idx] = True
+        pred_matched[pred_idx] = True
+
+    np.add.at(matrix, (nc, true_classes[~gt_matched]), 1)
+    np.add.at(matrix, (pred_classes[~pred_matched], nc), 1)
+    return matrix
+
+
+def evaluate_detections(predictions, names, ground_truth=None, cm_conf=0.25, cm_iou=0.45, index=None):
+    """
+    Compute detection metrics from stored predictions (no model call).
+
+    Predictions should be stored at a low confidence (e.g. 0.001) so that
+    the PR curves cover the whole recall range.
+
+    Args:
+        predictions (dict): {image path: Detections}.
+        names (dict): Class id -> name mapping.
+        ground_truth (dict): Optional {image path: (boxes xyxy, classes)};
+            read from the YOLO label files when None.
+        cm_conf (float): Confidence cutoff for the confusion matrix.
+        cm_iou (float): IoU threshold for the confusion matrix.
+        index (LabelIndex): Optional dataset index used instead of label files.
+
+    Returns:
+        dict: mAP50, mAP50-95, per-class metrics, PR curves and confusion matrix.
+    """
+    nc = len(names)
+    tps, confs, pred_cls, target_cls = [], [], [], []
+    matrix = np.zeros((nc + 1, nc + 1), dtype=np.int64)
+
+    for path, det in predictions.items():
+        if ground_truth is not None:
+            true_boxes, true_classes = ground_truth[path]
+        else:
+            true_boxes, true_classes = load_ground_truth(path, det.orig_shape, index)
+
+        iou = box_iou(true_boxes, det.boxes)
+        tps.append(match_predictions(det.classes, true_classes, iou))
+        confs.append(det.scores)
+        pred_cls.append(det.classes)
+        target_cls.append(true_classes)
+
+        keep = det.scores >= cm_conf
+        matrix += confusion_matrix(det.boxes[keep], det.classes[keep], true_boxes, true_classes, nc, cm_iou)
+
+    stats = ap_per_class(
+        np.concatenate(tps) if tps else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool),
+        np.concatenate(confs) if confs else np.zeros(0),
+        np.concatenate(pred_cls) if pred_cls else np.zeros(0, dtype=np.int64),
+        np.concatenate(target_cls) if target_cls else np.zeros(0, dtype=np.int64),
+        nc,
+    )
+    ap = stats["ap"]
+    # Like Ultralytics, classes without ground truth in the split do not count towards the mean
+    present = np.bincount(np.concatenate(target_cls) if target_cls else np.zeros(0, dtype=np.int64), minlength=nc) > 0
+    per_class = {
+        names[c]: {
+            "precision": float(stats["precision"][c]),
+            "recall": float(stats["recall"][c]),
+            "mAP50": float(ap[c, 0]),
+            "mAP50-95": float(ap[c].mean()),
+        }
+        for c in range(nc)
+    }
+    return {
+        "images": len(predictions),
+        "mAP50": float(ap[present, 0].mean()) if present.any() else 0.0,
+        "mAP50-95": float(ap[present].mean()) if present.any() else 0.0,
+        "best_conf": stats["best_conf"],
+        "per_class": per_class,
+        "pr_curves": stats["curves"],
+        "confusion_matrix": matrix,
+    }
+
+
+def predict_split(model, image_paths, conf=0.001, imgsz=640, batch=16, cache=None, iou=0.7, max_det=300):
+    """
+    Predict a split once for offline evaluation.
+
+    With a ``PredictionCache`` repeated evaluations reuse stored predictions
+    instead of running the model again.
+
+    Returns:
+        dict: {image path: Detections}
+    """
+    outputs = predict_batches(model, list(image_paths), conf=conf, imgsz=imgsz, batch=batch, cache=cache, iou=iou,
+                              max_det=max_det)
+    return {path: detections for path, detections, _ in outputs}
+
+
+def load_predictions(path, names):
+    """
+    Load stored predictions written by batch predict (JSONL).
+
+    Args:
+        path (str): JSONL output of ``main.py --mode predict --output``.
+        names (dict): Class id -> name mapping.
+
+    Returns:
+        dict: {image path: Detections}
+    """
+    predictions = {}
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not record.get("error"):
+                predictions[record["path"]] = Detections.from_dict(record, names)
+    return predictions
 
 
 class TestYOLOModel(unittest.TestCase):
@@ -1,9 +1,52 @@
-from ultralytics import YOLO
+from src.analysis.verdict import VerdictEngine, load_policy
+from src.models.inference import Detections
+from src.models.registry import get_model
 
-# Load model hasil training
-model = YOLO("runs/yolo11s/best.pt")
 
-# Jalankan evaluasi di validation set
-metrics = model.val(data="config/data.yaml", imgsz=960, batch=16)
+def predict_ecg(model_path, image_path, conf=0.25):
+    """
+    Predict one ECG image.
 
-print(metrics)
\ No newline at end of file
+    Args:
+        model_path (str): Path to the model file.
+        image_path (str): Path to the image.
+        conf (float): Confidence threshold.
+
+    Returns:
+        status (str): 'Abnormal' if any abnormal beat is detected, else 'Healthy'.
+        label (str): Class of the most confident box (None without boxes).
+        conf (float): Confidence of that box (0.0 without boxes).
+    """
+    model = get_model(model_path)
+    results = model(image_path, conf=conf, verbose=False)
+    detections = Detections.from_result(results[0])
+
+    engine = VerdictEngine(model.names, dict(load_policy(profile="cli"), conf=conf))
+    verdict = engine.analyze([detections])[0]
+    status = "Abnormal" if verdict.n_abnormal > 0 else "Healthy"
+
+    if len(detections) == 0:
+        return status, None, 0.0
+    best = int(detections.scores.argmax())
+    return status, model.names[int(detections.classes[best])], float(detections.scores[best])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.data.image_cache import DEFAULT_IMAGE_CACHE_DIR
+    from src.models.yolo_trainer import image_cache_validator
+
+    parser = argparse.ArgumentParser(description="Evaluasi model di validation set")
+    parser.add_argument("--image-cache", type=str, nargs="?", const=DEFAULT_IMAGE_CACHE_DIR,
+                        help="Baca gambar dari cache yang sudah di-resize (memmap) di folder ini")
+    args = parser.parse_args()
+
+    # Load model hasil training
+    model = get_model("runs/yolo11s/best.pt", warmup=False)
+
+    # Jalankan evaluasi di validation set
+    validator = image_cache_validator(args.image_cache) if args.image_cache else None
+    metrics = model.val(data="config/data.yaml", imgsz=960, batch=16, validator=validator)
+
+    print(metrics)
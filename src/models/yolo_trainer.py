@@ -1,5 +1,94 @@
 # YOLO training pipeline
+import os
+
 from ultralytics import YOLO
+from ultralytics.models.yolo.detect import DetectionTrainer, DetectionValidator
+
+from src.data.image_cache import DEFAULT_IMAGE_CACHE_DIR, ImageCache
+from src.utils.config import load_config
+
+
+class _CachedImageLoader:
+    """``load_image`` replacement serving rect-mode images from an ``ImageCache``."""
+
+    def __init__(self, dataset, cache):
+        self.dataset = dataset
+        self.cache = cache
+        self.load_image = type(dataset).load_image
+
+    def __call__(self, i, rect_mode=True, resize_short=False):
+        dataset = self.dataset
+        # Images already in the augmentation buffer come from there, as in load_image
+        if rect_mode and not resize_short and dataset.ims[i] is None:
+            cached = self.cache.get(dataset.im_files[i])
+            if cached is not None:
+                self._buffer(i, *cached)
+                return cached
+        return self.load_image(dataset, i, rect_mode, resize_short)
+
+    def _buffer(self, i, im, hw0, hw):
+        """Same buffer bookkeeping as ``BaseDataset.load_image`` (mosaic samples its extra images from it)."""
+        dataset = self.dataset
+        if not dataset.augment or dataset.cache == "ram":
+            return
+        dataset.ims[i], dataset.im_hw0[i], dataset.im_hw[i] = im, hw0, hw
+        dataset.buffer.append(i)
+        if 1 < len(dataset.buffer) >= dataset.max_buffer_length:  # never empty the buffer
+            j = dataset.buffer.pop(0)
+            dataset.ims[j], dataset.im_hw0[j], dataset.im_hw[j] = None, None, None
+
+
+def attach_image_cache(dataset, cache_dir=DEFAULT_IMAGE_CACHE_DIR, workers=4):
+    """
+    Make an Ultralytics dataset read its images from an ``ImageCache``.
+
+    The cache is built (or refreshed) for the dataset's images at its imgsz;
+    augmentation and labels are untouched.
+
+    Args:
+        dataset (YOLODataset): Dataset built by a trainer or validator.
+        cache_dir (str): Folder of the cache files.
+        workers (int): Decode threads used when building the cache.
+
+    Returns:
+        YOLODataset: The same dataset.
+    """
+    cache = ImageCache.build(dataset.im_files, dataset.imgsz, cache_dir, workers)
+    dataset.load_image = _CachedImageLoader(dataset, cache)
+    return dataset
+
+
+def image_cache_trainer(cache_dir=DEFAULT_IMAGE_CACHE_DIR):
+    """``DetectionTrainer`` whose train/val datasets read from an image cache."""
+
+    class CachedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            return attach_image_cache(super().build_dataset(img_path, mode, batch), cache_dir)
+
+    return CachedDetectionTrainer
+
+
+def image_cache_validator(cache_dir=DEFAULT_IMAGE_CACHE_DIR):
+    """``DetectionValidator`` for ``model.val(validator=...)`` reading from an image cache."""
+
+    class CachedDetectionValidator(DetectionValidator):
+        def build_dataset(self, img_path, mode="val", batch=None):
+            return attach_image_cache(super().build_dataset(img_path, mode, batch), cache_dir)
+
+    return CachedDetectionValidator
+
+
+def load_train_params(path="config/params.yaml"):
+    """
+    Training arguments from params.yaml, without its ``sweep`` section.
+
+    Returns:
+        dict: Keyword arguments for ``train_yolo`` (empty when ``path`` is missing).
+    """
+    params = dict(load_config(path) or {}) if os.path.exists(path) else {}
+    params.pop("sweep", None)
+    return params
+
 
 def train_yolo(
     data="config/data.yaml",
@@ -13,6 +102,9 @@ def train_yolo(
     lrf=0.01,
     project="runs/train",
     name="exp",
+    image_cache=None,
+    callbacks=None,
+    **overrides,
 ):
     """
     Train a YOLO11 model on the ECG dataset.
@@ -29,13 +121,21 @@ def train_yolo(
         lrf (float): Final learning rate fraction
         project (str): Folder to save results
         name (str): Experiment name
+        image_cache (str): Folder of a pre-resized image cache (see
+            src.data.image_cache); images are decoded every epoch when None
+        callbacks (dict): Ultralytics callbacks, {event name: function}
+        **overrides: Any other Ultralytics train argument (augmentations,
+            workers, ...), e.g. the rest of config/params.yaml
 
     Returns:
         results (dict): Training results
     """
     model = YOLO(model)
+    for event, callback in (callbacks or {}).items():
+        model.add_callback(event, callback)
 
     results = model.train(
+        trainer=image_cache_trainer(image_cache) if image_cache else None,
         data=data,
         epochs=epochs,
         imgsz=imgsz,
@@ -46,6 +146,7 @@ def train_yolo(
         lrf=lrf,
         project=project,
         name=name,
+        **overrides,
     )
 
     print("✅ Training complete. Results saved in:", f"{project}/{name}")
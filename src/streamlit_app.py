@@ -1,61 +1,84 @@
 import streamlit as st
-from ultralytics import YOLO
 import os
+import sys
 
-def analyze_ecg_results(results, model):
-    jumlah_abnormal = sum(
-        1 for r in results for box in r.boxes if model.names[int(box.cls[0])] == "abnormal"
-    )
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    if len(results[0].boxes) == 0:
-        status = "✅ Detak jantung sehat (Normal)"
-    elif jumlah_abnormal > 10:
-        status = "⚠️ Detak jantung abnormal, perlu istirahat dan konsultasi dokter"
-    elif jumlah_abnormal > 0:
-        status = "⚠️ Detak jantung abnormal ringan, kurangi merokok, makan sehat, dan tambahkan waktu olahraga"
-    else:
-        status = "⚠️ Deteksi muncul tapi bukan label 'abnormal'"
+from src.analysis.verdict import VerdictEngine, analyze_ecg_results, inference_conf, load_policy
+from src.models.batch_predict import build_records
+from src.models.inference import predict_batches
+from src.models.prediction_cache import PredictionCache
+from src.models.registry import get_model
+from src.models.result_store import ResultStore
+from src.utils import tracing
+from src.utils.decode import decode_source
+from src.utils.render import render
 
-    return status, jumlah_abnormal
+POLICY = load_policy(profile="streamlit")
+IMGSZ = int(os.environ.get("ECG_IMGSZ", 640))
+
+
+@st.cache_resource
+def prediction_cache(path):
+    """One cache (and SQLite connection) per server process, not per rerun."""
+    return PredictionCache(path)
+
+
+# Opt-in prediction cache for repeated uploads (set ECG_CACHE=<path>)
+CACHE = prediction_cache(os.environ["ECG_CACHE"]) if os.environ.get("ECG_CACHE") else None
+
+
+@st.cache_resource
+def result_store(path):
+    """One store (and writer thread) per server process, not per rerun."""
+    return ResultStore(path)
+
+
+# Opt-in prediction history (set ECG_RESULTS=<path>)
+STORE = result_store(os.environ["ECG_RESULTS"]) if os.environ.get("ECG_RESULTS") else None
 
 
 st.title("🫀 ECG Detection with YOLO11")
 
-model_path = st.text_input("Model path (.pt)", "runs/yolo11s/last.pt")
+model_path = st.text_input("Model path (.pt / .onnx / OpenVINO)", "runs/yolo11s/last.pt")
 
 uploaded_file = st.file_uploader("Upload ECG Image", type=["jpg", "jpeg", "png"])
 
 if uploaded_file is not None:
-    temp_path = "temp_ecg.jpg"
-    with open(temp_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-
-    # Tampilkan sebelum deteksi
-    st.subheader("📷 Sebelum Deteksi")
-    st.image(temp_path, caption="Uploaded ECG", use_container_width=True)
-
-    # Load YOLO model
-    model = YOLO(model_path)
-    results = model(temp_path, conf=0.3, save=True)  # save hasil deteksi
-
-    # Analisis
-    status, jumlah_abnormal = analyze_ecg_results(results, model)
-
-    # Ambil path gambar hasil YOLO
-    result_image = results[0].plot()  # hasil sebagai array (BGR)
-    import cv2
-    import tempfile
-    from PIL import Image
-
-    # Simpan hasil ke file sementara
-    temp_out = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg")
-    cv2.imwrite(temp_out.name, result_image)
-
-    # Tampilkan sesudah deteksi
-    st.subheader("✅ Sesudah Deteksi")
-    st.image(temp_out.name, caption="Hasil Deteksi YOLO", use_container_width=True)
-
-    # Hasil analisis
-    st.subheader("📊 Hasil Analisis")
-    st.write(status)
-    st.write(f"Jumlah abnormal terdeteksi: **{jumlah_abnormal}**")
\ No newline at end of file
+    with tracing.span("streamlit_predict"):
+        data = uploaded_file.getvalue()
+        with tracing.stage("decode"):
+            # No larger than inference needs (phone photos are often 12 MP)
+            image = decode_source(data, IMGSZ)
+        if image is None:
+            st.error("File bukan gambar yang valid")
+            st.stop()
+
+        # Tampilkan sebelum deteksi
+        st.subheader("📷 Sebelum Deteksi")
+        st.image(data, caption="Uploaded ECG", use_container_width=True)
+
+        # Ambil model dari registry (tetap hangat antar upload)
+        model = get_model(model_path)
+        _, detections, timings = next(
+            predict_batches(model, [image], conf=inference_conf(POLICY), imgsz=IMGSZ, batch=1, cache=CACHE)
+        )
+        if STORE is not None:
+            records = build_records([uploaded_file.name], [detections], VerdictEngine(model.names, POLICY), [timings])
+            STORE.add(records, model.names, model_path, "streamlit", [data], [detections])
+
+        # Analisis
+        status, jumlah_abnormal = analyze_ecg_results([detections], model.names, POLICY)
+
+        # Gambar box langsung di gambar hasil decode (ukuran kecil), encode di memori (tanpa file sementara)
+        with tracing.stage("render"):
+            rendered = render(image, detections, model.names, fmt="jpg")
+
+        # Tampilkan sesudah deteksi
+        st.subheader("✅ Sesudah Deteksi")
+        st.image(rendered, caption="Hasil Deteksi YOLO", use_container_width=True)
+
+        # Hasil analisis
+        st.subheader("📊 Hasil Analisis")
+        st.write(status)
+        st.write(f"Jumlah abnormal terdeteksi: **{jumlah_abnormal}**")
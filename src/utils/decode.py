@@ -0,0 +1,139 @@
+# resolution-aware image decode stage: header first, never larger than inference needs
+import io
+import os
+
+import cv2
+import numpy as np
+
+# JPEG DCT scaling: the decoder skips coefficients, so a 1/8 decode costs a
+# fraction of a full one
+REDUCED_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                 8: cv2.IMREAD_REDUCED_COLOR_8}
+# EXIF orientation tag -> operations turning stored pixels upright
+ORIENTATIONS = {
+    2: (lambda im: cv2.flip(im, 1),),
+    3: (lambda im: cv2.rotate(im, cv2.ROTATE_180),),
+    4: (lambda im: cv2.flip(im, 0),),
+    5: (cv2.transpose,),
+    6: (lambda im: cv2.rotate(im, cv2.ROTATE_90_CLOCKWISE),),
+    7: (cv2.transpose, lambda im: cv2.flip(im, -1)),
+    8: (lambda im: cv2.rotate(im, cv2.ROTATE_90_COUNTERCLOCKWISE),),
+}
+
+
+class DecodedImage:
+    """
+    Decoded pixels plus the mapping back to the original image.
+
+    Args:
+        image (numpy.ndarray): Upright BGR image, possibly downscaled.
+        orig_shape (tuple): (height, width) of the full-resolution upright image.
+    """
+
+    __slots__ = ("image", "orig_shape")
+
+    def __init__(self, image, orig_shape=None):
+        self.image = image
+        self.orig_shape = tuple(int(v) for v in (orig_shape or image.shape[:2]))
+
+    @property
+    def scale(self):
+        """(x, y) factors from decoded to original pixel coordinates."""
+        height, width = self.image.shape[:2]
+        return self.orig_shape[1] / width, self.orig_shape[0] / height
+
+    @property
+    def reduced(self):
+        return self.image.shape[:2] != self.orig_shape
+
+
+def read_header(source):
+    """
+    Format, size and EXIF orientation from the image header (no pixel decode).
+
+    Args:
+        source (str or bytes): Image path or encoded bytes.
+
+    Returns:
+        dict: ``format`` (e.g. 'JPEG', 'PNG'), upright ``width`` / ``height``
+        and ``orientation`` (1-8), or None when the header is not readable.
+    """
+    from PIL import Image
+
+    if isinstance(source, str) and not os.path.isfile(source):
+        return None
+    try:
+        with Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source) as im:
+            width, height = im.size
+            # PNG getexif() decodes the whole file when the eXIf chunk comes late
+            has_exif = im.format != "PNG" or "exif" in im.info
+            orientation = im.getexif().get(0x0112, 1) if has_exif else 1
+            image_format = im.format
+    except Exception:
+        # Also whatever a patched Image.open raises (Ultralytics retries unknown formats with pi-heif)
+        return None
+    orientation = orientation if orientation in ORIENTATIONS else 1
+    if orientation >= 5:
+        width, height = height, width
+    return {"format": image_format, "width": width, "height": height, "orientation": orientation}
+
+
+def reduction_factor(width, height, imgsz):
+    """Largest JPEG reduction (1, 2, 4 or 8) keeping the long side >= ``imgsz``."""
+    if not imgsz:
+        return 1
+    long_side = max(width, height)
+    return next((f for f in (8, 4, 2) if long_side / f >= imgsz), 1)
+
+
+def _imdecode(source, flags):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return cv2.imdecode(np.frombuffer(source, dtype=np.uint8), flags)
+    return cv2.imread(source, flags)
+
+
+def decode_source(source, imgsz=None):
+    """
+    Decode an image no larger than inference at ``imgsz`` needs.
+
+    The header is read first. JPEGs are decoded at 1/2, 1/4 or 1/8 scale
+    when the long side stays at least ``imgsz``; other formats (PNG) are
+    decoded in full and immediately shrunk to ``imgsz`` with area
+    interpolation, so the array kept in memory and handed to the model is
+    small either way. EXIF orientation is applied in both cases, matching
+    ``cv2.imread``.
+
+    Args:
+        source (str, bytes, numpy.ndarray or DecodedImage): Path, encoded
+            bytes, or an already decoded image (returned as is).
+        imgsz (int): Inference size; None decodes at full resolution.
+
+    Returns:
+        DecodedImage: Decoded image, or None when ``source`` cannot be decoded.
+    """
+    if isinstance(source, DecodedImage):
+        return source
+    if isinstance(source, np.ndarray):
+        return DecodedImage(source)
+
+    header = read_header(source)
+    if header is None:
+        # Let OpenCV try formats PIL does not know (and apply EXIF itself)
+        image = _imdecode(source, cv2.IMREAD_COLOR)
+        return DecodedImage(image) if image is not None else None
+
+    width, height = header["width"], header["height"]
+    factor = reduction_factor(width, height, imgsz) if header["format"] == "JPEG" else 1
+    image = _imdecode(source, REDUCED_FLAGS[factor] | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image is None:
+        return None
+    for op in ORIENTATIONS.get(header["orientation"], ()):
+        image = op(image)
+
+    resized = factor > 1
+    if imgsz and not resized and max(image.shape[:2]) > imgsz:
+        r = imgsz / max(image.shape[:2])
+        size = (max(1, round(image.shape[1] * r)), max(1, round(image.shape[0] * r)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        resized = True
+    return DecodedImage(image, (height, width) if resized else None)
@@ -1,8 +1,40 @@
 # setup logging configuration
+import json
 import logging
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S"
-)
\ No newline at end of file
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; dict messages are merged into the object."""
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict):
+            payload.update(record.msg)
+        else:
+            payload["message"] = record.getMessage()
+        return json.dumps(payload, default=str)
+
+
+def json_logger(name, path=None):
+    """
+    Logger writing JSON lines to ``path`` (stderr when None), kept out of
+    the plain-text root handler.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.FileHandler(path) if path else logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
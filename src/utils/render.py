@@ -0,0 +1,124 @@
+# in-memory rendering of detections: decode, draw and encode without temp files
+import cv2
+import numpy as np
+
+from src.utils.decode import DecodedImage
+
+# Ultralytics default palette (RGB hex), indexed by class id
+_PALETTE = ("FF3838", "FF9D97", "FF701F", "FFB21D", "CFD231", "48F90A", "92CC17", "3DDB86", "1A9334", "00D4BB")
+COLORS = tuple(tuple(int(h[i:i + 2], 16) for i in (4, 2, 0)) for h in _PALETTE)  # BGR
+
+FORMATS = {"jpg": ".jpg", "jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+
+
+def decode_image(data, flags=cv2.IMREAD_COLOR):
+    """
+    Decode encoded image bytes (e.g. an upload) to a BGR array.
+
+    Returns:
+        numpy.ndarray: Decoded image, or None when ``data`` is not an image.
+    """
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+
+def draw_detections(image, detections, names, conf=0.0, line_width=None, labels=True, copy=False):
+    """
+    Draw boxes and labels onto a BGR image.
+
+    Args:
+        image (numpy.ndarray): BGR image; drawn on in place unless ``copy``.
+        detections (Detections): Detections of the image.
+        names (dict): Class id -> name mapping.
+        conf (float): Hide boxes below this confidence.
+        line_width (int): Box line width (default scales with the image).
+        labels (bool): Draw "name conf" labels.
+        copy (bool): Draw on a copy and keep ``image`` untouched.
+
+    Returns:
+        numpy.ndarray: The annotated image.
+    """
+    if copy:
+        image = image.copy()
+    lw = line_width or max(round(sum(image.shape[:2]) / 2 * 0.003), 2)
+    font_scale, font_thickness = lw / 3, max(lw - 1, 1)
+    keep = detections.scores >= conf
+    for box, score, cls in zip(detections.boxes[keep], detections.scores[keep], detections.classes[keep]):
+        color = COLORS[int(cls) % len(COLORS)]
+        x0, y0, x1, y1 = (int(round(float(v))) for v in box)
+        cv2.rectangle(image, (x0, y0), (x1, y1), color, lw, cv2.LINE_AA)
+        if not labels:
+            continue
+        text = f"{names.get(int(cls), int(cls))} {float(score):.2f}"
+        (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)
+        # Label above the box, or inside it when the box touches the top edge
+        outside = y0 - th - 3 >= 0
+        ty = y0 - 2 if outside else y0 + th + 2
+        cv2.rectangle(image, (x0, ty - th - 2), (x0 + tw, ty + 2), color, -1, cv2.LINE_AA)
+        cv2.putText(image, text, (x0, ty), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), font_thickness,
+                    cv2.LINE_AA)
+    return image
+
+
+def encode_image(image, fmt="jpg", quality=90):
+    """
+    Encode a BGR image to JPEG / PNG / WebP bytes.
+
+    Args:
+        image (numpy.ndarray): BGR image.
+        fmt (str): 'jpg', 'png' or 'webp'.
+        quality (int): JPEG / WebP quality (1-100); PNG ignores it.
+
+    Returns:
+        bytes: Encoded image.
+    """
+    ext = FORMATS[fmt.lower()]
+    params = {
+        ".jpg": [cv2.IMWRITE_JPEG_QUALITY, quality],
+        ".webp": [cv2.IMWRITE_WEBP_QUALITY, quality],
+        ".png": [cv2.IMWRITE_PNG_COMPRESSION, 1],
+    }[ext]
+    ok, buffer = cv2.imencode(ext, image, params)
+    if not ok:
+        raise ValueError(f"Gagal meng-encode gambar sebagai {fmt}")
+    return buffer.tobytes()
+
+
+def to_pil(image):
+    """BGR array -> RGB PIL image (one colour conversion)."""
+    from PIL import Image
+
+    return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+
+def render(image, detections, names, fmt="jpg", conf=0.0, quality=90, copy=False):
+    """
+    Annotate an image and return it in the requested form.
+
+    Args:
+        image (numpy.ndarray or DecodedImage): Decoded BGR image. A reduced
+            ``DecodedImage`` is drawn at its decoded size, with the boxes
+            (in original pixels) scaled down to it.
+        detections (Detections): Detections of the image.
+        names (dict): Class id -> name mapping.
+        fmt (str): 'jpg' / 'png' / 'webp' (bytes), 'pil', 'array' (BGR), or
+            None to skip rendering entirely (API and batch callers).
+        conf (float): Hide boxes below this confidence.
+        quality (int): JPEG / WebP quality.
+        copy (bool): Keep ``image`` untouched.
+
+    Returns:
+        bytes, PIL.Image.Image, numpy.ndarray or None.
+    """
+    if fmt is None:
+        return None
+    if isinstance(image, DecodedImage):
+        if image.reduced:
+            sx, sy = image.scale
+            detections = detections.rescaled((1 / sx, 1 / sy), image.image.shape[:2])
+        image = image.image
+    annotated = draw_detections(image, detections, names, conf=conf, copy=copy)
+    if fmt == "array":
+        return annotated
+    if fmt == "pil":
+        return to_pil(annotated)
+    return encode_image(annotated, fmt, quality)
@@ -0,0 +1,248 @@
+# per-stage timings, counters and Prometheus metrics of the prediction pipeline
+import bisect
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+from src.utils.logger import json_logger
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL = nullcontext()
+_current_span = contextvars.ContextVar("ecg_span", default=None)
+
+
+class _Stage:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Span:
+    def __init__(self, tracer, name, fields):
+        self.tracer = tracer
+        self.record = {"event": name, **fields, "stages_ms": {}, "counts": {}}
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        # Stages of a nested span (e.g. predict_batch inside a request) also count for the outer one
+        self.parent = _current_span.get()
+        self.token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self.token)
+        elapsed = time.perf_counter() - self.start
+        self.record["total_ms"] = round(elapsed * 1000, 3)
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+        self.tracer.observe(self.record["event"], elapsed, span=False)
+        self.tracer.log.info(self.record)
+        return False
+
+    def add_stage(self, name, seconds):
+        stages = self.record["stages_ms"]
+        stages[name] = round(stages.get(name, 0.0) + seconds * 1000, 3)
+        if self.parent is not None:
+            self.parent.add_stage(name, seconds)
+
+    def add_count(self, name, n):
+        self.record["counts"][name] = self.record["counts"].get(name, 0) + n
+        if self.parent is not None:
+            self.parent.add_count(name, n)
+
+
+class _SpanGroup:
+    """Stand-in current span that records into several spans (the requests sharing a batch)."""
+
+    def __init__(self, spans):
+        self.spans = spans
+
+    def __enter__(self):
+        self.token = _current_span.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current_span.reset(self.token)
+        return False
+
+    def add_stage(self, name, seconds):
+        for span in self.spans:
+            span.add_stage(name, seconds)
+
+    def add_count(self, name, n):
+        for span in self.spans:
+            span.add_count(name, n)
+
+
+class Tracer:
+    """
+    Lightweight tracing: stage histograms, counters and JSON span logs.
+
+    Stages (``with tracer.stage("forward")``) feed a duration histogram per
+    stage name; counters count images, detections, cache hits and so on. A
+    span (``with tracer.span("request", route=...)``) gathers the stages and
+    counters recorded inside it and is logged as one JSON line when it
+    closes. When disabled every call returns a shared no-op context, so the
+    instrumentation can stay in hot paths.
+
+    Args:
+        enabled (bool): Start enabled.
+        log_path (str): JSON log file (stderr when None).
+    """
+
+    def __init__(self, enabled=False, log_path=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self._log = None
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(lambda: [[0] * (len(BUCKETS) + 1), 0.0])
+        self._counters = defaultdict(int)
+
+    @property
+    def log(self):
+        if self._log is None:
+            self._log = json_logger("ecg.trace", self.log_path)
+        return self._log
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def stage(self, name):
+        """Context manager timing one stage."""
+        return _Stage(self, name) if self.enabled else _NULL
+
+    def span(self, name, **fields):
+        """Context manager logging the stages and counts recorded inside it."""
+        return _Span(self, name, fields) if self.enabled else _NULL
+
+    def observe(self, name, seconds, span=True):
+        """Record a stage duration measured elsewhere (e.g. model speed)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            buckets, _ = hist = self._histograms[name]
+            buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+            hist[1] += seconds
+        current = _current_span.get()
+        if span and current is not None:
+            current.add_stage(name, seconds)
+
+    def count(self, name, n=1):
+        """Increase a counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += n
+        current = _current_span.get()
+        if current is not None:
+            current.add_count(name, n)
+
+    def snapshot(self):
+        """
+        Current metrics.
+
+        Returns:
+            dict: {"stages": {name: {count, sum_s}}, "counters": {name: n}}
+        """
+        with self._lock:
+            stages = {
+                name: {"count": sum(buckets), "sum_s": round(total, 6)}
+                for name, (buckets, total) in self._histograms.items()
+            }
+            return {"stages": stages, "counters": dict(self._counters)}
+
+    def render_prometheus(self, prefix="ecg"):
+        """
+        Metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: ``<prefix>_stage_seconds`` histograms and ``<prefix>_<name>_total``
+            counters.
+        """
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of prediction pipeline stages.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self._lock:
+            histograms = {name: (list(b), s) for name, (b, s) in self._histograms.items()}
+            counters = dict(self._counters)
+        for name in sorted(histograms):
+            buckets, total = histograms[name]
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), buckets):
+                cumulative += n
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {cumulative}')
+        for name in sorted(counters):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {counters[name]}")
+        return "\n".join(lines) + "\n"
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").lower() not in ("", "0", "false", "no")
+
+
+# Process-wide tracer, enabled with ECG_TRACE=1 (JSON logs to ECG_TRACE_LOG or stderr)
+TRACER = Tracer(enabled=_env_flag("ECG_TRACE"), log_path=os.environ.get("ECG_TRACE_LOG") or None)
+
+
+def stage(name):
+    """Time a stage on the process-wide tracer."""
+    return TRACER.stage(name)
+
+
+def span(name, **fields):
+    """Open a span on the process-wide tracer."""
+    return TRACER.span(name, **fields)
+
+
+def current_span():
+    """Span open in the current context (None outside spans or when disabled)."""
+    return _current_span.get()
+
+
+def attach(spans):
+    """
+    Record the stages and counts of the block into every span of ``spans``.
+
+    Used where one piece of work serves several traced callers, e.g. a
+    batch of requests run on a worker thread (spans do not follow work
+    handed to other threads or tasks on their own).
+    """
+    spans = [span for span in dict.fromkeys(spans) if span is not None]
+    return _SpanGroup(spans) if spans else _NULL
+
+
+def count(name, n=1):
+    """Increase a counter on the process-wide tracer."""
+    TRACER.count(name, n)
+
+
+def observe(name, seconds):
+    """Record a stage duration on the process-wide tracer."""
+    TRACER.observe(name, seconds)
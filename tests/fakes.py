@@ -0,0 +1,61 @@
+# Ultralytics stand-ins shared by the unit tests (no model download)
+import numpy as np
+
+
+class FakeTensor:
+    def __init__(self, array):
+        self.array = np.asarray(array, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class FakeResult:
+    """
+    Minimal Results stand-in.
+
+    Args:
+        boxes (array-like): (N, 4) xyxy boxes; one abnormal box by default.
+        scores (array-like): (N,) confidences (default 0.9 each).
+        classes (array-like): (N,) class ids (default 0 each).
+        shape (tuple): (height, width) of the predicted image.
+    """
+
+    def __init__(self, boxes=((1, 2, 3, 4),), scores=None, classes=None, shape=(10, 10)):
+        boxes = np.reshape(np.asarray(boxes, dtype=np.float32), (-1, 4))
+        n = len(boxes)
+        self.boxes = type("Boxes", (), {
+            "xyxy": FakeTensor(boxes),
+            "conf": FakeTensor([0.9] * n if scores is None else scores),
+            "cls": FakeTensor([0] * n if classes is None else classes),
+        })()
+        self.orig_shape = tuple(shape)
+        self.speed = {"preprocess": 1.0, "inference": 2.0, "postprocess": 0.5}
+
+
+class FakeModel:
+    """
+    Finds one abnormal box in every image and records each ``predict`` batch.
+
+    Args:
+        shape (tuple): ``orig_shape`` of the results; None uses each image's
+            own shape.
+    """
+
+    names = {0: "abnormal", 1: "normal"}
+
+    def __init__(self, shape=(10, 10)):
+        self.shape = shape
+        self.calls = []
+
+    @property
+    def seen(self):
+        """Number of images predicted so far."""
+        return sum(len(call) for call in self.calls)
+
+    def predict(self, source, **kwargs):
+        self.calls.append(list(source))
+        return [FakeResult(shape=self.shape or image.shape[:2]) for image in source]
@@ -0,0 +1,108 @@
+# unit tests for the analysis module
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import yaml
+
+from src.analysis.threshold_sweep import greedy_nms, pareto_front, sweep
+from src.analysis.verdict import VerdictEngine, analyze_ecg_results, inference_conf, load_policy
+from src.models.inference import Detections
+
+NAMES = {0: "abnormal", 1: "normal"}
+
+
+def make_detections(classes, scores):
+    return Detections([[0, 0, 1, 1]] * len(classes), scores, classes, (10, 10))
+
+
+class TestVerdictEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = load_policy(profile="cli")
+
+    def test_unknown_class_ids_ignored(self):
+        engine = VerdictEngine(NAMES, self.policy)
+        counts = engine.count([make_detections([0, 2, -1, 7], [0.9] * 4)])
+        self.assertEqual(counts.tolist(), [[1, 0]])
+
+    def test_levels_per_image(self):
+        engine = VerdictEngine(NAMES, self.policy)
+        batch = [
+            make_detections([], []),
+            make_detections([0, 1], [0.9, 0.9]),
+            make_detections([0] * 6, [0.9] * 6),
+            make_detections([1, 1], [0.9, 0.9]),
+        ]
+        verdicts = engine.analyze(batch)
+        self.assertEqual([v.level for v in verdicts], ["normal", "mild", "severe", "other"])
+        self.assertEqual(verdicts[2].n_abnormal, 6)
+        self.assertEqual(verdicts[1].counts, {"abnormal": 1, "normal": 1})
+
+    def test_confidence_cutoff(self):
+        policy = dict(self.policy, conf=0.5, class_conf={"abnormal": 0.8})
+        engine = VerdictEngine(NAMES, policy)
+        verdict = engine.analyze([make_detections([0, 0, 1], [0.7, 0.9, 0.6])])[0]
+        self.assertEqual(verdict.n_abnormal, 1)
+        self.assertEqual(verdict.n_detections, 2)
+        self.assertEqual(inference_conf(policy), 0.5)
+
+    def test_analyze_ecg_results(self):
+        status, jumlah_abnormal = analyze_ecg_results([make_detections([0], [0.9])], NAMES, self.policy)
+        self.assertEqual(jumlah_abnormal, 1)
+        self.assertEqual(status, self.policy["messages"]["mild"])
+
+
+class TestThresholdSweep(unittest.TestCase):
+
+    def test_sweep_counts_and_front(self):
+        # Two overlapping abnormal boxes (IoU 0.81) and one separate box
+        boxes = [[0, 0, 10, 10], [0, 0, 10, 9], [50, 50, 60, 60]]
+        sick = Detections(boxes, [0.9, 0.6, 0.4], [0, 0, 0], (100, 100))
+        healthy = Detections([[0, 0, 10, 10]], [0.2], [0], (100, 100))
+        rows = sweep([sick, healthy], [True, False], 0, confs=[0.1, 0.5], ious=[0.5, 0.9], cutoffs=[0, 1])
+
+        def point(conf, iou, cutoff):
+            return next(r for r in rows if (r["conf"], r["iou"], r["cutoff"]) == (conf, iou, cutoff))
+
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(point(0.1, 0.5, 0)["fp"], 1)  # healthy box passes conf 0.1
+        self.assertEqual(point(0.5, 0.5, 0)["specificity"], 1.0)
+        self.assertEqual(point(0.5, 0.5, 1)["tp"], 0)  # NMS leaves one box above 0.5
+        self.assertEqual(point(0.5, 0.9, 1)["tp"], 1)  # looser NMS keeps both
+        front = pareto_front(rows)
+        self.assertIn((1.0, 1.0), [(r["sensitivity"], r["specificity"]) for r in front])
+
+    def test_nms_needs_unsuppressed_input(self):
+        # C, A, B on a line: IoU(C, A) 0.43, IoU(A, B) 0.74, IoU(C, B) 0.29
+        boxes = np.array([[0, 0, 10, 10], [4, 0, 14, 10], [5.5, 0, 15.5, 10]], dtype=np.float32)
+        scores, classes = np.array([0.9, 0.8, 0.7]), np.zeros(3)
+        keep = greedy_nms(boxes, scores, classes, [0.3, 0.7])
+        np.testing.assert_array_equal(keep, [[True, False, True], [True, True, False]])
+        # Re-applying 0.3 to the 0.7 survivors loses B: the sweep must start from un-NMS'd boxes
+        loose = keep[1]
+        again = greedy_nms(boxes[loose], scores[loose], classes[loose], [0.3])[0]
+        self.assertEqual(int(again.sum()), 1)
+
+
+class TestPolicy(unittest.TestCase):
+
+    def test_profile_override(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+            yaml.dump({"severe_threshold": 3, "profiles": {"gradio": {"severe_threshold": 7}}}, f)
+        try:
+            self.assertEqual(load_policy(f.name)["severe_threshold"], 3)
+            self.assertEqual(load_policy(f.name, profile="gradio")["severe_threshold"], 7)
+            self.assertIn("normal", load_policy(f.name)["messages"])
+        finally:
+            os.remove(f.name)
+
+    def test_missing_explicit_path(self):
+        with self.assertRaises(FileNotFoundError):
+            load_policy("config/polcy.yaml")
+        self.assertIn("messages", load_policy(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+# unit tests for the inference service batcher and the prediction daemon
+import asyncio
+import base64
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from fastapi.testclient import TestClient
+
+from src.api.app import create_app
+from src.api.batcher import BatchTooLargeError, DynamicBatcher, QueueFullError
+from src.api.daemon import PredictionDaemon
+from src.api.daemon_client import predict_message, request
+from src.utils import tracing
+from tests.fakes import FakeModel
+
+
+def wide_png():
+    """A 4000x600 strip: tiled into 600x1200 windows at imgsz 640."""
+    return cv2.imencode(".png", np.zeros((600, 4000, 3), dtype=np.uint8))[1].tobytes()
+
+
+class TestDynamicBatcher(unittest.TestCase):
+
+    def test_concurrent_requests_share_a_batch(self):
+        calls = []
+
+        def predict_fn(items):
+            calls.append(list(items))
+            return [item * 2 for item in items]
+
+        async def scenario():
+            batcher = DynamicBatcher(predict_fn, max_batch_size=4, max_wait_ms=50)
+            await batcher.start()
+            outputs = await asyncio.gather(*(batcher.submit([i]) for i in range(4)))
+            await batcher.stop()
+            return outputs
+
+        outputs = asyncio.run(scenario())
+        self.assertEqual([o[0] for o in outputs], [0, 2, 4, 6])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(calls[0]), 4)
+
+    def test_rejects_when_queue_full(self):
+        async def scenario():
+            batcher = DynamicBatcher(lambda items: items, max_queue_size=2)
+            await batcher.start()
+            try:
+                await batcher.submit([1, 2, 3])
+            finally:
+                await batcher.stop()
+
+        with self.assertRaises(QueueFullError):
+            asyncio.run(scenario())
+
+    def test_request_larger_than_queue_is_too_large(self):
+        async def scenario():
+            batcher = DynamicBatcher(lambda items: items, max_batch_size=2, max_queue_size=2)
+            await batcher.start()
+            try:
+                # A request that fills the whole queue still fits
+                self.assertEqual(await batcher.submit([1, 2]), [1, 2])
+                await batcher.submit([1, 2, 3])
+            finally:
+                await batcher.stop()
+
+        with self.assertRaises(BatchTooLargeError):
+            asyncio.run(scenario())
+
+    def test_batch_stages_recorded_in_each_request_span(self):
+        def predict_fn(items):
+            tracing.observe("forward", 0.02)
+            return items
+
+        async def one_request(i):
+            with tracing.span("request", id=i):
+                return await batcher.submit([i])
+
+        async def scenario():
+            await batcher.start()
+            outputs = await asyncio.gather(*(one_request(i) for i in range(2)))
+            await batcher.stop()
+            return outputs
+
+        batcher = DynamicBatcher(predict_fn, max_batch_size=2, max_wait_ms=50)
+        tracing.TRACER.enable()
+        try:
+            with self.assertLogs("ecg.trace", level="INFO") as logs:
+                asyncio.run(scenario())
+        finally:
+            tracing.TRACER.disable()
+            tracing.TRACER.reset()
+        records = [r.msg for r in logs.records]
+        self.assertEqual(sorted(r["id"] for r in records), [0, 1])
+        for record in records:
+            self.assertEqual(record["stages_ms"], {"forward": 20.0})
+
+
+class TestPredictionDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.socket = os.path.join(self.test_dir, "ecg.sock")
+        self.model = FakeModel()
+        self.server = PredictionDaemon(self.socket, "m.pt", loader=lambda path, device=None: self.model)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+
+    def test_predict_paths_and_bytes(self):
+        path = os.path.join(self.test_dir, "a.png")
+        cv2.imwrite(path, np.zeros((10, 10, 3), dtype=np.uint8))
+        message = predict_message([path], send_bytes=False)
+        message["images"] = [
+            {"name": "b.png", "data": base64.b64encode(open(path, "rb").read()).decode()},
+            {"name": "broken.png", "data": base64.b64encode(b"not an image").decode()},
+        ]
+
+        reply = request(message, self.socket)
+        self.assertTrue(reply["ok"])
+        records = reply["records"]
+        self.assertEqual([r["path"] for r in records], [path, "b.png", "broken.png"])
+        self.assertEqual(records[0]["n_abnormal"], 1)
+        self.assertIn("error", records[2])
+        self.assertEqual([len(c) for c in self.model.calls], [2])
+        self.assertEqual(request({"op": "ping"}, self.socket)["images"], 3)
+
+    def test_inline_image_tiled_at_full_resolution(self):
+        message = {"op": "predict", "tile": "auto",
+                   "images": [{"name": "strip.png", "data": base64.b64encode(wide_png()).decode()}]}
+        reply = request(message, self.socket)
+        self.assertTrue(reply["ok"])
+        self.assertEqual({crop.shape[:2] for crop in self.model.calls[0]}, {(600, 1200), (600, 4000)})
+        self.assertEqual(reply["records"][0]["path"], "strip.png")
+
+    def test_local_model_override_made_absolute(self):
+        model = os.path.join(self.test_dir, "best.pt")
+        open(model, "wb").close()
+        message = predict_message([], model=os.path.relpath(model))
+        self.assertEqual(message["model"], model)
+        # Not a local file: sent as is for the daemon to resolve
+        self.assertEqual(predict_message([], model="yolo11n.pt")["model"], "yolo11n.pt")
+
+    def test_refuses_second_daemon_and_unknown_ops(self):
+        with self.assertRaises(RuntimeError):
+            PredictionDaemon(self.socket, "m.pt", loader=lambda path, device=None: self.model)
+        self.assertFalse(request({"op": "nope"}, self.socket)["ok"])
+
+
+
+class TestInferenceService(unittest.TestCase):
+
+    def client(self, model, **settings):
+        settings = {"model_path": "m.pt", "trace": False, "cache": None, "results": None, "cascade": None,
+                    "imgsz": 640, **settings}
+        return TestClient(create_app(settings, loader=lambda path, device=None: model))
+
+    def wait_ready(self, client):
+        for _ in range(100):
+            if client.get("/ready").status_code == 200:
+                return
+            time.sleep(0.01)
+        self.fail("model never became ready")
+
+    def test_upload_tiled_at_full_resolution(self):
+        model = FakeModel()
+        with self.client(model, tile="auto") as client:
+            self.wait_ready(client)
+            response = client.post("/predict", files={"file": ("strip.png", wide_png(), "image/png")})
+        self.assertEqual(response.status_code, 200)
+        # 600x1200 windows plus the whole strip, all from the full-resolution decode
+        self.assertEqual({crop.shape[:2] for crop in model.calls[0]}, {(600, 1200), (600, 4000)})
+
+    def test_upload_decoded_small_without_tiling(self):
+        model = FakeModel()
+        with self.client(model, tile="never") as client:
+            self.wait_ready(client)
+            response = client.post("/predict", files={"file": ("strip.png", wide_png(), "image/png")})
+            broken = client.post("/predict", files={"file": ("x.png", b"not an image", "image/png")})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(max(model.calls[0][0].shape[:2]), 640)
+        self.assertEqual(broken.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
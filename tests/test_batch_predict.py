@@ -0,0 +1,71 @@
+# unit tests for batch prediction
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from src.models.batch_predict import collect_images, run_batch_prediction
+from src.models.result_store import ResultStore
+from tests.fakes import FakeModel
+
+
+class TestBatchPredict(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for name in ["a.jpg", "b.png", "c.jpg"]:
+            cv2.imwrite(os.path.join(self.test_dir, name), np.zeros((10, 10, 3), dtype=np.uint8))
+        open(os.path.join(self.test_dir, "notes.json"), "wb").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_collect_images(self):
+        list_file = os.path.join(self.test_dir, "list.txt")
+        with open(list_file, "w") as f:
+            f.write(os.path.join(self.test_dir, "a.jpg") + "\n")
+        folder = collect_images([self.test_dir])
+        self.assertEqual(len(folder), 3)
+        pattern = collect_images([os.path.join(self.test_dir, "*.jpg"), list_file])
+        self.assertEqual(len(pattern), 2)  # a.jpg listed twice is de-duplicated
+
+    def test_stream_and_resume(self):
+        output = os.path.join(self.test_dir, "out.jsonl")
+        model = FakeModel()
+        summary = run_batch_prediction(model, [self.test_dir], output=output, batch=2)
+        self.assertEqual(summary["processed"], 3)
+        self.assertEqual([len(c) for c in model.calls], [2, 1])
+
+        with open(output) as f:
+            record = json.loads(f.readline())
+        self.assertEqual(record["counts"], {"abnormal": 1, "normal": 0})
+        self.assertEqual(record["n_abnormal"], 1)
+
+        summary = run_batch_prediction(model, [self.test_dir], output=output, resume=True)
+        self.assertEqual(summary["skipped"], 3)
+        self.assertEqual(summary["processed"], 0)
+
+    def test_csv_output(self):
+        output = os.path.join(self.test_dir, "out.csv")
+        run_batch_prediction(FakeModel(), [self.test_dir], output=output)
+        summary = run_batch_prediction(FakeModel(), [self.test_dir], output=output, resume=True)
+        self.assertEqual(summary["skipped"], 3)
+
+
+    def test_records_into_result_store(self):
+        with ResultStore(os.path.join(self.test_dir, "history.sqlite")) as store:
+            run_batch_prediction(FakeModel(), [self.test_dir], output=os.path.join(self.test_dir, "out.jsonl"),
+                                 store=store)
+            store.flush()
+            rows = store.query(origin="batch")
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(row["image_hash"] and row["model"] == "FakeModel" for row in rows))
+        self.assertEqual({row["level"] for row in rows}, {"mild"})
+
+
+if __name__ == "__main__":
+    unittest.main()
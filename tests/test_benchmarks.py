@@ -0,0 +1,26 @@
+# unit tests for the benchmark baseline comparison
+import unittest
+
+from benchmarks.bench_inference import compare
+
+
+def result(p95, ips, batch=1):
+    return {"model": "best.pt", "backend": "pytorch", "imgsz": 640, "batch": batch, "p95_ms": p95, "images_per_s": ips}
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_flags_regressions(self):
+        baseline = [result(100, 10), result(400, 20, batch=8)]
+        rows = compare([result(110, 9.5), result(500, 20, batch=8)], baseline, tolerance=0.15)
+        self.assertEqual([r["regressed"] for r in rows], [False, True])
+        self.assertAlmostEqual(rows[1]["p95_change"], 0.25)
+
+    def test_throughput_drop_and_new_cases(self):
+        rows = compare([result(100, 8), result(50, 50, batch=4)], [result(100, 10)], tolerance=0.15)
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]["regressed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
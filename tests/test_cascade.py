@@ -0,0 +1,91 @@
+# unit tests for the model cascade
+import unittest
+
+import numpy as np
+
+from src.analysis.verdict import DEFAULT_POLICY, VerdictEngine
+from src.models.batch_predict import build_records
+from src.models.cascade import CascadePredictor, calibrate_cascade, escalation_mask
+from src.models.inference import Detections, predict_batches
+from tests.fakes import FakeResult
+
+NAMES = {0: "abnormal", 1: "normal"}
+POLICY = dict(DEFAULT_POLICY, conf=0.3)
+# Test images "a", "b", "c", told apart by their pixel value
+IMAGES = [np.full((10, 10, 3), i, dtype=np.uint8) for i in range(3)]
+
+
+class TableModel:
+    """Returns fixed (scores, classes) per image name, above the requested conf"""
+
+    names = NAMES
+
+    def __init__(self, table):
+        self.table = table
+        self.seen = []
+
+    def predict(self, source, conf=0.25, **kwargs):
+        results = []
+        for image in source:
+            name = "abc"[int(image[0, 0, 0])]
+            self.seen.append(name)
+            scores, classes = self.table[name]
+            keep = np.asarray(scores) >= conf
+            boxes = np.tile([[1, 2, 3, 4]], (int(keep.sum()), 1))
+            results.append(FakeResult(boxes, np.asarray(scores)[keep], np.asarray(classes)[keep]))
+        return results
+
+
+def dets(scores, classes):
+    return Detections(np.zeros((len(scores), 4)), scores, classes, (10, 10))
+
+
+class TestCascade(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = VerdictEngine(NAMES, POLICY)
+        # clear normal, uncertain abnormal (0.28 just under the cutoff), clear abnormal
+        self.small = {"a": ([0.9], [1]), "b": ([0.28], [0]), "c": ([0.9, 0.9], [0, 0])}
+        self.large = {"a": ([0.95], [1]), "b": ([0.6], [0]), "c": ([0.9, 0.9], [0, 0])}
+
+    def test_escalation_mask(self):
+        detections = [dets([0.9], [1]), dets([0.28], [0]), dets([0.9], [0]), dets([0.9] * 5, [0] * 5)]
+        self.assertEqual(escalation_mask(self.engine, detections, (0.2, 0.3)).tolist(), [False, True, False, False])
+        # one abnormal box away from normal, or from severe (threshold 5)
+        self.assertEqual(escalation_mask(self.engine, detections, (1, 1), 1).tolist(), [False, False, True, True])
+
+    def test_cascade_escalates_only_uncertain_images(self):
+        small, large = TableModel(self.small), TableModel(self.large)
+        models = {"small.pt": small, "large.pt": large}
+        cascade = CascadePredictor(
+            [{"model": "small.pt", "band": [0.2, 0.3], "count_margin": 0}, {"model": "large.pt"}],
+            POLICY, loader=models.get,
+        )
+        outputs = list(predict_batches(cascade, IMAGES, conf=0.3))
+        self.assertEqual(large.seen, ["b"])
+        self.assertEqual([t["tier"] for _, _, t in outputs], ["small.pt", "large.pt", "small.pt"])
+        self.assertEqual(cascade.answered, [2, 1])
+
+        records = build_records(["a", "b", "c"], [d for _, d, _ in outputs], cascade.engine, [t for _, _, t in outputs])
+        self.assertEqual([r["level"] for r in records], ["other", "mild", "mild"])
+        self.assertEqual(records[1]["tier"], "large.pt")
+        self.assertNotIn("tier", records[1]["timings_ms"])
+        self.assertEqual(records[1]["timings_ms"]["total"], outputs[1][2]["total"])
+
+    def test_calibration_meets_tolerance(self):
+        models = {"small.pt": TableModel(self.small), "large.pt": TableModel(self.large)}
+        report = calibrate_cascade(["small.pt", "large.pt"], IMAGES, POLICY, tolerance=0.0,
+                                   loader=models.get)
+        self.assertEqual(report["agreement"], 1.0)
+        first = report["tiers"][0]
+        self.assertEqual(first["answered"], 2)
+        self.assertTrue(first["band"][0] <= 0.28 < first["band"][1])
+
+        # With a loose tolerance the small model answers everything
+        loose = calibrate_cascade(["small.pt", "large.pt"], IMAGES, POLICY, tolerance=0.5,
+                                  loader=models.get)
+        self.assertEqual(loose["tiers"][0]["answered"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
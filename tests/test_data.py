@@ -6,8 +6,15 @@ import unittest
 import cv2
 import numpy as np
 
-from src.data.data_loader import load_images_from_folder, load_yolo_labels, load_image_and_labels
+from src.data.data_loader import (
+    iter_batches, iter_images_and_labels, letterbox, load_images_from_folder, load_yolo_labels,
+    load_image_and_labels, parse_yolo_labels,
+)
 from src.data.data_splitter import split_dataset
+from src.data.dedup_index import HashIndex, hamming, image_hash
+from src.data.image_cache import ImageCache
+from src.data.label_index import LabelIndex
+from src.data.label_validator import validate_dataset
 
 class TestDataLoader(unittest.TestCase):
 
@@ -38,12 +45,120 @@ class TestDataLoader(unittest.TestCase):
         self.assertEqual(len(labels), 1)
         self.assertEqual(labels[0][0], 0)  # class_id = 0
 
+    def test_parse_yolo_labels(self):
+        labels, lines, malformed = parse_yolo_labels("0 0.5 0.5 0.2 0.2\n\n1 0.1 0.1\nx 1 1 1 1\n1 .3 .3 .1 .1\n")
+        np.testing.assert_allclose(labels, [[0, 0.5, 0.5, 0.2, 0.2], [1, 0.3, 0.3, 0.1, 0.1]])
+        self.assertEqual(lines.tolist(), [1, 5])
+        self.assertEqual(malformed, [3, 4])
+
     def test_load_image_and_labels(self):
         img_path = os.path.join(self.test_dir, "test1.jpg")
         img, labels = load_image_and_labels(img_path)
         self.assertIsNotNone(img)
         self.assertEqual(len(labels), 1)
 
+    def test_letterbox(self):
+        image, ratio, pad = letterbox(np.zeros((50, 100, 3), dtype=np.uint8), 64)
+        self.assertEqual(image.shape, (64, 64, 3))
+        self.assertAlmostEqual(ratio, 0.64)
+        self.assertEqual(pad, (0, 16))
+        self.assertEqual(image[0, 0, 0], 114)
+
+
+class TestStreamingLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(7):
+            path = os.path.join(self.test_dir, f"img{i}.png")
+            cv2.imwrite(path, np.full((20 + i, 30, 3), i, dtype=np.uint8))
+            with open(os.path.splitext(path)[0] + ".txt", "w") as f:
+                f.write(f"{i % 2} 0.5 0.5 0.2 0.2\n")
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_order_matches_serial_loader(self):
+        stream = list(iter_images_and_labels(self.paths, workers=3, prefetch=2))
+        self.assertEqual([s[0] for s in stream], self.paths)
+        for (path, image, labels, meta), expected in zip(stream, self.paths):
+            serial_image, serial_labels = load_image_and_labels(expected)
+            np.testing.assert_array_equal(image, serial_image)
+            self.assertEqual(labels, serial_labels)
+            self.assertEqual(meta["orig_shape"], serial_image.shape[:2])
+
+    def test_batches_skip_unreadable(self):
+        paths = self.paths + [os.path.join(self.test_dir, "missing.png")]
+        with self.assertLogs(level="WARNING"):
+            batches = list(iter_batches(paths, batch=3, imgsz=32, workers=2))
+        self.assertEqual([len(b[0]) for b in batches], [3, 3, 1])
+        self.assertEqual(batches[0][1].shape, (3, 32, 32, 3))
+        self.assertEqual(batches[2][2], [[[0, 0.5, 0.5, 0.2, 0.2]]])
+
+
+class TestImageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.test_dir, "cache")
+        self.paths = []
+        for i, shape in enumerate([(40, 80, 3), (64, 32, 3)]):
+            path = os.path.join(self.test_dir, f"img{i}.png")
+            cv2.imwrite(path, np.random.RandomState(i).randint(0, 255, shape, dtype=np.uint8))
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_build_and_get(self):
+        cache = ImageCache.build(self.paths, 32, self.cache_dir)
+        image, orig_hw, hw = cache.get(self.paths[0])
+        self.assertEqual((orig_hw, hw, image.shape), ((40, 80), (16, 32), (16, 32, 3)))
+        self.assertAlmostEqual(cache.ratio(cache.find(self.paths[0])), 0.4)
+        self.assertIsInstance(cache.images, np.memmap)
+        self.assertIsNone(cache.get(os.path.join(self.test_dir, "other.png")))
+
+    def test_invalidation(self):
+        ImageCache.build(self.paths, 32, self.cache_dir)
+        cv2.imwrite(self.paths[1], np.zeros((64, 64, 3), dtype=np.uint8))
+        os.utime(self.paths[1], ns=(0, os.stat(self.paths[1]).st_mtime_ns + 10**9))
+
+        cache = ImageCache.build(self.paths, 32, self.cache_dir)
+        self.assertEqual(cache.get(self.paths[1])[1], (64, 64))
+        self.assertNotEqual(ImageCache.build(self.paths, 16, self.cache_dir).path, cache.path)
+
+    def test_augmenting_train_dataset(self):
+        from ultralytics.cfg import get_cfg
+        from ultralytics.data import build_yolo_dataset
+
+        from src.models.yolo_trainer import attach_image_cache
+
+        os.makedirs(os.path.join(self.test_dir, "images"))
+        os.makedirs(os.path.join(self.test_dir, "labels"))
+        for i, path in enumerate(self.paths):
+            os.replace(path, os.path.join(self.test_dir, "images", f"img{i}.png"))
+            with open(os.path.join(self.test_dir, "labels", f"img{i}.txt"), "w") as f:
+                f.write("0 0.5 0.5 0.2 0.2\n")
+        dataset = build_yolo_dataset(
+            get_cfg(overrides={"imgsz": 32, "mosaic": 1.0}), os.path.join(self.test_dir, "images"), 2,
+            {"names": {0: "abnormal"}, "nc": 1, "channels": 3}, mode="train",
+        )
+        attach_image_cache(dataset, self.cache_dir, workers=1)
+        dataset.max_buffer_length = 2
+        # Mosaic draws its other images from the buffer that load_image fills
+        for i in range(4):
+            self.assertEqual(tuple(dataset[i % 2]["img"].shape), (3, 32, 32))
+        # Bounded like load_image's buffer, evicted slots cleared
+        self.assertEqual(len(dataset.buffer), 1)
+        shapes = {"img0.png": (40, 80), "img1.png": (64, 32)}
+        for i, path in enumerate(dataset.im_files):
+            if i in dataset.buffer:
+                self.assertEqual(tuple(dataset.im_hw0[i]), shapes[os.path.basename(path)])
+            else:
+                self.assertIsNone(dataset.ims[i])
+
 
 class TestDataSplitter(unittest.TestCase):
 
@@ -71,6 +186,188 @@ class TestDataSplitter(unittest.TestCase):
             self.assertTrue(os.path.exists(os.path.join(self.output_dir, split, "images")))
             self.assertTrue(os.path.exists(os.path.join(self.output_dir, split, "labels")))
 
+    def test_hardlink_and_manifest_modes(self):
+        splits = split_dataset(self.image_dir, self.output_dir, 0.6, 0.2, 0.2, mode="hardlink")
+        image = splits["train"][0]
+        linked = os.path.join(self.output_dir, "train", "images", os.path.basename(image))
+        self.assertTrue(os.path.samefile(image, linked))
+
+        manifest_dir = os.path.join(self.output_dir, "manifest")
+        split_dataset(self.image_dir, manifest_dir, 0.6, 0.2, 0.2, mode="manifest")
+        with open(os.path.join(manifest_dir, "train.txt")) as f:
+            self.assertEqual(len(f.read().split()), 3)
+        self.assertFalse(os.path.exists(os.path.join(manifest_dir, "train", "images")))
+
+    def test_stratified_split(self):
+        # test0-4 are abnormal, test5-9 normal
+        for i in range(5, 10):
+            img_path = os.path.join(self.image_dir, f"test{i}.jpg")
+            cv2.imwrite(img_path, np.zeros((50, 50, 3), dtype=np.uint8))
+            with open(os.path.splitext(img_path)[0] + ".txt", "w") as f:
+                f.write("1 0.5 0.5 0.3 0.3\n")
+        splits = split_dataset(self.image_dir, self.output_dir, 0.6, 0.2, 0.2, mode="manifest", stratify=True)
+        abnormal = lambda paths: sum(os.path.basename(p) < "test5" for p in paths)
+        self.assertEqual([abnormal(splits[s]) for s in ("train", "val", "test")], [3, 1, 1])
+
+    def test_incremental_keeps_assignments(self):
+        first = split_dataset(self.image_dir, self.output_dir, 0.6, 0.2, 0.2, mode="symlink")
+        new_image = os.path.join(self.image_dir, "test9.jpg")
+        cv2.imwrite(new_image, np.zeros((50, 50, 3), dtype=np.uint8))
+
+        second = split_dataset(self.image_dir, self.output_dir, 0.6, 0.2, 0.2, seed=7, mode="symlink", incremental=True)
+        for split in ("train", "val", "test"):
+            self.assertTrue(set(first[split]) <= set(second[split]))
+        self.assertEqual(sum(new_image in paths for paths in second.values()), 1)
+
+    def test_groups_stay_in_one_split(self):
+        paths = sorted(os.path.join(self.image_dir, f"test{i}.jpg") for i in range(5))
+        groups = {p: 0 if i < 3 else i for i, p in enumerate(paths)}
+        for seed in range(5):
+            splits = split_dataset(self.image_dir, os.path.join(self.output_dir, str(seed)), 0.6, 0.2, 0.2, seed=seed,
+                                   mode="manifest", groups=groups)
+            self.assertEqual(sum(set(paths[:3]) <= set(splits[s]) for s in ("train", "val", "test")), 1)
+
+
+class TestLabelIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Create a small images/labels split"""
+        self.root = tempfile.mkdtemp()
+        self.image_dir = os.path.join(self.root, "val", "images")
+        self.label_dir = os.path.join(self.root, "val", "labels")
+        os.makedirs(self.image_dir)
+        os.makedirs(self.label_dir)
+        for i, rows in enumerate(["0 0.5 0.5 0.2 0.2\n1 0.1 0.1 0.1 0.1\n", "1 0.5 0.5 0.3 0.3\n", ""]):
+            cv2.imwrite(os.path.join(self.image_dir, f"img{i}.jpg"), np.zeros((40, 60, 3), dtype=np.uint8))
+            with open(os.path.join(self.label_dir, f"img{i}.txt"), "w") as f:
+                f.write(rows)
+        self.index_dir = os.path.join(self.root, ".index")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_build_and_load(self):
+        LabelIndex.build({"val": self.image_dir}, self.index_dir)
+        index = LabelIndex.load(self.index_dir)
+        self.assertIsInstance(index.boxes, np.memmap)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(tuple(index.sizes[0]), (40, 60))
+
+        row = index.find(os.path.join(self.image_dir, "img0.jpg"))
+        classes, boxes = index.labels(row)
+        self.assertEqual(classes.tolist(), [0, 1])
+        np.testing.assert_allclose(boxes[0], [0.5, 0.5, 0.2, 0.2])
+
+        stats = index.stats({0: "abnormal", 1: "normal"})["val"]
+        self.assertEqual(stats["unlabelled"], 1)
+        self.assertEqual(stats["classes"], {"abnormal": 1, "normal": 2})
+
+    def test_update_rereads_changed_labels(self):
+        LabelIndex.build({"val": self.image_dir}, self.index_dir)
+        label = os.path.join(self.label_dir, "img2.txt")
+        with open(label, "w") as f:
+            f.write("0 0.5 0.5 0.1 0.1\n")
+        os.utime(label, ns=(0, os.stat(label).st_mtime_ns + 10**9))
+
+        index = LabelIndex.update(self.index_dir)
+        self.assertEqual(index.stats({0: "abnormal", 1: "normal"})["val"]["unlabelled"], 0)
+
+    def test_loader_uses_index(self):
+        index = LabelIndex.build({"val": self.image_dir})
+        path = os.path.join(self.image_dir, "img1.jpg")
+        self.assertEqual(len(load_images_from_folder(self.image_dir, index=index)), 3)
+        np.testing.assert_allclose(load_image_and_labels(path, index=index)[1], load_image_and_labels(path)[1])
+
+
+class TestDedupIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.image_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.paths = []
+        for i in range(6):
+            image = cv2.GaussianBlur(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8), (9, 9), 0)
+            self.paths.append(os.path.join(self.image_dir, f"img{i}.png"))
+            cv2.imwrite(self.paths[-1], image)
+        # Re-encoded, downscaled copy of img0
+        self.copy = os.path.join(self.image_dir, "img0 (1).jpg")
+        cv2.imwrite(self.copy, cv2.resize(cv2.imread(self.paths[0]), (120, 90)), [cv2.IMWRITE_JPEG_QUALITY, 80])
+
+    def tearDown(self):
+        shutil.rmtree(self.image_dir)
+
+    def test_finds_near_duplicates(self):
+        index = HashIndex.build(self.paths + [self.copy])
+        self.assertEqual(index.clusters(), [sorted([self.paths[0], self.copy])])
+        self.assertEqual([p for p, _ in HashIndex.build(self.paths).query(cv2.imread(self.copy))], [self.paths[0]])
+        groups = index.groups()
+        self.assertEqual(groups[self.copy], groups[self.paths[0]])
+        self.assertEqual(len(set(groups.values())), 6)
+
+    def test_pairs_match_brute_force(self):
+        index = HashIndex.build(self.paths + [self.copy])
+        distances = hamming(index.hashes[:, None], index.hashes[None])
+        for radius in (0, 12, 40, 130):
+            expected = {tuple(p) for p in np.argwhere(np.triu(distances <= radius, 1)).tolist()}
+            self.assertEqual({(i, j) for i, j, _ in index.pairs(radius).tolist()}, expected)
+
+    def test_update_hashes_only_new_images(self):
+        index_dir = os.path.join(self.image_dir, ".dedup")
+        HashIndex.update(index_dir, self.paths)
+        index = HashIndex.load(index_dir)
+        index.hashes[1] = 0  # a reused hash must come from the saved index, not the file
+        index.save(index_dir)
+
+        updated = HashIndex.update(index_dir, self.paths + [self.copy])
+        self.assertEqual(len(updated), 7)
+        self.assertFalse(updated.hashes[1].any())
+        np.testing.assert_array_equal(updated.hashes[6], image_hash(self.copy))
+
+
+class TestLabelValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for split in ("train", "val"):
+            os.makedirs(os.path.join(self.root, split, "images"))
+            os.makedirs(os.path.join(self.root, split, "labels"))
+        with open(os.path.join(self.root, "classes.txt"), "w") as f:
+            f.write("abnormal\nnormal\n")
+        labels = {
+            ("train", "ok"): "0 0.5 0.5 0.2 0.2\n1 0.3 0.3 0.1 0.1\n",
+            ("train", "bad"): "0 0.5 0.5\n2 0.5 0.5 0.1 0.1\n0 1.5 0.5 0.1 0.1\n0 0.5 0.5 0 0.1\n"
+                              "1 0.3 0.3 0.1 0.1\n1 0.3 0.3 0.1 0.1\n",
+            ("val", "empty"): "",
+            ("val", "orphan"): "0 0.5 0.5 0.2 0.2\n",
+        }
+        for (split, name), text in labels.items():
+            with open(os.path.join(self.root, split, "labels", name + ".txt"), "w") as f:
+                f.write(text)
+        for split, name in [("train", "ok"), ("train", "bad"), ("val", "empty"), ("val", "unlabelled")]:
+            open(os.path.join(self.root, split, "images", name + ".jpg"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_reports_every_kind(self):
+        report = validate_dataset(root=self.root, workers=1)
+        self.assertEqual(report["names"], ["abnormal", "normal"])
+        self.assertEqual(report["counts"], {
+            "malformed": 1, "bad_class": 1, "out_of_range": 1, "zero_area": 1, "duplicate": 1,
+            "missing_label": 1, "orphan_label": 1,
+        })
+        lines = {issue["kind"]: issue["line"] for issue in report["issues"]}
+        self.assertEqual([lines[k] for k in ("malformed", "bad_class", "out_of_range", "zero_area", "duplicate")],
+                         [1, 2, 3, 4, 6])
+        self.assertEqual(report["splits"]["train"], {"images": 2, "labels": 2, "boxes": 7, "empty": 0})
+        self.assertEqual(report["splits"]["val"]["empty"], 1)
+
+    def test_chunks_match_single_pass(self):
+        whole = validate_dataset(root=self.root, workers=1)
+        chunked = validate_dataset(root=self.root, workers=2, chunk_size=1)
+        self.assertEqual(chunked["counts"], whole["counts"])
+        self.assertEqual(chunked["splits"], whole["splits"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,55 @@
+# unit tests for the offline detection evaluator
+import unittest
+
+import numpy as np
+
+from src.models.inference import Detections
+from src.models.yolo_eval import box_iou, compute_iou, evaluate_detections
+
+NAMES = {0: "abnormal", 1: "normal"}
+
+
+class TestBoxIoU(unittest.TestCase):
+
+    def test_matrix_matches_pairwise(self):
+        a = np.array([[0, 0, 100, 100], [50, 50, 150, 150]])
+        b = np.array([[0, 0, 100, 100], [200, 200, 210, 210], [25, 25, 75, 75]])
+        iou = box_iou(a, b)
+        self.assertEqual(iou.shape, (2, 3))
+        for i in range(2):
+            for j in range(3):
+                self.assertAlmostEqual(iou[i, j], compute_iou(a[i], b[j]), places=6)
+        self.assertAlmostEqual(compute_iou(a[0], a[1]), 2500 / 17500, places=6)
+
+
+class TestEvaluator(unittest.TestCase):
+
+    def test_perfect_predictions(self):
+        boxes = np.array([[10, 10, 50, 50], [60, 60, 90, 90]], dtype=np.float32)
+        classes = np.array([0, 1])
+        predictions = {"img.jpg": Detections(boxes, [0.9, 0.8], classes, (100, 100))}
+        metrics = evaluate_detections(predictions, NAMES, ground_truth={"img.jpg": (boxes, classes)})
+        self.assertGreater(metrics["mAP50"], 0.99)
+        self.assertGreater(metrics["mAP50-95"], 0.99)
+        np.testing.assert_array_equal(metrics["confusion_matrix"], [[1, 0, 0], [0, 1, 0], [0, 0, 0]])
+
+    def test_missed_and_false_detections(self):
+        gt = (np.array([[10, 10, 50, 50]], dtype=np.float32), np.array([0]))
+        predictions = {"img.jpg": Detections([[60, 60, 90, 90]], [0.9], [1], (100, 100))}
+        metrics = evaluate_detections(predictions, NAMES, ground_truth={"img.jpg": gt})
+        self.assertEqual(metrics["mAP50"], 0.0)
+        np.testing.assert_array_equal(metrics["confusion_matrix"], [[0, 0, 0], [0, 0, 1], [1, 0, 0]])
+
+
+    def test_class_without_ground_truth_not_averaged(self):
+        boxes = np.array([[10, 10, 50, 50]], dtype=np.float32)
+        # Only abnormal is labeled; a stray normal box must not halve the mean
+        predictions = {"img.jpg": Detections([[10, 10, 50, 50], [60, 60, 90, 90]], [0.9, 0.5], [0, 1], (100, 100))}
+        metrics = evaluate_detections(predictions, NAMES, ground_truth={"img.jpg": (boxes, np.array([0]))})
+        self.assertGreater(metrics["mAP50"], 0.99)
+        self.assertGreater(metrics["mAP50-95"], 0.99)
+        self.assertEqual(metrics["per_class"]["normal"]["mAP50"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+# unit tests for inference backends and export parity helpers
+import unittest
+
+import numpy as np
+
+from src.models.backends import backend_of
+from src.models.export import box_agreement
+from src.models.inference import Detections
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_backend_of(self):
+        self.assertEqual(backend_of("runs/yolo11s/best.pt"), "pytorch")
+        self.assertEqual(backend_of("runs/yolo11s/best_int8.onnx"), "onnxruntime")
+        self.assertEqual(backend_of("runs/yolo11s/best_openvino_model/"), "openvino")
+        self.assertEqual(backend_of("runs/yolo11s/best_openvino_model/best.xml"), "openvino")
+
+
+class TestBoxAgreement(unittest.TestCase):
+
+    def test_agreement(self):
+        boxes = np.array([[0, 0, 10, 10], [20, 20, 40, 40]], dtype=np.float32)
+        reference = {"a.jpg": Detections(boxes, [0.9, 0.8], [0, 1], (50, 50))}
+        same = {"a.jpg": Detections(boxes + 0.5, [0.7, 0.6], [0, 1], (50, 50))}
+        wrong_class = {"a.jpg": Detections(boxes, [0.7, 0.6], [1, 1], (50, 50))}
+        low_conf = {"a.jpg": Detections(boxes, [0.7, 0.1], [0, 1], (50, 50))}
+
+        self.assertEqual(box_agreement(reference, same), 1.0)
+        self.assertEqual(box_agreement(reference, wrong_class), 0.5)
+        self.assertAlmostEqual(box_agreement(reference, low_conf), 2 / 3)
+
+    def test_no_boxes(self):
+        empty = {"a.jpg": Detections(np.zeros((0, 4)), [], [], (50, 50))}
+        self.assertEqual(box_agreement(empty, empty), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
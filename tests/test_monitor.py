@@ -0,0 +1,82 @@
+# unit tests for the streaming monitor mode
+import unittest
+
+import numpy as np
+
+from src.analysis.verdict import VerdictEngine
+from src.models.inference import Detections
+from src.models.monitor import LatestFrameReader, TemporalVerdict, frame_changed, run_monitor
+from tests.fakes import FakeModel
+
+
+def abnormal(n):
+    return Detections(np.zeros((n, 4)), [0.9] * n, [0] * n, (10, 10))
+
+
+class FakeCapture:
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def read(self):
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+
+
+class TestMonitor(unittest.TestCase):
+
+    def test_frame_changed(self):
+        frame = np.full((60, 200, 3), 128, dtype=np.uint8)
+        noisy = frame.copy()
+        noisy[0, 0] = 0
+        moved = frame.copy()
+        moved[:, :100] = 0
+        self.assertTrue(frame_changed(None, frame))
+        self.assertFalse(frame_changed(frame, noisy))
+        self.assertTrue(frame_changed(frame, moved))
+
+    def test_temporal_verdict_smooths_and_expires(self):
+        window = TemporalVerdict(VerdictEngine({0: "abnormal", 1: "normal"}), window_s=10)
+        window.update(0.0, abnormal(1))
+        for t in range(1, 5):
+            window.update(float(t), abnormal(0))
+        self.assertEqual(window.verdict()["level"], "normal")
+        self.assertAlmostEqual(window.verdict()["abnormal_frames"], 0.2)
+
+        for t in range(5, 20):
+            window.update(float(t), abnormal(2))
+        verdict = window.verdict()
+        self.assertEqual(verdict["level"], "mild")
+        self.assertEqual(verdict["frames"], 11)
+
+    def test_latest_frame_reader_drops_stale_frames(self):
+        frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(5)]
+        reader = LatestFrameReader(FakeCapture(frames)).start()
+        reader._thread.join()
+        index, _, frame = reader.read()
+        self.assertEqual(index, 4)
+        self.assertEqual(reader.dropped, 4)
+        self.assertIsNone(reader.read(timeout=0.1))
+
+    def test_run_monitor_skips_unchanged_frames(self):
+        frames = [np.zeros((20, 40, 3), np.uint8)] * 2 + [np.full((20, 40, 3), 255, np.uint8)]
+        capture = FakeCapture(frames)
+
+        class StepReader:
+            captured, dropped = 0, 0
+
+            def read(self, timeout=None):
+                ok, frame = capture.read()
+                self.captured += ok
+                return (self.captured - 1, 0.0, frame) if ok else None
+
+        model = FakeModel(shape=None)
+        events = list(run_monitor(model, StepReader(), fps=0))
+        self.assertEqual([e["ran_model"] for e in events], [True, False, True])
+        self.assertEqual(len(model.calls), 2)
+        self.assertEqual(events[-1]["verdict"]["frames"], 3)
+        self.assertIn("latency_ms", events[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
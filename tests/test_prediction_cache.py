@@ -0,0 +1,78 @@
+# unit tests for the prediction cache
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.models.inference import Detections
+from src.models import prediction_cache
+from src.models.prediction_cache import PredictionCache, file_sha256, image_hash
+from tests.fakes import FakeModel
+
+
+class TestPredictionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = PredictionCache(os.path.join(self.tmp_dir, "cache.sqlite"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_bytes_roundtrip(self):
+        det = Detections([[1, 2, 3, 4], [5, 6, 7, 8]], [0.5, 0.25], [0, 1], (480, 640))
+        back = Detections.from_bytes(det.to_bytes())
+        np.testing.assert_array_equal(back.boxes, det.boxes)
+        np.testing.assert_array_equal(back.classes, det.classes)
+        self.assertEqual(back.orig_shape, (480, 640))
+        self.assertEqual(len(Detections.from_bytes(Detections([], [], [], (1, 1)).to_bytes())), 0)
+
+    def test_hit_skips_model(self):
+        images = [np.zeros((8, 8, 3), np.uint8), np.ones((8, 8, 3), np.uint8)]
+        model = FakeModel()
+        first = list(self.cache.predict(model, images, conf=0.3, imgsz=64))
+        second = list(self.cache.predict(model, images, conf=0.3, imgsz=64))
+        self.assertEqual(model.seen, 2)
+        self.assertEqual([t["cache"] for _, _, t in second], ["hit", "hit"])
+        np.testing.assert_array_equal(first[0][1].boxes, second[0][1].boxes)
+
+        list(self.cache.predict(model, images, conf=0.5, imgsz=64))  # other conf is another key
+        self.assertEqual(model.seen, 4)
+
+    def test_lru_eviction(self):
+        det = Detections(np.zeros((100, 4)), np.zeros(100), np.zeros(100), (1, 1))
+        cache = PredictionCache(os.path.join(self.tmp_dir, "small.sqlite"), max_bytes=len(det.to_bytes()) * 3)
+        for key in ["a", "b", "c"]:
+            cache.put(key, det)
+        cache.get("a")
+        cache.put("d", det)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+    def test_image_hash_by_content(self):
+        path = os.path.join(self.tmp_dir, "x.bin")
+        with open(path, "wb") as f:
+            f.write(b"abc")
+        self.assertEqual(image_hash(path), image_hash(b"abc"))
+
+    def test_file_hash_memo_is_bounded(self):
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(self.tmp_dir, f"{i}.bin"))
+            with open(paths[-1], "wb") as f:
+                f.write(bytes([i]))
+        limit = prediction_cache.MAX_FILE_HASHES
+        prediction_cache.MAX_FILE_HASHES = 2
+        try:
+            digests = [file_sha256(path) for path in paths]
+            memo = prediction_cache._file_hashes
+            self.assertLessEqual(len(memo), 2)
+            self.assertNotIn(digests[0], memo.values())
+            self.assertEqual(file_sha256(paths[0]), image_hash(bytes([0])))
+        finally:
+            prediction_cache.MAX_FILE_HASHES = limit
+
+if __name__ == "__main__":
+    unittest.main()
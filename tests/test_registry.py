@@ -0,0 +1,94 @@
+# unit tests for the model registry
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from src.models.registry import ModelRegistry
+
+
+class FakeModel:
+    """Stand-in for YOLO that records warm-up calls"""
+
+    def __init__(self, path):
+        self.path = path
+        self.warmed = 0
+
+    def predict(self, source, **kwargs):
+        self.warmed += 1
+        return []
+
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for name in ["a.pt", "b.pt", "c.pt"]:
+            path = os.path.join(self.tmp_dir, name)
+            with open(path, "wb") as f:
+                f.write(b"weights")
+            self.paths.append(path)
+        self.loads = []
+
+        def loader(path):
+            self.loads.append(path)
+            return FakeModel(path)
+
+        self.registry = ModelRegistry(max_models=2, warmup_imgsz=32, loader=loader)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_reuses_warm_model(self):
+        first = self.registry.get(self.paths[0])
+        second = self.registry.get(self.paths[0])
+        self.assertIs(first, second)
+        self.assertEqual(len(self.loads), 1)
+        self.assertEqual(first.warmed, 1)
+
+    def test_lru_eviction(self):
+        self.registry.get(self.paths[0])
+        self.registry.get(self.paths[1])
+        self.registry.get(self.paths[0])  # a.pt becomes most recent
+        self.registry.get(self.paths[2])  # evicts b.pt
+        self.assertEqual(len(self.registry), 2)
+        self.assertIn(self.paths[0], self.registry)
+        self.assertNotIn(self.paths[1], self.registry)
+
+    def test_reload_when_file_changes(self):
+        first = self.registry.get(self.paths[0])
+        mtime = os.path.getmtime(self.paths[0]) + 10
+        os.utime(self.paths[0], (time.time(), mtime))
+        second = self.registry.get(self.paths[0])
+        self.assertIsNot(first, second)
+        self.assertEqual(len(self.registry), 1)
+
+    def test_warm_lookup_does_not_wait_for_other_loads(self):
+        self.registry.get(self.paths[0])
+        release = threading.Event()
+        loader = self.registry.loader
+
+        def slow_loader(path):
+            release.wait(5)
+            return loader(path)
+
+        self.registry.loader = slow_loader
+        threads = [threading.Thread(target=self.registry.get, args=(self.paths[1],)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        t0 = time.perf_counter()
+        self.registry.get(self.paths[0])
+        self.assertLess(time.perf_counter() - t0, 1.0)
+
+        release.set()
+        for thread in threads:
+            thread.join()
+        # Both lookups of b.pt shared one load
+        self.assertEqual(self.loads.count(self.paths[1]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# unit tests for the prediction history store
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from src.analysis.verdict import VerdictEngine
+from src.models.batch_predict import build_records
+from src.models.inference import Detections
+from src.models.prediction_cache import image_hash
+from src.models.result_store import ResultStore, parse_time
+
+NAMES = {0: "abnormal", 1: "normal"}
+
+
+def dets(n_abnormal, n_normal=0):
+    n = n_abnormal + n_normal
+    return Detections(np.tile([[1, 2, 3, 4]], (n, 1)), [0.9] * n, [0] * n_abnormal + [1] * n_normal, (10, 20))
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = ResultStore(os.path.join(self.tmp_dir, "history.sqlite"))
+        self.engine = VerdictEngine(NAMES)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def add(self, paths, detections, **kwargs):
+        records = build_records(paths, detections, self.engine, [{"total": 5.0}] * len(paths))
+        return self.store.add(records, NAMES, "m.pt", "batch", **kwargs)
+
+    def test_write_and_query(self):
+        image = os.path.join(self.tmp_dir, "a.png")
+        cv2.imwrite(image, np.zeros((10, 20, 3), dtype=np.uint8))
+        self.add([image, "b.png", "c.png"], [dets(7), dets(1, 2), dets(0, 3)])
+        self.add(["bad.png"], [dets(0)])
+        self.store.flush()
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store.written, 4)
+
+        severe = self.store.query(since="7d", min_abnormal=6)
+        self.assertEqual([r["path"] for r in severe], [image])
+        row = severe[0]
+        self.assertEqual((row["level"], row["n_abnormal"], row["origin"], row["model"]), ("severe", 7, "batch", "m.pt"))
+        self.assertEqual(row["counts"], {"abnormal": 7, "normal": 0})
+        self.assertEqual(row["timings"], {"total": 5.0})
+        # The file was hashed like the prediction cache does; other paths do not exist
+        self.assertEqual(row["image_hash"], image_hash(image))
+        self.assertEqual([r["path"] for r in self.store.query(image_hash=image_hash(image))], [image])
+
+        boxes = self.store.query(level="mild", with_boxes=True)[0]["detections"]
+        np.testing.assert_array_equal(boxes.classes, [0, 1, 1])
+        self.assertEqual(boxes.orig_shape, (10, 20))
+        self.assertEqual(len(self.store.query(level=["normal", "other"])), 2)
+        self.assertEqual(self.store.query(until="1h"), [])
+
+        summary = self.store.summary(since="1d")
+        self.assertEqual(sum(r["images"] for r in summary), 4)
+        self.assertEqual({r["level"]: r["abnormal"] for r in summary}["severe"], 7)
+
+    def test_error_records_skipped_and_detections_rebuilt(self):
+        records = build_records(["a.png"], [dets(2)], self.engine, [{}])
+        self.store.add(records + [{"path": "broken.png", "error": "ValueError()"}], NAMES)
+        self.store.flush()
+        rows = self.store.query(with_boxes=True)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(rows[0]["detections"]), 2)
+
+    def test_checkpoint_retrained_in_place(self):
+        checkpoint = os.path.join(self.tmp_dir, "best.pt")
+        records = build_records(["a.png"], [dets(1)], self.engine, [{}])
+        for epoch, weights in enumerate([b"epoch 1", b"epoch 2"]):
+            with open(checkpoint, "wb") as f:
+                f.write(weights)
+            os.utime(checkpoint, ns=(epoch * 10**9, epoch * 10**9))
+            self.store.add(records, NAMES, checkpoint, "batch")
+            self.store.flush()
+        rows = self.store.query()
+        self.assertEqual({r["checkpoint"] for r in rows}, {image_hash(b"epoch 1"), image_hash(b"epoch 2")})
+
+    def test_add_never_blocks(self):
+        store = ResultStore(os.path.join(self.tmp_dir, "small.sqlite"), max_queue=1)
+        # Hold the writer inside a transaction so the queue fills up
+        release = threading.Event()
+        rows = store._rows
+        store._rows = lambda *item: release.wait(5) and rows(*item)
+        records = build_records(["a.png"], [dets(1)], self.engine, [{}])
+        results = []
+        t0 = time.perf_counter()
+        for _ in range(5):
+            results.append(store.add(records, NAMES))
+        self.assertLess(time.perf_counter() - t0, 1.0)
+        self.assertIn(False, results)
+        release.set()
+        store.close()
+        self.assertEqual(store.written + store.dropped, 5)
+        self.assertFalse(store.add(records, NAMES))
+
+    def test_parse_time(self):
+        now = 1_000_000.0
+        self.assertEqual(parse_time("2d", now), now - 2 * 86400)
+        self.assertEqual(parse_time("90m", now), now - 5400)
+        self.assertEqual(parse_time("1700000000"), 1700000000.0)
+        self.assertEqual(parse_time("2024-05-01T08:00"), time.mktime((2024, 5, 1, 8, 0, 0, 0, 0, -1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# unit tests for the hyperparameter sweep runner
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+from src.models.sweep import plan_workers, sample_trials, should_prune, write_table
+from src.models.yolo_trainer import load_train_params
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_sample_trials(self):
+        space = {
+            "lr0": {"type": "loguniform", "low": 0.001, "high": 0.1},
+            "optimizer": ["SGD", "AdamW"],
+            "epochs": 3,
+        }
+        trials = sample_trials(space, 5, seed=1)
+        self.assertEqual(trials, sample_trials(space, 5, seed=1))
+        self.assertEqual([t["trial"] for t in trials][:2], ["trial_000", "trial_001"])
+        for trial in trials:
+            self.assertTrue(0.001 <= trial["params"]["lr0"] <= 0.1)
+            self.assertIn(trial["params"]["optimizer"], ["SGD", "AdamW"])
+            self.assertEqual(trial["params"]["epochs"], 3)
+
+        grid = sample_trials({"optimizer": ["SGD", "AdamW"], "imgsz": [640, 960]}, method="grid")
+        self.assertEqual(len(grid), 4)
+        with self.assertRaises(ValueError):
+            sample_trials(space, method="grid")
+
+    def test_plan_workers(self):
+        self.assertEqual(plan_workers(4, 6, cpus=16, ram_gb=64), (4, 4))
+        self.assertEqual(plan_workers(4, 6, cpus=16, ram_gb=13), (2, 4))
+        self.assertEqual(plan_workers(4, 6, cpus=2, ram_gb=2), (1, 2))
+        self.assertEqual(plan_workers(1, 1, max_workers=3, cpus=8, ram_gb=8), (3, 1))
+
+    def test_should_prune(self):
+        peers = [[0.1, 0.2, 0.3], [0.1, 0.25, 0.35], [0.2, 0.3, 0.4]]
+        self.assertTrue(should_prune([0.05, 0.1, 0.15], peers, warmup_epochs=2, min_trials=3))
+        self.assertFalse(should_prune([0.05, 0.1, 0.4], peers, warmup_epochs=2, min_trials=3))
+        self.assertFalse(should_prune([0.05], peers, warmup_epochs=2, min_trials=3))
+        self.assertFalse(should_prune([0.05, 0.1], peers[:2], warmup_epochs=2, min_trials=3))
+
+    def test_table_and_params(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "params.yaml")
+            with open(path, "w") as f:
+                yaml.safe_dump({"model": "yolo11n.pt", "epochs": 5, "sweep": {"space": {"lr0": [0.01]}}}, f)
+            self.assertEqual(load_train_params(path), {"model": "yolo11n.pt", "epochs": 5})
+
+            metric = "metrics/mAP50-95(B)"
+            rows = [
+                {"trial": "trial_000", "status": "pruned", metric: 0.2, "params": {"lr0": 0.1}},
+                {"trial": "trial_001", "status": "failed", metric: None, "params": {"lr0": 0.5}},
+                {"trial": "trial_002", "status": "complete", metric: 0.4, "params": {"lr0": 0.01}},
+            ]
+            ordered = write_table(rows, os.path.join(test_dir, "trials.csv"), metric)
+            self.assertEqual([r["trial"] for r in ordered], ["trial_002", "trial_000", "trial_001"])
+            with open(os.path.join(test_dir, "trials.csv")) as f:
+                self.assertTrue(f.readline().startswith("trial,status,metrics/mAP50-95(B)"))
+        finally:
+            shutil.rmtree(test_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# unit tests for tiled inference
+import unittest
+
+import numpy as np
+
+from src.models.tiling import merge_boxes, needs_tiling, predict_tiled, tile_shape, tile_windows
+from tests.fakes import FakeResult
+
+
+class BeatModel:
+    """Detects a fixed 10x10 beat at global (100, 20) in whatever crop covers it"""
+
+    def __init__(self, width):
+        self.width = width
+        self.calls = []
+
+    def predict(self, source, **kwargs):
+        self.calls.append(len(source))
+        results = []
+        for image in source:
+            # crops are views: recover their global x offset from the marker row
+            x0 = int(image[0, 0, 0]) * 10 if image.shape[1] != self.width else 0
+            boxes = [[100 - x0, 20, 110 - x0, 30]] if x0 <= 100 and x0 + image.shape[1] >= 110 else []
+            results.append(FakeResult(boxes, shape=image.shape[:2]))
+        return results
+
+
+class TestTiling(unittest.TestCase):
+
+    def test_tile_geometry(self):
+        self.assertEqual(tile_shape(177, 1420, imgsz=640), (177, 354))
+        windows = tile_windows(177, 1420, 177, 354, overlap=0.25)
+        self.assertEqual(windows[0].tolist(), [0, 0, 354, 177])
+        self.assertEqual(windows[-1, 2], 1420)
+        widths = windows[:-1, 2] - windows[1:, 0]
+        self.assertTrue((widths >= 354 * 0.25 - 1).all())
+
+    def test_needs_tiling(self):
+        self.assertTrue(needs_tiling(177, 1420, 640))
+        self.assertTrue(needs_tiling(3000, 4000, 640))
+        self.assertFalse(needs_tiling(600, 800, 640))
+
+    def test_merge(self):
+        boxes = np.array([[0, 0, 10, 10], [1, 0, 11, 10], [50, 50, 60, 60]], dtype=np.float32)
+        scores = np.array([0.9, 0.6, 0.8], dtype=np.float32)
+        classes = np.array([0, 0, 0])
+        kept, kept_scores, _ = merge_boxes(boxes, scores, classes, method="nms")
+        self.assertEqual(kept.tolist(), [[0, 0, 10, 10], [50, 50, 60, 60]])
+        fused, fused_scores, _ = merge_boxes(boxes, scores, classes, method="wbf")
+        self.assertAlmostEqual(float(fused[0, 0]), 0.6 / 1.5, places=5)
+        self.assertEqual(fused_scores.tolist(), kept_scores.tolist())
+
+    def test_predict_tiled_maps_and_merges(self):
+        image = np.zeros((40, 400, 3), dtype=np.uint8)
+        model = BeatModel(width=400)
+        # mark each column block with its x offset / 10 so the fake model can locate crops
+        image[0, :, 0] = np.arange(400) // 10
+        (_, detections, timings), = predict_tiled(
+            model, [image], imgsz=20, mode="always", max_downscale=2.0, full_image=True
+        )
+        self.assertGreater(timings["tiles"], 2)
+        self.assertEqual(model.calls, [timings["tiles"]])
+        self.assertEqual(detections.boxes.tolist(), [[100, 20, 110, 30]])
+        self.assertEqual(detections.orig_shape, (40, 400))
+
+    def test_small_images_are_not_tiled(self):
+        model = BeatModel(width=30)
+        outputs = list(predict_tiled(model, [np.zeros((30, 30, 3), np.uint8)] * 3, imgsz=32, batch=2))
+        self.assertEqual(model.calls, [2, 1])
+        self.assertTrue(all("tiles" not in t for _, _, t in outputs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,10 +4,15 @@ import unittest
 import tempfile
 import yaml
 import matplotlib.pyplot as plt
+import numpy as np
 
 from src.utils.logger import logging
 from src.utils.config import load_config
 from src.utils.plot import plot_dummy_curve
+from src.utils.tracing import Tracer
+from src.utils.render import decode_image, render
+from src.utils.decode import DecodedImage, decode_source, read_header
+from src.models.inference import Detections, predict_batches
 
 
 class TestLogger(unittest.TestCase):
@@ -46,5 +51,171 @@ class TestPlot(unittest.TestCase):
         self.assertIsInstance(fig, plt.Figure)
 
 
+class TestTracing(unittest.TestCase):
+    def test_disabled_is_noop(self):
+        tracer = Tracer(enabled=False)
+        with tracer.span("request"), tracer.stage("forward"):
+            tracer.count("images")
+        self.assertEqual(tracer.snapshot(), {"stages": {}, "counters": {}})
+
+    def test_stages_counters_and_span_log(self):
+        tracer = Tracer(enabled=True)
+        with self.assertLogs("ecg.trace", level="INFO") as logs:
+            with tracer.span("request", route="/predict"):
+                with tracer.stage("decode"):
+                    pass
+                tracer.observe("forward", 0.02)
+                tracer.count("images", 2)
+        record = logs.records[0].msg
+        self.assertEqual(record["route"], "/predict")
+        self.assertEqual(record["stages_ms"]["forward"], 20.0)
+        self.assertEqual(record["counts"], {"images": 2})
+
+        snapshot = tracer.snapshot()
+        self.assertEqual(set(snapshot["stages"]), {"decode", "forward", "request"})
+        self.assertEqual(snapshot["counters"]["images"], 2)
+
+    def test_nested_span_stages_reach_outer_span(self):
+        tracer = Tracer(enabled=True)
+        with self.assertLogs("ecg.trace", level="INFO") as logs:
+            with tracer.span("request"):
+                with tracer.span("predict_batch"):
+                    tracer.observe("forward", 0.02)
+                    tracer.count("images", 2)
+        inner, outer = (r.msg for r in logs.records)
+        self.assertEqual(inner["stages_ms"], {"forward": 20.0})
+        self.assertEqual(outer["stages_ms"], {"forward": 20.0})
+        self.assertEqual(outer["counts"], {"images": 2})
+
+    def test_prometheus_format(self):
+        tracer = Tracer(enabled=True)
+        tracer.observe("forward", 0.02)
+        tracer.observe("forward", 3.0)
+        tracer.count("cache_hits")
+        text = tracer.render_prometheus()
+        self.assertIn('ecg_stage_seconds_bucket{stage="forward",le="0.025"} 1', text)
+        self.assertIn('ecg_stage_seconds_bucket{stage="forward",le="+Inf"} 2', text)
+        self.assertIn('ecg_stage_seconds_count{stage="forward"} 2', text)
+        self.assertIn("ecg_cache_hits_total 1", text)
+
+
+class TestRender(unittest.TestCase):
+
+    def setUp(self):
+        self.image = np.zeros((100, 200, 3), dtype=np.uint8)
+        self.detections = Detections([[20, 30, 80, 90]], [0.9], [0], (100, 200))
+        self.names = {0: "abnormal", 1: "normal"}
+
+    def test_render_formats(self):
+        for fmt in ("jpg", "png", "webp"):
+            data = render(self.image, self.detections, self.names, fmt=fmt, copy=True)
+            decoded = decode_image(data)
+            self.assertEqual(decoded.shape, (100, 200, 3))
+            self.assertGreater(int(decoded[30:90, 20].max()), 0)
+        self.assertEqual(self.image.max(), 0)
+
+        pil = render(self.image, self.detections, self.names, fmt="pil", copy=True)
+        self.assertEqual(pil.size, (200, 100))
+        # Red class-0 box: BGR (56, 56, 255) becomes RGB (255, 56, 56)
+        self.assertEqual(pil.getpixel((20, 60)), (255, 56, 56))
+
+    def test_render_reduced_decode(self):
+        # Half-size decode of a 100x200 image: boxes in original pixels are drawn halved
+        small = DecodedImage(np.zeros((50, 100, 3), dtype=np.uint8), (100, 200))
+        drawn = render(small, self.detections, self.names, fmt="array", copy=True)
+        self.assertEqual(drawn.shape, (50, 100, 3))
+        # Left edge at x=10 and bottom edge at y=45; nothing below it
+        self.assertGreater(int(drawn[20:40, 10].max()), 0)
+        self.assertGreater(int(drawn[44:48, 25].max()), 0)
+        self.assertEqual(int(drawn[48:].max()), 0)
+
+    def test_skip_rendering(self):
+        self.assertIsNone(render(self.image, self.detections, self.names, fmt=None))
+        self.assertEqual(self.image.max(), 0)
+        self.assertIsNone(decode_image(b"not an image"))
+
+
+class TestDecode(unittest.TestCase):
+    def setUp(self):
+        import cv2
+        from PIL import Image
+
+        self.test_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        # Smooth gradient so reduced decodes stay close to a resize of the full one
+        ramp = np.linspace(0, 255, 1600, dtype=np.float32)
+        self.image = np.dstack([np.add.outer(ramp[:1200] / 2, ramp / 2), np.tile(ramp, (1200, 1)),
+                                rng.integers(0, 255, (1200, 1600))]).astype(np.uint8)
+        self.jpeg = os.path.join(self.test_dir, "big.jpg")
+        cv2.imwrite(self.jpeg, self.image)
+        self.rotated = os.path.join(self.test_dir, "rotated.jpg")
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.fromarray(self.image[:40, :60, ::-1]).save(self.rotated, exif=exif, quality=95)
+        self.png = os.path.join(self.test_dir, "big.png")
+        cv2.imwrite(self.png, self.image)
+
+    def test_header_and_orientation(self):
+        import cv2
+
+        self.assertEqual(read_header(self.jpeg), {"format": "JPEG", "width": 1600, "height": 1200, "orientation": 1})
+        self.assertEqual(read_header(self.rotated)["width"], 40)
+        self.assertIsNone(read_header(os.path.join(self.test_dir, "missing.jpg")))
+        self.assertIsNone(read_header(b"not an image"))
+
+        decoded = decode_source(self.rotated)
+        np.testing.assert_array_equal(decoded.image, cv2.imread(self.rotated))
+        self.assertEqual(decoded.orig_shape, (60, 40))
+        self.assertFalse(decoded.reduced)
+
+    def test_reduced_decode(self):
+        decoded = decode_source(self.jpeg, imgsz=320)
+        # 1/4 keeps the long side >= 320, 1/8 would not
+        self.assertEqual(decoded.image.shape, (300, 400, 3))
+        self.assertEqual(decoded.orig_shape, (1200, 1600))
+        self.assertEqual(decoded.scale, (4.0, 4.0))
+        with open(self.jpeg, "rb") as f:
+            self.assertEqual(decode_source(f.read(), imgsz=320).image.shape, (300, 400, 3))
+        self.assertEqual(decode_source(self.jpeg, imgsz=2000).image.shape, (1200, 1600, 3))
+
+        png = decode_source(self.png, imgsz=320)
+        self.assertEqual(png.image.shape, (240, 320, 3))
+        self.assertEqual(png.scale, (5.0, 5.0))
+        self.assertIsNone(decode_source(b"not an image"))
+
+    def test_predict_batches_maps_boxes_back(self):
+        class Tensor(np.ndarray):
+            def cpu(self):
+                return self
+
+            def numpy(self):
+                return np.asarray(self)
+
+        class Boxes:
+            def __init__(self, shape):
+                # One box over the middle of whatever image the model saw
+                h, w = shape
+                self.xyxy = np.array([[w / 4, h / 4, w / 2, h / 2]], dtype=np.float32).view(Tensor)
+                self.conf = np.array([0.9], dtype=np.float32).view(Tensor)
+                self.cls = np.array([0.0], dtype=np.float32).view(Tensor)
+
+        class Result:
+            def __init__(self, image):
+                self.boxes = Boxes(image.shape[:2])
+                self.orig_shape = image.shape[:2]
+                self.speed = {"preprocess": 1.0, "inference": 1.0, "postprocess": 1.0}
+
+        class Model:
+            def predict(self, images, **kwargs):
+                self.shapes = [image.shape[:2] for image in images]
+                return [Result(image) for image in images]
+
+        model = Model()
+        (_, dets, _), = predict_batches(model, [self.jpeg], imgsz=320)
+        self.assertEqual(model.shapes, [(300, 400)])
+        self.assertEqual(dets.orig_shape, (1200, 1600))
+        np.testing.assert_allclose(dets.boxes, [[400, 300, 800, 600]])
+
+
 if __name__ == "__main__":
     unittest.main()